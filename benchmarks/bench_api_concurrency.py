@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+API并发基准：在事件循环中直接查库 vs 通过db_executor线程池查库
+
+启动一个uvicorn实例（临时数据库），用N个并发客户端混合请求/batch-data（慢查询）
+和/health（不查库），分别统计两类请求的p50/p99延迟：
+1. 阻塞路径：同步的数据库调用直接在事件循环中执行（改造前的行为）
+2. 线程池路径：DBExecutor，有界线程池 + 并发上限
+
+用法：
+    python benchmarks/bench_api_concurrency.py --clients 50 --requests 10 --codes 20 --days 2000
+"""
+
+import sys
+import os
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import httpx
+import uvicorn
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.models_v2 import DatabaseManager
+from src.api.db_executor import DBExecutor
+import src.api.main as api
+
+
+class InlineExecutor:
+    """改造前的行为：在事件循环线程中直接执行同步调用"""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def get_stats(self):
+        return {}
+
+    def shutdown(self):
+        pass
+
+
+def build_database(db_path: str, codes: int, days: int) -> list:
+    """构造codes个指标、每个days个数据点的数据库"""
+    db = DatabaseManager(db_path)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    wind_codes = [f"BENCH{i:04d}.SH" for i in range(codes)]
+    for wind_code in wind_codes:
+        db.insert_time_series_data(wind_code, 'close', pd.Series(np.random.rand(days) * 100, index=index))
+    return wind_codes
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    # lifespan关闭：不启动Wind客户端和调度器，组件由基准直接注入
+    config = uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_clients(base_url: str, wind_codes: list, clients: int, requests: int, batch_size: int) -> dict:
+    """每个客户端交替请求/batch-data和/health，记录各自的延迟"""
+    latencies = {'batch-data': [], 'health': []}
+    errors = 0
+
+    async def client(worker: int):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as session:
+            for i in range(requests):
+                if (worker + i) % 2 == 0:
+                    offset = (worker * batch_size + i) % len(wind_codes)
+                    codes = (wind_codes * 2)[offset:offset + batch_size]
+                    kind, call = 'batch-data', session.post("/batch-data", json={'wind_codes': codes})
+                else:
+                    kind, call = 'health', session.get("/health")
+                started = time.perf_counter()
+                response = await call
+                latencies[kind].append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(worker) for worker in range(clients)))
+    return {'latencies': latencies, 'errors': errors, 'seconds': time.perf_counter() - started}
+
+
+def summarize(latencies: list) -> str:
+    if not latencies:
+        return "无请求"
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    return f"p50 {p50:8.1f}ms  p99 {p99:8.1f}ms  (n={len(latencies)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API并发基准")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="每个客户端的请求数")
+    parser.add_argument("--codes", type=int, default=20)
+    parser.add_argument("--days", type=int, default=2000, help="每个指标的数据点数")
+    parser.add_argument("--batch-size", type=int, default=3, help="每个/batch-data请求的指标数")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        wind_codes = build_database(db_path, args.codes, args.days)
+        api.db_manager = DatabaseManager(db_path)
+
+        port = free_port()
+        server = start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+
+        results = {}
+        for name, executor in (
+            ("阻塞路径", InlineExecutor()),
+            ("线程池路径", DBExecutor(args.max_concurrency, queue_timeout=120))
+        ):
+            api.db_executor = executor
+            results[name] = asyncio.run(
+                run_clients(base_url, wind_codes, args.clients, args.requests, args.batch_size)
+            )
+            executor.shutdown()
+
+        server.should_exit = True
+
+    print(f"客户端: {args.clients}, 每客户端请求: {args.requests}, 指标: {args.codes} x {args.days} 点, "
+          f"线程池并发上限: {args.max_concurrency}")
+    for name, result in results.items():
+        print(f"{name}: 总耗时 {result['seconds']:.2f}s, 错误 {result['errors']}")
+        print(f"  /batch-data  {summarize(result['latencies']['batch-data'])}")
+        print(f"  /health      {summarize(result['latencies']['health'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+API序列化基准：iterrows逐行转换 vs 向量化转换（标准库json / orjson）
+
+对10k/100k点的序列比较：
+1. 旧路径：DataFrame.iterrows + 逐行strftime + 标准库json
+2. 向量化路径：serialization.frame_payloads（数组切片，日期直接取数据库字符串），
+   分别用标准库json和orjson编码，records和columns两种结构
+
+用法：
+    python benchmarks/bench_serialization.py --points 10000 100000 --repeat 3
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.api import serialization
+
+
+def build_frames(points: int):
+    """构造数据库读取结果：透视后以日期为索引的DataFrame和长表"""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=points)
+    values = np.random.rand(points) * 100
+    indexed = pd.DataFrame({'value': values}, index=dates)
+    long = pd.DataFrame({
+        'wind_code': "BENCH.SH",
+        'field_name': "close",
+        'date': dates.strftime("%Y-%m-%d"),
+        'value': values
+    })
+    return indexed, long
+
+
+def legacy(indexed: pd.DataFrame) -> bytes:
+    data = []
+    for date, row in indexed.iterrows():
+        data.append({
+            "date": date.strftime("%Y-%m-%d"),
+            "value": row['value']
+        })
+    return json.dumps({"data": data}).encode("utf-8")
+
+
+def vectorized(long: pd.DataFrame, orient: str, use_orjson: bool) -> bytes:
+    payload = {"data": serialization.frame_payloads(long, orient)["BENCH.SH"]["close"]}
+    if use_orjson:
+        return serialization.orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API序列化基准")
+    parser.add_argument("--points", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for points in args.points:
+        indexed, long = build_frames(points)
+        cases = [("iterrows + json", lambda: legacy(indexed))]
+        for orient in serialization.ORIENTS:
+            cases.append((f"向量化 {orient} + json", lambda orient=orient: vectorized(long, orient, False)))
+            if serialization.orjson is not None:
+                cases.append((f"向量化 {orient} + orjson", lambda orient=orient: vectorized(long, orient, True)))
+
+        print(f"数据点: {points}")
+        baseline = None
+        for name, func in cases:
+            seconds = measure(func, args.repeat)
+            baseline = baseline or seconds
+            print(f"  {name:28s} {seconds * 1000:9.1f}ms  {baseline / seconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+更新写入基准：逐字段提交 vs 按批次事务提交
+
+模拟一次日常增量更新（每个指标每个字段写入少量新数据点），比较：
+1. 旧写入路径：每个字段单独insert + 每条update_logs单独连接提交
+2. 批量写入路径：DatabaseManager.write_update_batch，每batch_size个指标一个事务
+
+用法：
+    python benchmarks/bench_update_commits.py --indicators 380 --days 5 --batch-size 10
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.database.models_v2 import DatabaseManager
+
+
+FIELDS = ['close', 'val_pe_nonnegative']
+
+
+def build_updates(indicators: int, days: int):
+    """构造每个指标的多字段增量数据"""
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    updates = []
+    for i in range(indicators):
+        field_data = {
+            field: pd.Series(np.random.rand(days) * 100, index=index)
+            for field in FIELDS
+        }
+        updates.append((f"BENCH{i:04d}.SH", field_data))
+    return updates
+
+
+def run_legacy(db: DatabaseManager, updates) -> dict:
+    """旧路径：每个字段一次提交，每条日志一次提交"""
+    commits = 0
+    started = time.perf_counter()
+    for wind_code, field_data in updates:
+        total = 0
+        for field_name, series in field_data.items():
+            db.insert_time_series_data(wind_code, field_name, series)
+            db.log_update(wind_code, field_name, "incremental", "", "", len(series), "success")
+            commits += 2
+            total += len(series)
+        db.log_update(wind_code, None, "incremental", "", "", total, "success")
+        commits += 1
+    return {'seconds': time.perf_counter() - started, 'transactions': commits}
+
+
+def run_batched(db: DatabaseManager, updates, batch_size: int) -> dict:
+    """批量路径：每batch_size个指标一个事务，提交后在写事务之外刷新校验和（与DataUpdater一致）"""
+    transactions = 0
+    checksum_seconds = 0.0
+    started = time.perf_counter()
+    for offset in range(0, len(updates), batch_size):
+        entries = []
+        for wind_code, field_data in updates[offset:offset + batch_size]:
+            logs = [
+                {'field_name': field_name, 'update_type': "incremental",
+                 'records_count': len(series), 'status': "success"}
+                for field_name, series in field_data.items()
+            ]
+            logs.append({'field_name': None, 'update_type': "incremental",
+                         'records_count': sum(len(s) for s in field_data.values()), 'status': "success"})
+            entries.append({'wind_code': wind_code, 'field_data': field_data, 'logs': logs})
+        transactions += db.write_update_batch(entries)['transactions']
+        checksum_started = time.perf_counter()
+        db.refresh_dirty_checksums()
+        checksum_seconds += time.perf_counter() - checksum_started
+    return {
+        'seconds': time.perf_counter() - started,
+        'transactions': transactions,
+        'checksum_seconds': checksum_seconds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新写入基准")
+    parser.add_argument("--indicators", type=int, default=380)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10)
+    args = parser.parse_args()
+
+    updates = build_updates(args.indicators, args.days)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = run_legacy(DatabaseManager(os.path.join(tmp, "legacy", "bench.db")), updates)
+        batched = run_batched(DatabaseManager(os.path.join(tmp, "batched", "bench.db")), updates, args.batch_size)
+
+    print(f"指标数: {args.indicators}, 字段: {len(FIELDS)}, 每字段数据点: {args.days}, 批次大小: {args.batch_size}")
+    print(f"逐字段提交: {legacy['transactions']:5d} 个事务, {legacy['seconds']:.3f}s")
+    print(
+        f"批量提交:   {batched['transactions']:5d} 个事务, {batched['seconds']:.3f}s"
+        f"（其中写事务外刷新校验和 {batched['checksum_seconds']:.3f}s）"
+    )
+    print(f"加速比: {legacy['seconds'] / batched['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
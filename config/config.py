@@ -22,12 +22,57 @@ class Settings(BaseSettings):
     # 数据更新配置
     HISTORICAL_START_YEAR: int = 2000
     UPDATE_BATCH_SIZE: int = 10  # 批量更新大小
-    MAX_RETRY_ATTEMPTS: int = 3
+    MAX_RETRY_ATTEMPTS: int = 8  # 重试队列中单个缺失区间的最大重试次数，超过后标记为dead
+    
+    # 重试队列配置（失败的(指标, 字段, 日期区间)按指数退避重试）
+    RETRY_BACKOFF_BASE_SECONDS: int = 300  # 首次重试等待时间，之后每次翻倍
+    RETRY_BACKOFF_MAX_SECONDS: int = 86400  # 单次退避上限
+    RETRY_DRAIN_INTERVAL_SECONDS: int = 1800  # 调度器处理到期重试项的间隔
+    
+    # 修订刷新配置（替代每周全量重载）
+    REVISION_WINDOW_WSD_DAYS: int = 30  # WSD数据重新获取的尾部窗口（天）
+    REVISION_WINDOW_EDB_DAYS: int = 183  # EDB数据重新获取的尾部窗口（天）
+    DEEP_CHECK_YEARS_PER_RUN: int = 1  # 每次修订刷新滚动深度检查的历史年份数
+    
+    # 更新优先级配置（高优先级指标先更新）
+    PRIORITY_WEIGHT_RELEASE: float = 0.4  # 按发布频率估计应有新数据的权重
+    PRIORITY_WEIGHT_STALENESS: float = 0.2  # 数据陈旧程度的权重
+    PRIORITY_WEIGHT_DEMAND: float = 0.4  # API/报告读取需求的权重
+    PRIORITY_DEMAND_HALF_LIFE_DAYS: float = 14  # 读取需求的半衰期（天）
+    PRIORITY_REPORT_READ_WEIGHT: float = 5.0  # 报告读取一次计入的需求（API读取为1）
+    UPDATE_TIME_BUDGET_SECONDS: int = 0  # 单次更新的时间预算，用完后停止领取新指标，0表示不限
+    
+    # 多进程更新租约配置
+    WORK_LEASE_TTL_SECONDS: int = 600  # 指标租约有效期，持有者崩溃后其他worker在过期后接管
+    WORK_LEASE_POLL_SECONDS: int = 5  # 等待其他进程持有的指标时的重试间隔
     
     # API配置
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     API_WORKERS: int = 1
+    API_DB_MAX_CONCURRENCY: int = 8  # API同时执行的数据库调用数（线程池大小）
+    API_DB_QUEUE_TIMEOUT_SECONDS: float = 30  # 数据库调用排队超时，超时返回503
+    API_STREAM_CHUNK_SIZE: int = 5000  # 流式响应每次从游标读取的行数
+    API_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 响应缓存占用内存上限（字节）
+    API_CACHE_POLL_SECONDS: float = 2  # 轮询序列版本使缓存失效的间隔
+    API_ACCESS_FLUSH_SECONDS: float = 30  # 读取需求在内存中计数，每隔该秒数合并写入series_access
+    API_PAGE_SIZE_DEFAULT: int = 1000  # 分页请求只带cursor时的每页条数
+    API_PAGE_SIZE_MAX: int = 10000  # 分页请求limit的上限
+    API_SERVER_TIMING: bool = True  # 响应中返回Server-Timing头（db/transform/serialize各阶段耗时）
+    API_SLOW_REQUEST_MS: float = 1000  # 超过此耗时的请求记入慢请求日志
+    API_SLOW_LOG_SIZE: int = 100  # 慢请求日志保留的条数
+    API_PROFILE_SAMPLE_RATE: float = 0.0  # 用cProfile剖析的请求比例（0关闭），慢请求的剖析结果附在慢请求日志中
+    API_PUSH_POLL_SECONDS: float = 1  # 轮询变更序号向订阅者推送新数据的间隔
+    API_PUSH_MAX_POINTS: int = 1000  # 每条推送通知携带的数据点上限，超出时客户端用/changes补齐
+    API_PUSH_QUEUE_SIZE: int = 1000  # 每个订阅者的待发送通知上限，溢出时要求客户端重新同步
+    API_PUSH_KEEPALIVE_SECONDS: float = 15  # 没有通知时发送心跳注释的间隔
+    API_STATUS_PROBE_SECONDS: float = 60  # 后台探测Wind连接的间隔，/status返回最近一次探测结果
+    API_STATUS_PROBE_TIMEOUT_SECONDS: float = 30  # 单次探测超时，超时记为连接失败
+    API_ADMISSION_HEAVY_POINTS: int = 200000  # 预估扫描点数达到此值的查询为大查询，需要准入（确认执行的分析也按大查询处理）
+    API_ADMISSION_HEAVY_CONCURRENCY: int = 2  # 同时执行的大查询数（应小于API_DB_MAX_CONCURRENCY，为轻查询保留线程）
+    API_ADMISSION_QUEUE_SIZE: int = 16  # 排队等待的大查询上限，已满时返回429
+    API_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10  # 大查询排队超时，超时返回429
+    API_ADMISSION_PER_CLIENT: int = 2  # 同一客户端同时执行和排队的大查询上限
     
     # 日志配置
     LOG_LEVEL: str = "INFO"
@@ -38,7 +83,14 @@ class Settings(BaseSettings):
     # 调度器配置
     DAILY_UPDATE_TIME: str = "18:00"  # 每日更新时间
     WEEKLY_UPDATE_TIME: str = "02:00"  # 每周全量更新时间
-    SCHEDULER_CHECK_INTERVAL: int = 60  # 调度器检查间隔（秒）
+    SCHEDULER_CHECK_INTERVAL: int = 60  # 调度器单次休眠上限（秒），用于应对系统时钟跳变
+    SCHEDULER_MISFIRE_POLICY: str = "run_once"  # 停机期间错过的任务: run_once(补跑一次) 或 skip(跳过)
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 3600  # 错过时间在此范围内的任务总是补跑
+    SCHEDULER_LOCK_TTL_SECONDS: int = 60  # 调度器单实例锁有效期，持有者崩溃后备用实例在过期后接管
+    API_EMBEDDED_SCHEDULER: bool = False  # API进程内同时运行调度器（多worker时只有一个worker获得锁）
+    
+    # 分析会话配置
+    ANALYSIS_SESSION_TTL_SECONDS: int = 3600  # 待确认的分析会话有效期
     
     # 数据验证配置
     MAX_MISSING_DAYS: int = 7  # 最大允许缺失天数
@@ -19,6 +19,7 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from src.database.models_v2 import DatabaseManager
+from config.config import settings
 
 
 def generate_monthly_net_value_report():
@@ -89,6 +90,13 @@ def generate_monthly_net_value_report():
                 all_data[chinese_name] = df['value']
                 print(f"  ✓ 获取 {len(df)} 条记录")
 
+        # 报告用到的序列计入读取需求，更新时优先处理
+        db.record_series_access(
+            list(indicators), source="report",
+            weight=settings.PRIORITY_REPORT_READ_WEIGHT,
+            half_life_days=settings.PRIORITY_DEMAND_HALF_LIFE_DAYS
+        )
+
         if not all_data:
             print("❌ 没有找到任何数据")
             return
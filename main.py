@@ -28,6 +28,8 @@ from config.config import settings, ensure_directories
 from src.database.models_v2 import DatabaseManager
 from src.data_fetcher.wind_client_v2 import WindDataFetcher
 from src.scheduler.data_updater_v2 import DataUpdater
+from src.scheduler.drift_verifier import DriftVerifier
+from src.scheduler.scheduler_service import SchedulerService
 
 
 def setup_logging():
@@ -130,6 +132,75 @@ def run_smart_update():
         logger.warning(f"❌ 失败指标数: {summary['failed_indicators']}")
 
 
+def dispatch_update(data_updater, update_type):
+    """按更新类型调用DataUpdater的对应方法"""
+    if update_type == "smart":
+        data_updater.smart_incremental_update()
+    elif update_type == "full":
+        data_updater.full_historical_update(settings.HISTORICAL_START_YEAR)
+    elif update_type == "retry":
+        data_updater.retry_failed_indicators()
+    elif update_type == "revision":
+        data_updater.revision_refresh()
+    else:
+        data_updater.incremental_update()
+
+
+def run_update_worker(update_type, run_id, log_level, time_budget_seconds):
+    """多进程更新的worker进程入口：与同一run_id的其他worker通过租约划分指标"""
+    settings.LOG_LEVEL = log_level
+    settings.UPDATE_TIME_BUDGET_SECONDS = time_budget_seconds
+    logger = setup_logging()
+    logger.info(f"更新worker启动 (pid={os.getpid()}, run_id={run_id})")
+    
+    db_manager = DatabaseManager()
+    data_fetcher = WindDataFetcher(
+        mcp_host=settings.WIND_MCP_HOST,
+        mcp_port=settings.WIND_MCP_PORT
+    )
+    data_updater = DataUpdater(db_manager, data_fetcher, run_id=run_id)
+    dispatch_update(data_updater, update_type)
+
+
+def run_parallel_update(update_type, workers):
+    """
+    启动多个更新worker进程：
+    - 所有worker共享一个run_id，通过数据库中的指标租约划分工作，不会重复处理
+    - worker崩溃时，其持有的指标在租约过期后由其他worker接管
+    """
+    import uuid
+    import multiprocessing
+    
+    logger = logging.getLogger(__name__)
+    
+    # 指标加载只在父进程做一次
+    init_database()
+    
+    run_id = uuid.uuid4().hex
+    logger.info(f"🚀 启动 {workers} 个更新worker ({update_type}, run_id={run_id})")
+    
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(
+            target=run_update_worker,
+            args=(update_type, run_id, settings.LOG_LEVEL, settings.UPDATE_TIME_BUDGET_SECONDS),
+            name=f"update-worker-{i + 1}"
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    
+    failed = [p.name for p in processes if p.exitcode != 0]
+    if failed:
+        logger.warning(f"❌ 以下worker异常退出: {', '.join(failed)}")
+    
+    summary = DataUpdater(DatabaseManager(), None).get_update_summary()
+    logger.info(f"✅ 多进程更新完成 - 数据点总数: {summary['data_points']:,}")
+
+
 def run_legacy_update(update_type="incremental"):
     """运行传统数据更新（保留向后兼容）"""
     logger = logging.getLogger(__name__)
@@ -139,12 +210,7 @@ def run_legacy_update(update_type="incremental"):
     data_fetcher = test_wind_connection()
     data_updater = DataUpdater(db_manager, data_fetcher)
     
-    if update_type == "full":
-        data_updater.full_historical_update(settings.HISTORICAL_START_YEAR)
-    elif update_type == "retry":
-        data_updater.retry_failed_indicators(settings.HISTORICAL_START_YEAR)
-    else:
-        data_updater.incremental_update()
+    dispatch_update(data_updater, update_type)
     
     # 显示更新摘要
     summary = data_updater.get_update_summary()
@@ -155,16 +221,55 @@ def run_legacy_update(update_type="incremental"):
         logger.warning(f"失败指标数: {summary['failed_indicators']}")
 
 
+def run_drift_verification(mode="sample", wind_codes=None, years=None, repair=False):
+    """检测本地数据与Wind的漂移，可选地按修复计划重新获取不一致的序列年份"""
+    logger = logging.getLogger(__name__)
+    logger.info(f"开始漂移检测（{mode}模式）...")
+    
+    db_manager = DatabaseManager()
+    data_fetcher = test_wind_connection()
+    verifier = DriftVerifier(db_manager, data_fetcher)
+    
+    report = verifier.verify(wind_codes=wind_codes, years=years, mode=mode)
+    
+    # 保存漂移报告
+    import json
+    from datetime import datetime
+    os.makedirs("reports", exist_ok=True)
+    report_path = os.path.join("reports", f"drift_report_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    print(f"\n=== 数据漂移报告（{mode}） ===")
+    print(f"检查序列年份: {report['checked_series_years']}")
+    print(f"不一致: {len(report['mismatches'])}")
+    print(f"未能验证: {len(report['unverified'])}")
+    for mismatch in report['mismatches'][:20]:
+        print(f"  {mismatch['wind_code']}.{mismatch['field_name']} {mismatch['year']}: {mismatch['reason']}")
+    if len(report['mismatches']) > 20:
+        print(f"  ... 其余 {len(report['mismatches']) - 20} 个见报告文件")
+    
+    print(f"\n修复计划: {len(report['repair_plan'])} 个请求")
+    for item in report['repair_plan'][:20]:
+        print(f"  {item['wind_code']} {','.join(item['fields'])}: {item['start_date']} - {item['end_date']}")
+    print(f"\n报告已保存: {report_path}\n")
+    
+    if repair and report['repair_plan']:
+        data_updater = DataUpdater(db_manager, data_fetcher)
+        data_updater.repair_ranges(report['repair_plan'])
+
+
 def run_api_server():
     """运行API服务器"""
     logger = logging.getLogger(__name__)
     logger.info("启动API服务器...")
     
     import uvicorn
-    from src.api.main import app
     
+    # 多个worker需要以导入字符串传入应用，每个worker进程各自导入；
+    # 调度器作为独立服务运行（scheduler命令），不在API进程中启动
     uvicorn.run(
-        app,
+        "src.api.main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
         workers=settings.API_WORKERS,
@@ -172,20 +277,22 @@ def run_api_server():
     )
 
 
-def run_scheduler():
-    """运行调度器"""
+def run_scheduler(standby=False):
+    """运行调度器服务（同一数据库只有一个实例运行定时任务）"""
     logger = logging.getLogger(__name__)
     logger.info("启动数据更新调度器...")
     
     db_manager = init_database()
     data_fetcher = test_wind_connection()
     data_updater = DataUpdater(db_manager, data_fetcher)
+    service = SchedulerService(db_manager, data_updater, lock_ttl=settings.SCHEDULER_LOCK_TTL_SECONDS)
     
     try:
-        data_updater.run_scheduler()
+        if not service.run(standby=standby):
+            sys.exit(1)
     except KeyboardInterrupt:
         logger.info("收到中断信号，正在停止调度器...")
-        data_updater.stop_scheduler()
+        service.stop()
 
 
 def show_status():
@@ -205,6 +312,10 @@ def show_status():
         print(f"多字段指标数: {summary['multi_field_indicators']}")
         print(f"数据点总数: {summary['data_points']:,}")
         
+        retry_summary = db_manager.get_retry_queue_summary()
+        print(f"重试队列: 待重试 {retry_summary.get('pending', 0)}（已到期 {retry_summary['due']}），"
+              f"已放弃 {retry_summary.get('dead', 0)}")
+        
         print("\n指标类别分布:")
         for category, count in summary['category_stats'].items():
             print(f"  {category}: {count}")
@@ -307,19 +418,103 @@ def show_field_analysis():
         print(f"字段分析错误: {e}")
 
 
+def show_update_runs(strategy=None, limit=20):
+    """显示最近的更新运行记录（分阶段耗时、吞吐量和请求延迟分布）"""
+    db_manager = DatabaseManager()
+    runs = db_manager.get_update_runs(strategy=strategy, limit=limit)
+    
+    print("\n=== 最近的更新运行 ===")
+    if not runs:
+        print("暂无运行记录")
+        return
+    
+    print(f"{'开始时间':<20} {'策略':<26} {'状态':<8} {'耗时':>8} {'指标':>6} {'请求':>6} "
+          f"{'失败字段':>5} {'数据点':>9} {'点/秒':>8}  planning/fetch/decode/write/log(s)")
+    for run in runs:
+        duration = run['duration_seconds'] or 0
+        throughput = run['points_written'] / duration if duration else 0
+        phases = "/".join(
+            f"{run[f'{phase}_seconds'] or 0:.1f}"
+            for phase in ('planning', 'fetch', 'decode', 'write', 'log')
+        )
+        print(f"{run['started_at'][:19]:<20} {run['strategy']:<26} {run['status']:<8} {duration:>7.1f}s "
+              f"{run['indicators']:>6} {run['requests']:>6} {run['failed']:>5} "
+              f"{run['points_written']:>9,} {throughput:>8.1f}  {phases}")
+    
+    # 最近一次运行的请求延迟分布
+    latest = runs[0]
+    for data_source, histogram in latest['histograms'].get('fetch_latency', {}).items():
+        mean = histogram['sum'] / histogram['total'] if histogram['total'] else 0
+        buckets = ", ".join(
+            f"{'≤' + format(bucket['le'], 'g') + 's' if bucket['le'] is not None else '>'}: {bucket['count']}"
+            for bucket in histogram['buckets'] if bucket['count']
+        )
+        print(f"\n{data_source} 请求延迟（{latest['started_at'][:19]}，{histogram['total']} 次，平均 {mean:.2f}s）: {buckets}")
+    
+    print()
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="金融数据管理系统（智能增量更新版本）")
     parser.add_argument(
         "command",
-        choices=["init", "update", "server", "scheduler", "status", "fields"],
+        choices=["init", "update", "server", "scheduler", "status", "fields", "verify", "runs"],
         help="执行命令 - update: 智能增量更新（推荐）"
     )
     parser.add_argument(
         "--update-type",
-        choices=["smart", "incremental", "full", "retry"],
+        choices=["smart", "incremental", "full", "retry", "revision"],
         default="smart",
-        help="更新类型: smart(智能-默认), incremental(增量), full(全量), retry(重试失败)"
+        help="更新类型: smart(智能-默认), incremental(增量), full(全量), retry(立即处理重试队列), revision(修订刷新)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="更新worker进程数，多个worker通过数据库租约划分指标"
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=int,
+        help="更新的时间预算（秒），用完后停止领取新指标；指标按优先级处理，重要数据先更新"
+    )
+    parser.add_argument(
+        "--verify-mode",
+        choices=["sample", "full"],
+        default="sample",
+        help="漂移检测模式: sample(月末采样-默认), full(完整年度数据)"
+    )
+    parser.add_argument(
+        "--codes",
+        nargs="+",
+        help="漂移检测只检查指定的Wind代码"
+    )
+    parser.add_argument(
+        "--years",
+        nargs="+",
+        type=int,
+        help="漂移检测只检查指定年份"
+    )
+    parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="漂移检测后按修复计划重新获取不一致的序列年份"
+    )
+    parser.add_argument(
+        "--strategy",
+        help="runs命令只显示指定策略（更新方法名，如 incremental_update）"
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="runs命令显示的记录数"
+    )
+    parser.add_argument(
+        "--standby",
+        action="store_true",
+        help="scheduler命令在已有实例运行时等待接管，而不是退出"
     )
     parser.add_argument(
         "--log-level",
@@ -332,11 +527,13 @@ def main():
     
     # 设置日志级别
     settings.LOG_LEVEL = args.log_level
+    if args.time_budget is not None:
+        settings.UPDATE_TIME_BUDGET_SECONDS = args.time_budget
     logger = setup_logging()
     
     logger.info(f"启动命令: {args.command}")
     if args.command == "update":
-        logger.info(f"更新类型: {args.update_type}")
+        logger.info(f"更新类型: {args.update_type}, worker数: {args.workers}")
     
     try:
         if args.command == "init":
@@ -344,7 +541,9 @@ def main():
             logger.info("数据库初始化完成")
             
         elif args.command == "update":
-            if args.update_type == "smart":
+            if args.workers > 1:
+                run_parallel_update(args.update_type, args.workers)
+            elif args.update_type == "smart":
                 run_smart_update()
             else:
                 run_legacy_update(args.update_type)
@@ -353,7 +552,7 @@ def main():
             run_api_server()
             
         elif args.command == "scheduler":
-            run_scheduler()
+            run_scheduler(args.standby)
             
         elif args.command == "status":
             show_status()
@@ -361,6 +560,12 @@ def main():
         elif args.command == "fields":
             show_field_analysis()
             
+        elif args.command == "verify":
+            run_drift_verification(args.verify_mode, args.codes, args.years, args.repair)
+            
+        elif args.command == "runs":
+            show_update_runs(args.strategy, args.limit)
+            
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
     except Exception as e:
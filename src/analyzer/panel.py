@@ -0,0 +1,48 @@
+"""
+面板数据（日期 × 指标矩阵）
+
+由长表（wind_code, field_name, date, value）一次散射构建对齐的二维数组，
+前值填充同样基于NumPy数组计算，不逐列调用pandas。
+"""
+
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+from src.utils.request_timing import timed
+
+
+@timed('transform')
+def build_panel(df: pd.DataFrame, codes: List[str]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    将单个字段的长表构建为日期 × 指标矩阵
+
+    Args:
+        df: 长表，date为YYYY-MM-DD字符串
+        codes: 列顺序，只保留其中有数据的指标
+
+    Returns:
+        (升序的datetime64[D]日期数组, 列对应的wind_code列表, float64矩阵，缺失为NaN)
+    """
+    present = set(df['wind_code'].unique())
+    columns = [code for code in codes if code in present]
+    if df.empty:
+        return np.array([], dtype='datetime64[D]'), columns, np.empty((0, len(columns)))
+
+    # YYYY-MM-DD字符串的字典序即日期顺序
+    unique_dates, date_index = np.unique(df['date'].to_numpy(), return_inverse=True)
+    column_index = pd.Index(columns).get_indexer(df['wind_code'])
+
+    matrix = np.full((len(unique_dates), len(columns)), np.nan)
+    matrix[date_index, column_index] = df['value'].to_numpy(dtype=np.float64, na_value=np.nan)
+    return unique_dates.astype('datetime64[D]'), columns, matrix
+
+
+@timed('transform')
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """按列用最近一个有效值填充缺失（首个有效值之前保持NaN）"""
+    if matrix.size == 0:
+        return matrix
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.where(np.isnan(matrix), 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return matrix[last_valid, np.arange(matrix.shape[1])]
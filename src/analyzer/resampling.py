@@ -0,0 +1,147 @@
+"""
+时间序列重采样与可视化降采样（用于图表）
+
+全部基于NumPy数组计算：
+1. 按周期末重采样（W/M/Q/Y），聚合方式 last/mean/min/max/ohlc
+2. LTTB（Largest-Triangle-Three-Buckets）降采样到N个点，保留曲线形状
+"""
+
+from typing import Dict, Tuple, Optional
+import numpy as np
+from src.utils.request_timing import timed
+
+
+PERIODS = ('W', 'M', 'Q', 'Y')
+AGGREGATIONS = ('last', 'mean', 'min', 'max', 'ohlc')
+
+
+def period_keys(dates: np.ndarray, period: str) -> np.ndarray:
+    """计算每个日期所属周期的整数键（相邻日期键相同即属于同一周期）"""
+    if period == 'W':
+        # 1970-01-01是周四，+3后按7天整除得到以周一开始的周
+        return (dates.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    if period == 'M':
+        return dates.astype('datetime64[M]').astype(np.int64)
+    if period == 'Q':
+        return dates.astype('datetime64[M]').astype(np.int64) // 3
+    if period == 'Y':
+        return dates.astype('datetime64[Y]').astype(np.int64)
+    raise ValueError(f"不支持的周期: {period}")
+
+
+def resample(
+    dates: np.ndarray, values: np.ndarray, period: str, how: str = "last"
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    按周期末重采样
+
+    Args:
+        dates: 升序的datetime64[D]数组
+        values: 对应的float64数值（NaN会被忽略）
+        period: 'W', 'M', 'Q' 或 'Y'
+        how: 'last', 'mean', 'min', 'max' 或 'ohlc'
+
+    Returns:
+        (每个周期最后一个观测日期, {列名: 数组})，ohlc返回open/high/low/close四列，其余返回value列
+    """
+    valid = ~np.isnan(values)
+    dates, values = dates[valid], values[valid]
+    if len(values) == 0:
+        empty = np.array([], dtype=np.float64)
+        columns = ('open', 'high', 'low', 'close') if how == 'ohlc' else ('value',)
+        return dates, {column: empty for column in columns}
+
+    keys = period_keys(dates, period)
+    starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+    ends = np.concatenate((starts[1:], [len(values)]))
+
+    # 周期标签取该周期最后一个实际观测日期（月末/季末可能不是交易日）
+    period_dates = dates[ends - 1]
+    if how == 'last':
+        return period_dates, {'value': values[ends - 1]}
+    if how == 'mean':
+        return period_dates, {'value': np.add.reduceat(values, starts) / (ends - starts)}
+    if how == 'min':
+        return period_dates, {'value': np.minimum.reduceat(values, starts)}
+    if how == 'max':
+        return period_dates, {'value': np.maximum.reduceat(values, starts)}
+    if how == 'ohlc':
+        return period_dates, {
+            'open': values[starts],
+            'high': np.maximum.reduceat(values, starts),
+            'low': np.minimum.reduceat(values, starts),
+            'close': values[ends - 1]
+        }
+    raise ValueError(f"不支持的聚合方式: {how}")
+
+
+def lttb(dates: np.ndarray, values: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    LTTB降采样，返回保留点的下标
+
+    首尾点固定保留，其余点分成threshold-2个桶，每个桶选出与上一个选中点、
+    下一个桶均值构成三角形面积最大的点。桶内计算向量化，循环次数为threshold。
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = dates.astype('datetime64[D]').astype(np.float64)
+    y = values.astype(np.float64)
+
+    # 中间n-2个点分为threshold-2个桶的边界
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # 下一个桶的均值点（最后一个桶用末点）
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+@timed('transform')
+def aggregate(
+    dates: np.ndarray,
+    values: np.ndarray,
+    period: Optional[str] = None,
+    how: str = "last",
+    points: Optional[int] = None
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    图表数据聚合：先按周期重采样（可选），再用LTTB降采样到不超过points个点（可选，不适用于ohlc）
+
+    Returns:
+        (日期数组, {列名: 数组})
+    """
+    valid = ~np.isnan(values)
+    dates, values = dates[valid], values[valid]
+
+    if period:
+        dates, columns = resample(dates, values, period, how)
+    else:
+        columns = {'value': values}
+
+    if points and 'value' in columns:
+        keep = lttb(dates, columns['value'], points)
+        dates = dates[keep]
+        columns = {name: column[keep] for name, column in columns.items()}
+
+    return dates, columns
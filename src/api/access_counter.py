@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable
+from src.database.models_v2 import DatabaseManager
+
+
+class AccessCounter:
+    """
+    API读取需求的内存计数
+
+    读取请求（包括304和缓存命中）只在内存中计数，不写数据库；
+    flush_access_counts每隔一段时间把累计的计数合并为一次写入series_access。
+    请求可能在事件循环或db_executor线程中记录，计数用锁保护。
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, wind_codes: Iterable[str]):
+        """同一次请求中的重复代码只计一次"""
+        with self._lock:
+            self._counts.update(dict.fromkeys(wind_codes, 1))
+
+    def drain(self) -> Dict[str, int]:
+        """取出并清空累计的计数"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+    def restore(self, counts: Dict[str, int]):
+        """写入失败时把计数放回，下一次一起写入"""
+        with self._lock:
+            self._counts.update(counts)
+
+
+def flush_access_counts(counter: AccessCounter, db_manager: DatabaseManager, half_life_days: float) -> int:
+    """把累计的读取计数写入series_access（一次事务），返回写入的读取次数"""
+    counts = counter.drain()
+    if not counts:
+        return 0
+    try:
+        db_manager.record_series_access_counts(counts, source="api", half_life_days=half_life_days)
+    except Exception:
+        counter.restore(counts)
+        raise
+    return sum(counts.values())
+
+
+async def run_access_flusher(
+    counter: AccessCounter, db_executor, db_manager: DatabaseManager, interval: float, half_life_days: float
+):
+    """后台任务：每interval秒写入一次读取计数，写入失败时计数保留到下一次"""
+    logger = logging.getLogger(__name__)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await db_executor.run(flush_access_counts, counter, db_manager, half_life_days)
+        except Exception as e:
+            logger.warning(f"写入读取需求失败，下次重试: {e}")
@@ -0,0 +1,166 @@
+import asyncio
+import math
+import time
+from typing import Dict, Any, Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+
+class AdmissionRejected(HTTPException):
+    """重查询排队已满、等待超时或客户端超过并发上限，返回429让客户端稍后重试"""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    持有准入名额的流式响应，响应结束后释放名额
+    
+    在__call__的finally中释放而不是在响应体生成器中：客户端在响应开始前断开时，
+    Starlette会在响应体生成器第一次运行之前取消发送任务，生成器的finally不会执行。
+    """
+    
+    def __init__(self, response: StreamingResponse, ticket: "AdmissionTicket"):
+        super().__init__(response.body_iterator, status_code=response.status_code, background=response.background)
+        self.media_type = response.media_type
+        self.raw_headers = response.raw_headers
+        self.ticket = ticket
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket._release()
+
+
+class AdmissionTicket:
+    """一次准入的名额，查询完成后释放；流式响应通过attach把释放推迟到响应发送结束"""
+
+    def __init__(self, controller: Optional["AdmissionController"] = None, client: Optional[str] = None):
+        self.controller = controller
+        self.client = client
+        self.started = time.perf_counter()
+        self._attached = False
+        self._released = controller is None
+
+    def attach(self, response: StreamingResponse) -> StreamingResponse:
+        """名额随流式响应保持，响应发送完成、失败或被取消（客户端断开）后释放"""
+        if self._released:
+            return response
+        self._attached = True
+        return AdmittedStreamingResponse(response, self)
+
+    def release(self):
+        if not self._attached:
+            self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.controller._finish(self)
+
+
+class AdmissionController:
+    """
+    重查询准入控制（只在事件循环中访问，不需要加锁）
+
+    预估扫描点数低于heavy_points的查询（元数据、小范围查询）直接放行，不排队。
+    重查询最多同时执行max_concurrency个，最多queue_size个排队，排队超过queue_timeout秒、
+    队列已满或同一客户端同时运行和排队的重查询达到per_client个时返回429，
+    Retry-After按近期重查询的平均耗时和排队长度估算。
+    """
+
+    def __init__(
+        self,
+        heavy_points: int = 200000,
+        max_concurrency: int = 2,
+        queue_size: int = 16,
+        queue_timeout: float = 10,
+        per_client: int = 2
+    ):
+        self.heavy_points = heavy_points
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        # 信号量需要在事件循环中创建，首次调用时初始化
+        self._semaphore = None
+        self._clients: Dict[str, int] = {}
+        self._average_seconds = 1.0
+        self.stats = {'cheap': 0, 'heavy': 0, 'rejected': 0, 'running': 0, 'waiting': 0}
+
+    def is_heavy(self, cost: int) -> bool:
+        return cost >= self.heavy_points
+
+    def retry_after(self) -> int:
+        """按平均耗时估算排队中的重查询全部完成所需的秒数"""
+        rounds = (self.stats['waiting'] + 1) / self.max_concurrency
+        return max(1, math.ceil(self._average_seconds * rounds))
+
+    def _reject(self, detail: str):
+        self.stats['rejected'] += 1
+        raise AdmissionRejected(detail, self.retry_after())
+
+    async def admit(self, client: str, cost: int) -> AdmissionTicket:
+        """
+        申请执行名额，轻查询返回不占名额的ticket
+
+        Raises:
+            AdmissionRejected: 重查询无法在限制内执行
+        """
+        if not self.is_heavy(cost):
+            self.stats['cheap'] += 1
+            return AdmissionTicket()
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._clients.get(client, 0) >= self.per_client:
+            self._reject(f"同一客户端同时执行的大查询不能超过{self.per_client}个，请稍后重试")
+        if self.stats['running'] + self.stats['waiting'] >= self.max_concurrency + self.queue_size:
+            self._reject("大查询排队已满，请缩小查询范围或稍后重试")
+
+        self._clients[client] = self._clients.get(client, 0) + 1
+        self.stats['waiting'] += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._leave(client)
+            self._reject("大查询排队超时，请缩小查询范围或稍后重试")
+        except BaseException:
+            self._leave(client)
+            raise
+        finally:
+            self.stats['waiting'] -= 1
+
+        self.stats['heavy'] += 1
+        self.stats['running'] += 1
+        return AdmissionTicket(self, client)
+
+    def _leave(self, client: str):
+        remaining = self._clients.get(client, 0) - 1
+        if remaining > 0:
+            self._clients[client] = remaining
+        else:
+            self._clients.pop(client, None)
+
+    def _finish(self, ticket: AdmissionTicket):
+        # 指数加权平均耗时，用于估算Retry-After
+        elapsed = time.perf_counter() - ticket.started
+        self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+        self.stats['running'] -= 1
+        self._leave(ticket.client)
+        self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """准入统计和当前排队情况"""
+        return dict(
+            self.stats,
+            heavy_points=self.heavy_points,
+            max_concurrency=self.max_concurrency,
+            average_heavy_seconds=round(self._average_seconds, 3)
+        )
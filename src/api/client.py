@@ -0,0 +1,117 @@
+import requests
+import pandas as pd
+from typing import List, Optional, Dict, Any
+
+# pyarrow为可选依赖，未安装时使用json格式
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class FinancialDataClient:
+    """
+    金融数据API客户端
+
+    安装pyarrow时默认以Arrow IPC格式获取数据，直接读入pandas，
+    避免逐点JSON序列化/解析；否则回退到json格式。
+    """
+
+    def __init__(self, api_url: str = "http://localhost:8000", timeout: float = 300):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get_indicators(self, category: Optional[str] = None) -> pd.DataFrame:
+        """获取指标列表"""
+        params = {"category": category} if category else {}
+        response = self.session.get(f"{self.api_url}/indicators", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return pd.DataFrame(response.json()['indicators'])
+
+    def get_batch_data(
+        self,
+        wind_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        layout: str = "wide",
+        format: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        批量获取时间序列数据
+
+        Args:
+            layout: 'wide' 返回以日期为索引、每个序列一列（列名为"wind_code:field"）的DataFrame；
+                    'long' 返回 date, wind_code, field, value 四列
+            format: 'arrow'、'parquet' 或 'json'，默认有pyarrow时用arrow
+            fields: 只获取这些字段（如 ['close']），默认全部字段
+        """
+        format = format or ('arrow' if pa is not None else 'json')
+        payload = {
+            "wind_codes": wind_codes,
+            "start_date": start_date,
+            "end_date": end_date,
+            "format": format,
+            "layout": layout,
+            "fields": fields
+        }
+        response = self.session.post(f"{self.api_url}/batch-data", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+        if format == 'json':
+            return self._json_frame(response.json()['data'], layout)
+
+        df = read_columnar(response.content, format)
+        return df.set_index('date') if layout == 'wide' else df
+
+    def get_data(
+        self,
+        wind_code: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        format: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """获取单个指标的时间序列（以日期为索引、每个字段一列的DataFrame）"""
+        df = self.get_batch_data([wind_code], start_date, end_date, layout="wide", format=format, fields=fields)
+        prefix = f"{wind_code}:"
+        return df.rename(columns=lambda column: column[len(prefix):] if column.startswith(prefix) else column)
+
+    @staticmethod
+    def _json_frame(data: Dict[str, Dict[str, List[Dict[str, Any]]]], layout: str) -> pd.DataFrame:
+        frames = [
+            pd.DataFrame(points).assign(wind_code=wind_code, field=field)
+            for wind_code, series in data.items()
+            for field, points in series.items() if points
+        ]
+        if not frames:
+            return pd.DataFrame(columns=['date', 'wind_code', 'field', 'value'])
+
+        df = pd.concat(frames, ignore_index=True)
+        df['date'] = pd.to_datetime(df['date'])
+        if layout == 'wide':
+            df['series'] = df['wind_code'] + ':' + df['field']
+            return df.pivot(index='date', columns='series', values='value').rename_axis(columns=None)
+        return df[['date', 'wind_code', 'field', 'value']]
+
+
+def read_columnar(content: bytes, format: str = "arrow") -> pd.DataFrame:
+    """
+    将Arrow IPC/Parquet响应读入DataFrame
+
+    直接在响应缓冲区上读取，数值列按块转换（split_blocks + self_destruct），
+    无缺失值的float64列不需要复制。
+    """
+    if pa is None:
+        raise ImportError("读取arrow/parquet格式需要安装pyarrow")
+
+    buffer = pa.py_buffer(content)
+    if format == "parquet":
+        table = pq.read_table(pa.BufferReader(buffer))
+    else:
+        table = pa.ipc.open_stream(buffer).read_all()
+
+    return table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
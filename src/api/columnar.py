@@ -0,0 +1,85 @@
+import io
+import numpy as np
+import pandas as pd
+from typing import List
+from src.utils.request_timing import timed
+
+# pyarrow为可选依赖，未安装时arrow/parquet格式不可用
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+MEDIA_TYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+LAYOUTS = ('long', 'wide')
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+@timed('transform')
+def build_table(df: pd.DataFrame, layout: str = "long") -> "pa.Table":
+    """
+    将长表（wind_code, field_name, date, value）直接由NumPy数组构建为Arrow表
+
+    - long: date(date32), wind_code(字典编码), field(字典编码), value(float64)，每行一个数据点
+    - wide: date(date32) + 每个序列一列float64（列名为"wind_code:field"），缺失为null
+    """
+    dates = pd.to_datetime(df['date'].to_numpy(), format="%Y-%m-%d").to_numpy().astype('datetime64[D]')
+    values = df['value'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if layout == "wide":
+        series, series_names = pd.factorize(df['wind_code'] + ':' + df['field_name'], sort=False)
+        unique_dates, date_index = np.unique(dates, return_inverse=True)
+
+        # 按(日期, 序列)位置散射到二维数组，未出现的位置保持NaN
+        matrix = np.full((len(unique_dates), len(series_names)), np.nan)
+        matrix[date_index, series] = values
+        return matrix_table(unique_dates, [str(name) for name in series_names], matrix)
+
+    return pa.Table.from_arrays(
+        [
+            pa.array(dates),
+            _dictionary(df['wind_code']),
+            _dictionary(df['field_name']),
+            pa.array(values, from_pandas=True)
+        ],
+        names=['date', 'wind_code', 'field', 'value']
+    )
+
+
+def matrix_table(dates: np.ndarray, names: List[str], matrix: np.ndarray) -> "pa.Table":
+    """日期 × 序列矩阵构建为宽表：date(date32) + 每列float64，NaN为null"""
+    columns = [pa.array(dates.astype('datetime64[D]'))]
+    columns += [pa.array(matrix[:, i], from_pandas=True) for i in range(len(names))]
+    return pa.Table.from_arrays(columns, names=['date'] + list(names))
+
+
+def _dictionary(column: pd.Series) -> "pa.DictionaryArray":
+    """重复度高的字符串列编码为字典数组"""
+    indices, names = pd.factorize(column, sort=False)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(indices.astype(np.int32)), pa.array(np.asarray(names, dtype=object), type=pa.string())
+    )
+
+
+@timed('serialize')
+def encode_table(table: "pa.Table", fmt: str) -> bytes:
+    """序列化为Arrow IPC流或Parquet文件"""
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,61 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Any, List, Optional
+from fastapi import Request
+from fastapi.responses import Response
+
+
+class SeriesValidators:
+    """
+    条件请求校验值（ETag / Last-Modified）
+
+    由请求涉及序列的版本号（series_versions，每次写入递增）和请求参数生成，
+    判断是否命中只需查询版本表，不读取数据表。批量请求的ETag由所有序列的版本组合而成，
+    任一序列写入后都会变化。
+    """
+
+    def __init__(self, wind_codes: List[str], versions: Dict[str, Dict[str, Any]], variant: str):
+        # 从未记录过写入的序列（旧数据库）版本视为0，下一次写入后ETag即会变化
+        stamp = ";".join(
+            f"{wind_code}:{versions.get(wind_code, {}).get('version', 0)}" for wind_code in wind_codes
+        )
+        digest = hashlib.sha1(f"{variant}|{stamp}".encode("utf-8")).hexdigest()[:20]
+        self.etag = f'W/"{digest}"'
+
+        # 所有序列都有写入时间时才给出Last-Modified
+        updated = [versions.get(wind_code, {}).get('updated_at') for wind_code in wind_codes]
+        self.last_modified = int(max(updated)) if updated and all(updated) else None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """客户端缓存是否仍然有效（If-None-Match优先于If-Modified-Since）"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # 弱比较：忽略W/前缀
+            return "*" in tags or self.etag[2:] in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+
+def request_variant(*parts: Optional[str]) -> str:
+    """
+    将影响响应内容的请求参数拼接为字符串
+
+    不做大小写转换：游标（base64）和字段名区分大小写，格式等参数在调用前已校验或规范化。
+    """
+    return "|".join("" if part is None else str(part) for part in parts)
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any, Dict
+from fastapi import HTTPException
+from src.utils import request_timing
+
+
+class DBExecutorBusy(HTTPException):
+    """数据库线程池排队超时，返回503让客户端稍后重试"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail="数据库繁忙，请稍后重试",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class DBExecutor:
+    """
+    API的异步数据访问层
+
+    同步的DatabaseManager调用（sqlite3 + pandas）在有界线程池中执行，不阻塞事件循环，
+    慢查询不会拖住/health等其他请求。同时执行的调用数不超过max_concurrency，
+    排队等待超过queue_timeout秒的请求返回503。
+    """
+
+    def __init__(self, max_concurrency: int = 8, queue_timeout: float = 30):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="api-db"
+        )
+        # 信号量需要在事件循环中创建，首次调用时初始化
+        self._semaphore = None
+        self.stats = {'calls': 0, 'rejected': 0, 'in_flight': 0, 'waiting': 0}
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行同步函数并等待结果"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.stats['waiting'] += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats['rejected'] += 1
+            raise DBExecutorBusy(retry_after=max(1, int(self.queue_timeout)))
+        finally:
+            self.stats['waiting'] -= 1
+
+        self.stats['in_flight'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # 复制上下文，使线程中的调用计入当前请求的分阶段计时
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(context.run, request_timing.profiled_call, func, *args, **kwargs)
+            )
+        finally:
+            self.stats['in_flight'] -= 1
+            self.stats['calls'] += 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, int]:
+        """当前线程池使用情况"""
+        return dict(self.stats, max_concurrency=self.max_concurrency)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -1,20 +1,37 @@
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, BackgroundTasks, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
-import pandas as pd
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import threading
+import uuid
 import os
 import sys
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from src.database.models import DatabaseManager
-from src.data_fetcher.wind_client import WindDataFetcher
-from src.scheduler.data_updater import DataUpdater
+from config.config import settings
+from src.database.models_v2 import DatabaseManager
+from src.api.db_executor import DBExecutor
+from src.api.streaming import stream_rows, MEDIA_TYPES, CHANGE_COLUMNS
+from src.api import columnar, serialization, pagination
+from src.api.conditional import SeriesValidators, request_variant
+from src.api.response_cache import ResponseCache
+from src.api.profiling import ProfilingMiddleware, SlowRequestLog
+from src.api.push import SeriesEventBus, event_stream, watch_change_feed
+from src.api.status import StatusMonitor
+from src.api.admission import AdmissionController
+from src.api.access_counter import AccessCounter, flush_access_counts, run_access_flusher
+from src.data_fetcher.wind_client_v2 import WindDataFetcher
+from src.scheduler.data_updater_v2 import DataUpdater
+from src.scheduler.scheduler_service import SchedulerService
 from src.analyzer.financial_data_processor import FinancialDataProcessor
+from src.analyzer import resampling, panel
 
 app = FastAPI(
     title="金融数据API",
@@ -31,21 +48,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求分阶段计时：Server-Timing响应头、慢请求日志和cProfile采样（日志在每个worker进程内）
+slow_request_log = SlowRequestLog(settings.API_SLOW_LOG_SIZE)
+app.add_middleware(
+    ProfilingMiddleware,
+    slow_log=slow_request_log,
+    slow_threshold_ms=settings.API_SLOW_REQUEST_MS,
+    profile_sample_rate=settings.API_PROFILE_SAMPLE_RATE,
+    server_timing=settings.API_SERVER_TIMING,
+)
+
 # 全局变量
 db_manager = None
 data_fetcher = None
 data_updater = None
 data_processor = None
+scheduler_service = None
+status_monitor = None
+
+# 同步的数据库/pandas调用都通过有界线程池执行，不阻塞事件循环
+db_executor = DBExecutor(settings.API_DB_MAX_CONCURRENCY, settings.API_DB_QUEUE_TIMEOUT_SECONDS)
+
+# 渲染好的响应缓存：数据条目的键包含ETag（序列版本），元数据条目由版本轮询失效
+response_cache = ResponseCache(settings.API_CACHE_MAX_BYTES)
+
+# 大查询准入控制：按预估扫描点数区分轻重查询，重查询限制并发和排队，超限返回429
+admission = AdmissionController(
+    heavy_points=settings.API_ADMISSION_HEAVY_POINTS,
+    max_concurrency=settings.API_ADMISSION_HEAVY_CONCURRENCY,
+    queue_size=settings.API_ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.API_ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    per_client=settings.API_ADMISSION_PER_CLIENT
+)
+
+# 读取需求计数：请求只在内存中计数，后台任务每API_ACCESS_FLUSH_SECONDS秒合并写入一次
+access_counter = AccessCounter()
+
+# 序列更新推送：轮询变更序号发布到进程内总线，/subscribe的SSE客户端按指标或类别订阅
+push_bus = SeriesEventBus(settings.API_PUSH_QUEUE_SIZE)
+
+# FinancialDataProcessor保存pending_request状态，分析请求在线程池中需要串行执行
+analysis_lock = threading.Lock()
 
 
 class UpdateRequest(BaseModel):
-    update_type: str = "incremental"  # 'incremental' 或 'full'
+    update_type: str = "incremental"  # 'incremental'、'full'、'revision' 或 'retry'
 
 
 class DataQueryRequest(BaseModel):
     wind_codes: List[str]
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    format: str = "json"  # 'json'、'ndjson'、'csv'（流式响应）、'arrow' 或 'parquet'（列式二进制）
+    layout: str = "long"  # arrow/parquet的表结构: 'long'（每行一个数据点）或 'wide'（每个指标一列）
+    orient: str = "records"  # json的数据结构: 'records'（[{date, value}]）或 'columns'（{dates, values}）
+    fields: Optional[List[str]] = None  # 只返回这些字段（如 ['close']），默认全部字段
 
 
 class AnalysisRequest(BaseModel):
@@ -59,17 +116,308 @@ class ConfirmationRequest(BaseModel):
     modified_codes: Optional[List[str]] = None
 
 
+def record_access(wind_codes: List[str]):
+    """记录API读取需求（用于更新优先级）：只在内存中计数，由后台任务定期写入"""
+    access_counter.record(wind_codes)
+
+
+async def estimate_cost(
+    wind_codes: List[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None
+) -> int:
+    """按序列逐年行数预估查询扫描的数据点数，分页查询不超过每页条数"""
+    cost = await db_executor.run(db_manager.estimate_points, wind_codes, start_date, end_date, fields)
+    return min(cost, limit) if limit else cost
+
+
+@asynccontextmanager
+async def admitted(http_request: Request, cost: int):
+    """
+    准入后执行查询：轻查询直接执行，重查询按客户端（IP）限制并发并排队，无法执行时抛出429
+    
+    流式响应需要调用ticket.attach，名额保持到响应体发送完成。
+    """
+    client = http_request.client.host if http_request.client else "unknown"
+    ticket = await admission.admit(client, cost)
+    try:
+        yield ticket
+    finally:
+        ticket.release()
+
+
+def check_orient(orient: str):
+    if orient not in serialization.ORIENTS:
+        raise HTTPException(status_code=400, detail="orient必须是 'records' 或 'columns'")
+
+
+def page_params(
+    limit: Optional[int], cursor: Optional[str], kind: str, size: int
+) -> Tuple[Optional[Tuple], Optional[int]]:
+    """
+    解析分页参数，返回(after, 每页条数)
+    
+    指定limit或cursor时分页（只指定cursor时每页API_PAGE_SIZE_DEFAULT条），都未指定时返回全部。
+    """
+    if limit is None and not cursor:
+        return None, None
+    after = pagination.decode_cursor(cursor, kind, size) if cursor else None
+    return after, limit or settings.API_PAGE_SIZE_DEFAULT
+
+
+def load_indicators_body(
+    category: Optional[str], after: Optional[Tuple], limit: Optional[int]
+) -> bytes:
+    """读取指标列表并渲染JSON响应体，分页时多读一行判断是否有下一页（在db_executor线程中执行）"""
+    if limit is None:
+        indicators = db_manager.get_indicators(category)
+        return serialization.dumps({"total": len(indicators), "indicators": indicators})
+    
+    indicators, next_cursor = pagination.split_page(
+        db_manager.get_indicators(category, after=after, limit=limit + 1), limit, "indicators",
+        lambda page: (page[-1]['category'], page[-1]['name'], page[-1]['wind_code'])
+    )
+    return serialization.dumps({
+        "total": len(indicators),
+        "indicators": indicators,
+        "next_cursor": next_cursor
+    })
+
+
+def parse_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    规范化字段投影：支持逗号分隔，去重排序，为空表示全部字段
+    
+    排序后相同字段集合的请求得到相同的ETag和缓存键。
+    """
+    if not fields:
+        return None
+    names = {name.strip() for field in fields for name in field.split(",") if name.strip()}
+    return sorted(names) or None
+
+
+def fields_variant(fields: Optional[List[str]]) -> Optional[str]:
+    return ",".join(fields) if fields else None
+
+
+def load_series_body(
+    wind_code: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    orient: str,
+    fields: Optional[List[str]] = None,
+    after: Optional[Tuple] = None,
+    limit: Optional[int] = None
+) -> Optional[bytes]:
+    """
+    读取单个指标（可只读部分字段）并渲染JSON响应体，无数据返回None（在db_executor线程中执行）
+    
+    分页时按(field_name, date)键集读取limit + 1行，每页一次索引范围查询。
+    """
+    df = db_manager.get_time_series_frame(
+        [wind_code], start_date, end_date, fields, after=after, limit=limit + 1 if limit else None
+    )
+    record_access([wind_code])
+    if df.empty and after is None:
+        return None
+    
+    payload = {"wind_code": wind_code}
+    if limit:
+        df, payload["next_cursor"] = pagination.split_page(
+            df, limit, "series", lambda page: (page['field_name'].iat[-1], page['date'].iat[-1])
+        )
+    data = serialization.frame_payloads(df, orient).get(wind_code, {})
+    payload.update(fields=list(data), data_points=len(df), data=data)
+    return serialization.dumps(payload)
+
+
+def load_batch_body(request: "DataQueryRequest", fields: Optional[List[str]]) -> bytes:
+    """一次查询读取多个指标并渲染JSON响应体，data为{wind_code: {字段: 序列}}（在db_executor线程中执行）"""
+    df = db_manager.get_time_series_frame(request.wind_codes, request.start_date, request.end_date, fields)
+    record_access(request.wind_codes)
+    payloads = serialization.frame_payloads(df, request.orient)
+    return serialization.dumps({
+        "requested_codes": request.wind_codes,
+        "fields": fields,
+        "data": {wind_code: payloads.get(wind_code, {}) for wind_code in request.wind_codes}
+    })
+
+
+def load_aggregate_body(
+    wind_codes: List[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    period: Optional[str],
+    how: str,
+    points: Optional[int],
+    orient: str,
+    fields: Optional[List[str]] = None
+) -> bytes:
+    """读取数据，每个(指标, 字段)序列按周期重采样/LTTB降采样后渲染JSON响应体（在db_executor线程中执行）"""
+    df = db_manager.get_time_series_frame(wind_codes, start_date, end_date, fields)
+    record_access(wind_codes)
+    
+    data = {wind_code: {} for wind_code in wind_codes}
+    for (wind_code, field_name), (dates, values) in serialization.split_frame(df).items():
+        dates, columns = resampling.aggregate(dates.astype('datetime64[D]'), values, period, how, points)
+        if 'value' in columns:
+            data[wind_code][field_name] = serialization.arrays_payload(dates, columns['value'], orient)
+        else:
+            data[wind_code][field_name] = serialization.table_payload(dates, columns, orient)
+    
+    return serialization.dumps({
+        "requested_codes": wind_codes,
+        "fields": fields,
+        "period": period,
+        "how": how if period else None,
+        "points": points,
+        "data": data
+    })
+
+
+def cached_response(key: tuple, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+    """缓存命中时直接返回缓存的响应体"""
+    hit = response_cache.get(key)
+    if hit is None:
+        return None
+    body, media_type = hit
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def watch_series_versions():
+    """
+    轮询series_versions，使有新写入的序列和指标元数据对应的缓存条目失效
+
+    更新器（包括独立进程中的调度器和worker）写入数据时递增序列版本并记录变更序号，
+    API以已处理的最大变更序号为水位轮询（不使用写入时间，提交较晚的事务不会被跳过）。
+    """
+    watermark = None
+    while True:
+        try:
+            if watermark is None:
+                watermark = await db_executor.run(db_manager.get_change_watermark)
+            else:
+                changed = await db_executor.run(db_manager.get_series_versions_since, watermark)
+                if changed:
+                    watermark = max(changed.values())
+                    response_cache.invalidate(changed)
+                    if db_manager.METADATA_VERSION_KEY in changed:
+                        status_monitor.invalidate_categories()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"检查序列版本失败: {e}")
+        await asyncio.sleep(settings.API_CACHE_POLL_SECONDS)
+
+
+def series_validators(wind_codes: List[str], *variant: Optional[str]) -> SeriesValidators:
+    """根据序列版本生成条件请求校验值，只查询版本表（在db_executor线程中执行）"""
+    return SeriesValidators(wind_codes, db_manager.get_series_versions(wind_codes), request_variant(*variant))
+
+
+# 面板支持的格式
+PANEL_MEDIA_TYPES = dict({'json': 'application/json', 'csv': 'text/csv; charset=utf-8'}, **columnar.MEDIA_TYPES)
+
+
+def panel_validators(category: str, *variant: Optional[str]) -> Tuple[List[str], Optional[SeriesValidators]]:
+    """
+    读取类别下的指标并生成条件请求校验值（在db_executor线程中执行）
+    
+    ETag包含指标元数据版本，类别成员变化后失效。类别下没有指标时校验值为None。
+    """
+    codes = [indicator['wind_code'] for indicator in db_manager.get_indicators(category)]
+    if not codes:
+        return codes, None
+    keys = codes + [db_manager.METADATA_VERSION_KEY]
+    return codes, SeriesValidators(keys, db_manager.get_series_versions(keys), request_variant(*variant))
+
+
+def load_panel_body(
+    category: str,
+    codes: List[str],
+    field: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    ffill: bool,
+    fmt: str,
+    orient: str
+) -> bytes:
+    """一次查询读取类别下所有指标的同一字段，构建日期 × 指标矩阵并编码（在db_executor线程中执行）"""
+    df = db_manager.get_time_series_frame(codes, start_date, end_date, [field])
+    record_access(codes)
+    
+    dates, columns, matrix = panel.build_panel(df, codes)
+    if ffill:
+        matrix = panel.forward_fill(matrix)
+    
+    if fmt == "csv":
+        return serialization.matrix_csv(dates, columns, matrix)
+    if fmt in columnar.MEDIA_TYPES:
+        return columnar.encode_table(columnar.matrix_table(dates, columns, matrix), fmt)
+    
+    data = serialization.table_payload(dates, {code: matrix[:, i] for i, code in enumerate(columns)}, orient)
+    present = set(columns)
+    return serialization.dumps({
+        "category": category,
+        "field": field,
+        "start_date": start_date,
+        "end_date": end_date,
+        "ffill": ffill,
+        "columns": columns,
+        "missing_codes": [code for code in codes if code not in present],
+        "data": data
+    })
+
+
+def check_columnar(fmt: str, layout: str):
+    """校验arrow/parquet请求参数"""
+    if not columnar.columnar_available():
+        raise HTTPException(status_code=501, detail="服务器未安装pyarrow，无法返回arrow/parquet格式")
+    if layout not in columnar.LAYOUTS:
+        raise HTTPException(status_code=400, detail="layout必须是 'long' 或 'wide'")
+
+
+def check_data_format(fmt: str, layout: str, orient: str):
+    """在读取数据库之前校验/data和/batch-data的格式参数，未知格式不会进入准入和缓存"""
+    if fmt in columnar.MEDIA_TYPES:
+        check_columnar(fmt, layout)
+    elif fmt == "json":
+        check_orient(orient)
+    elif fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format必须是 'json'、'ndjson'、'csv'、'arrow' 或 'parquet'")
+
+
+def load_columnar(
+    wind_codes: List[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    fmt: str,
+    layout: str,
+    fields: Optional[List[str]] = None,
+    require_rows: bool = False
+) -> Optional[bytes]:
+    """读取数据并编码为Arrow IPC/Parquet（在db_executor线程中执行），require_rows时无数据返回None"""
+    df = db_manager.get_time_series_frame(wind_codes, start_date, end_date, fields)
+    record_access(wind_codes)
+    if df.empty and require_rows:
+        return None
+    return columnar.encode_table(columnar.build_table(df, layout), fmt)
+
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化"""
-    global db_manager, data_fetcher, data_updater, data_processor
+    global db_manager, data_fetcher, data_updater, data_processor, scheduler_service, status_monitor
     
     # 创建logs目录
     os.makedirs("logs", exist_ok=True)
     
     # 初始化组件
     db_manager = DatabaseManager()
-    data_fetcher = WindDataFetcher()
+    data_fetcher = WindDataFetcher(
+        mcp_host=settings.WIND_MCP_HOST,
+        mcp_port=settings.WIND_MCP_PORT
+    )
     data_updater = DataUpdater(db_manager, data_fetcher)
     data_processor = FinancialDataProcessor()
     
@@ -78,15 +426,44 @@ async def startup_event():
     if os.path.exists(excel_path):
         db_manager.load_indicators_from_excel(excel_path)
     
-    # 启动调度器
-    data_updater.start_scheduler()
+    # 调度器默认作为独立服务运行（python main.py scheduler），API可以安全地使用多个worker；
+    # 开启内嵌调度器时每个worker都以备用模式启动，只有获得调度器锁的一个运行定时任务
+    if settings.API_EMBEDDED_SCHEDULER:
+        scheduler_service = SchedulerService(db_manager, data_updater, lock_ttl=settings.SCHEDULER_LOCK_TTL_SECONDS)
+        scheduler_service.start()
+    
+    # 数据写入后失效响应缓存
+    asyncio.create_task(watch_series_versions())
+    
+    # 后台探测Wind连接，/status只读取缓存的探测结果
+    status_monitor = StatusMonitor(
+        db_manager, data_fetcher, settings.API_STATUS_PROBE_SECONDS, settings.API_STATUS_PROBE_TIMEOUT_SECONDS
+    )
+    asyncio.create_task(status_monitor.run_prober())
+    
+    # 新提交的数据点推送给订阅者
+    asyncio.create_task(watch_change_feed(
+        push_bus, db_executor, db_manager, settings.API_PUSH_POLL_SECONDS, settings.API_PUSH_MAX_POINTS
+    ))
+    
+    # 定期写入读取需求计数
+    asyncio.create_task(run_access_flusher(
+        access_counter, db_executor, db_manager,
+        settings.API_ACCESS_FLUSH_SECONDS, settings.PRIORITY_DEMAND_HALF_LIFE_DAYS
+    ))
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理"""
-    if data_updater:
-        data_updater.stop_scheduler()
+    if scheduler_service:
+        scheduler_service.stop()
+    # 写入尚未落库的读取计数
+    try:
+        flush_access_counts(access_counter, db_manager, settings.PRIORITY_DEMAND_HALF_LIFE_DAYS)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"写入读取需求失败: {e}")
+    db_executor.shutdown()
 
 
 @app.get("/")
@@ -101,6 +478,12 @@ async def root():
             "batch_data": "/batch-data - 批量获取数据",
             "update": "/update - 手动触发数据更新",
             "status": "/status - 获取系统状态",
+            "runs": "/runs - 获取更新运行记录（分阶段耗时、请求延迟直方图）",
+            "aggregate": "/aggregate - 图表数据（周期重采样、LTTB降采样）",
+            "changes": "/changes?since= - 增量同步（变更序号之后变化的数据点）",
+            "panel": "/panel?category=&field= - 类别面板（日期 × 指标对齐矩阵）",
+            "subscribe": "/subscribe - 订阅序列更新推送（Server-Sent Events）",
+            "cache": "/admin/cache - 响应缓存统计",
             "analyze": "/analyze - 智能分析请求 (带确认步骤)",
             "confirm": "/confirm - 确认分析请求"
         }
@@ -108,14 +491,24 @@ async def root():
 
 
 @app.get("/indicators")
-async def get_indicators(category: Optional[str] = Query(None, description="指标类别")):
-    """获取指标列表"""
+async def get_indicators(
+    category: Optional[str] = Query(None, description="指标类别"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.API_PAGE_SIZE_MAX, description="每页指标数，不指定时返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor")
+):
+    """获取指标列表（按类别、名称排序，支持游标分页）"""
     try:
-        indicators = db_manager.get_indicators(category)
-        return {
-            "total": len(indicators),
-            "indicators": indicators
-        }
+        after, page_limit = page_params(limit, cursor, "indicators", 3)
+        key = ("indicators", category or "", page_limit, cursor)
+        cached = cached_response(key)
+        if cached:
+            return cached
+        
+        body = await db_executor.run(load_indicators_body, category, after, page_limit)
+        response_cache.put(key, body, "application/json", [db_manager.METADATA_VERSION_KEY])
+        return Response(body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -124,49 +517,89 @@ async def get_indicators(category: Optional[str] = Query(None, description="指
 async def get_categories():
     """获取所有指标类别"""
     try:
-        indicators = db_manager.get_indicators()
-        categories = list(set(indicator['category'] for indicator in indicators))
-        return {
-            "categories": sorted(categories)
-        }
+        key = ("categories",)
+        cached = cached_response(key)
+        if cached:
+            return cached
+        
+        categories = await db_executor.run(db_manager.get_categories)
+        body = await db_executor.run(serialization.dumps, {"categories": categories})
+        response_cache.put(key, body, "application/json", [db_manager.METADATA_VERSION_KEY])
+        return Response(body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/data/{wind_code}")
 async def get_time_series_data(
+    http_request: Request,
     wind_code: str,
     start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
     end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
-    format: Optional[str] = Query("json", description="返回格式: json 或 csv")
+    format: Optional[str] = Query("json", description="返回格式: json、ndjson、csv（流式响应）、arrow 或 parquet"),
+    layout: str = Query("long", description="arrow/parquet表结构: long 或 wide"),
+    orient: str = Query("records", description="json数据结构: records（[{date, value}]）或 columns（{dates, values}）"),
+    fields: Optional[str] = Query(None, description="只返回这些字段，多个用逗号分隔，如 close,pe_ttm；默认全部字段"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.API_PAGE_SIZE_MAX, description="每页数据点数（json格式），不指定时返回全部"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor")
 ):
-    """获取单个指标的时间序列数据"""
+    """获取单个指标的时间序列数据（支持If-None-Match/If-Modified-Since条件请求和游标分页）"""
     try:
-        df = db_manager.get_time_series_data(wind_code, start_date, end_date)
+        fmt = format.lower()
+        check_data_format(fmt, layout, orient)
+        fields = parse_fields([fields] if fields else None)
+        after, page_limit = page_params(limit, cursor, "series", 2)
+        if page_limit and fmt != "json":
+            raise HTTPException(status_code=400, detail="分页只支持json格式，大量数据请使用流式或arrow/parquet格式")
+        validators = await db_executor.run(
+            series_validators, [wind_code], "data", fmt, layout, orient, start_date, end_date,
+            fields_variant(fields), page_limit, cursor
+        )
+        if validators.matches(http_request):
+            record_access([wind_code])
+            return validators.not_modified()
         
-        if df.empty:
-            raise HTTPException(status_code=404, detail=f"未找到指标 {wind_code} 的数据")
+        # ETag已包含序列版本和请求参数，序列写入后键随之变化
+        key = ("data", validators.etag)
+        cached = cached_response(key, validators.headers())
+        if cached:
+            record_access([wind_code])
+            return cached
         
-        if format.lower() == "csv":
-            csv_content = df.to_csv()
-            return JSONResponse(
-                content={"data": csv_content},
-                headers={"Content-Type": "text/csv"}
+        # 缓存未命中需要读取数据：按预估扫描点数准入，重查询排队或返回429
+        cost = await estimate_cost([wind_code], start_date, end_date, fields, page_limit)
+        async with admitted(http_request, cost) as ticket:
+            if fmt in columnar.MEDIA_TYPES:
+                content = await db_executor.run(
+                    load_columnar, [wind_code], start_date, end_date, fmt, layout, fields, require_rows=True
+                )
+                if content is None:
+                    raise HTTPException(status_code=404, detail=f"未找到指标 {wind_code} 的数据")
+                response_cache.put(key, content, columnar.MEDIA_TYPES[fmt], [wind_code])
+                return Response(content, media_type=columnar.MEDIA_TYPES[fmt], headers=validators.headers())
+            
+            if fmt in MEDIA_TYPES:
+                record_access([wind_code])
+                chunks = db_manager.iter_time_series_rows(
+                    [wind_code], start_date, end_date, settings.API_STREAM_CHUNK_SIZE, fields
+                )
+                streaming = await stream_rows(db_executor, chunks, fmt, require_rows=True)
+                if streaming is None:
+                    raise HTTPException(status_code=404, detail=f"未找到指标 {wind_code} 的数据")
+                streaming.headers.update(validators.headers())
+                return ticket.attach(streaming)
+            
+            body = await db_executor.run(
+                load_series_body, wind_code, start_date, end_date, orient, fields, after, page_limit
             )
-        else:
-            # 转换为JSON格式
-            data = []
-            for date, row in df.iterrows():
-                data.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "value": row['value']
-                })
             
-            return {
-                "wind_code": wind_code,
-                "data_points": len(data),
-                "data": data
-            }
+            if body is None:
+                raise HTTPException(status_code=404, detail=f"未找到指标 {wind_code} 的数据")
+            
+            response_cache.put(key, body, "application/json", [wind_code])
+            return Response(body, media_type="application/json", headers=validators.headers())
             
     except HTTPException:
         raise
@@ -175,38 +608,233 @@ async def get_time_series_data(
 
 
 @app.post("/batch-data")
-async def get_batch_data(request: DataQueryRequest):
-    """批量获取多个指标的时间序列数据"""
+async def get_batch_data(request: DataQueryRequest, http_request: Request):
+    """批量获取多个指标的时间序列数据（组合ETag，If-None-Match命中时返回304）"""
     try:
-        result = {}
+        fmt = request.format.lower()
+        check_data_format(fmt, request.layout, request.orient)
+        fields = parse_fields(request.fields)
+        validators = await db_executor.run(
+            series_validators, request.wind_codes, "batch", fmt, request.layout, request.orient,
+            request.start_date, request.end_date, fields_variant(fields)
+        )
+        if validators.matches(http_request):
+            record_access(request.wind_codes)
+            return validators.not_modified()
         
-        for wind_code in request.wind_codes:
-            df = db_manager.get_time_series_data(
-                wind_code, 
-                request.start_date, 
-                request.end_date
+        key = ("batch", validators.etag)
+        cached = cached_response(key, validators.headers())
+        if cached:
+            record_access(request.wind_codes)
+            return cached
+        
+        cost = await estimate_cost(request.wind_codes, request.start_date, request.end_date, fields)
+        async with admitted(http_request, cost) as ticket:
+            if fmt in MEDIA_TYPES:
+                # 流式响应：按指标、字段顺序输出，每行一个数据点
+                record_access(request.wind_codes)
+                chunks = db_manager.iter_time_series_rows(
+                    request.wind_codes, request.start_date, request.end_date, settings.API_STREAM_CHUNK_SIZE, fields
+                )
+                streaming = await stream_rows(db_executor, chunks, fmt)
+                streaming.headers.update(validators.headers())
+                return ticket.attach(streaming)
+            if fmt in columnar.MEDIA_TYPES:
+                content = await db_executor.run(
+                    load_columnar, request.wind_codes, request.start_date, request.end_date, fmt, request.layout,
+                    fields
+                )
+                response_cache.put(key, content, columnar.MEDIA_TYPES[fmt], request.wind_codes)
+                return Response(content, media_type=columnar.MEDIA_TYPES[fmt], headers=validators.headers())
+            body = await db_executor.run(load_batch_body, request, fields)
+            response_cache.put(key, body, "application/json", request.wind_codes)
+            return Response(body, media_type="application/json", headers=validators.headers())
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/aggregate")
+async def aggregate_data(
+    http_request: Request,
+    wind_codes: str = Query(..., description="Wind代码，多个用逗号分隔"),
+    period: Optional[str] = Query(None, description="重采样周期: W、M、Q、Y（周期末）"),
+    how: str = Query("last", description="聚合方式: last、mean、min、max、ohlc"),
+    points: Optional[int] = Query(None, ge=3, description="LTTB降采样后的最大点数"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    orient: str = Query("records", description="json数据结构: records 或 columns"),
+    fields: Optional[str] = Query(None, description="只返回这些字段，多个用逗号分隔；默认全部字段")
+):
+    """图表数据：按周期末重采样和/或LTTB降采样，返回数据量与图表大小相关而与历史长度无关"""
+    try:
+        codes = [code.strip() for code in wind_codes.split(",") if code.strip()]
+        period = period.upper() if period else None
+        how = how.lower()
+        if not codes:
+            raise HTTPException(status_code=400, detail="wind_codes不能为空")
+        if period is None and points is None:
+            raise HTTPException(status_code=400, detail="period和points至少需要指定一个")
+        if period is not None and period not in resampling.PERIODS:
+            raise HTTPException(status_code=400, detail="period必须是 W、M、Q 或 Y")
+        if how not in resampling.AGGREGATIONS:
+            raise HTTPException(status_code=400, detail="how必须是 last、mean、min、max 或 ohlc")
+        if how == "ohlc" and points is not None:
+            raise HTTPException(status_code=400, detail="ohlc聚合不支持points降采样")
+        check_orient(orient)
+        fields = parse_fields([fields] if fields else None)
+        
+        validators = await db_executor.run(
+            series_validators, codes, "aggregate", period, how, points, orient, start_date, end_date,
+            fields_variant(fields)
+        )
+        if validators.matches(http_request):
+            record_access(codes)
+            return validators.not_modified()
+        
+        key = ("aggregate", validators.etag)
+        cached = cached_response(key, validators.headers())
+        if cached:
+            record_access(codes)
+            return cached
+        
+        cost = await estimate_cost(codes, start_date, end_date, fields)
+        async with admitted(http_request, cost):
+            body = await db_executor.run(
+                load_aggregate_body, codes, start_date, end_date, period, how, points, orient, fields
             )
-            
-            if not df.empty:
-                data = []
-                for date, row in df.iterrows():
-                    data.append({
-                        "date": date.strftime("%Y-%m-%d"),
-                        "value": row['value']
-                    })
-                result[wind_code] = data
-            else:
-                result[wind_code] = []
+            response_cache.put(key, body, "application/json", codes)
+            return Response(body, media_type="application/json", headers=validators.headers())
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/panel")
+async def get_panel(
+    http_request: Request,
+    category: str = Query(..., description="指标类别，如 债券、权益"),
+    field: str = Query(..., description="字段名，如 close"),
+    start_date: Optional[str] = Query(None, description="开始日期 YYYY-MM-DD"),
+    end_date: Optional[str] = Query(None, description="结束日期 YYYY-MM-DD"),
+    ffill: bool = Query(False, description="是否用前值填充缺失（首个有效值之前保持为空）"),
+    format: str = Query("json", description="返回格式: json、csv、arrow 或 parquet"),
+    orient: str = Query("columns", description="json数据结构: columns 或 records")
+):
+    """
+    类别面板：类别下所有指标同一字段在日期范围内的对齐矩阵（日期 × 指标）
+    
+    一次查询读取全部序列；构建好的面板按序列版本缓存，任一指标写入或类别成员变化后重新构建。
+    """
+    try:
+        fmt = format.lower()
+        if fmt not in PANEL_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="format必须是 'json'、'csv'、'arrow' 或 'parquet'")
+        if fmt in columnar.MEDIA_TYPES:
+            check_columnar(fmt, "wide")
+        check_orient(orient)
         
-        return {
-            "requested_codes": request.wind_codes,
-            "data": result
-        }
+        codes, validators = await db_executor.run(
+            panel_validators, category, "panel", field, start_date, end_date, str(ffill), fmt, orient
+        )
+        if validators is None:
+            raise HTTPException(status_code=404, detail=f"类别 {category} 下没有指标")
+        if validators.matches(http_request):
+            record_access(codes)
+            return validators.not_modified()
+        
+        key = ("panel", validators.etag)
+        cached = cached_response(key, validators.headers())
+        if cached:
+            record_access(codes)
+            return cached
+        
+        cost = await estimate_cost(codes, start_date, end_date, [field])
+        async with admitted(http_request, cost):
+            body = await db_executor.run(
+                load_panel_body, category, codes, field, start_date, end_date, ffill, fmt, orient
+            )
+            media_type = PANEL_MEDIA_TYPES[fmt]
+            response_cache.put(key, body, media_type, codes + [db_manager.METADATA_VERSION_KEY])
+            return Response(body, media_type=media_type, headers=validators.headers())
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/changes")
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="上次同步返回的水位（X-Change-Watermark），不指定时返回全部数据点"),
+    wind_codes: Optional[str] = Query(None, description="只同步这些指标，多个用逗号分隔；默认全部"),
+    fields: Optional[str] = Query(None, description="只同步这些字段，多个用逗号分隔；默认全部"),
+    format: str = Query("ndjson", description="返回格式: ndjson 或 csv")
+):
+    """
+    增量同步：流式返回变更序号大于since的数据点
+    
+    每行为(seq, wind_code, field, date, value)，按seq排序，同一数据点只返回最新值。
+    响应头X-Change-Watermark为本次同步后的水位，作为下一次请求的since。
+    """
+    try:
+        fmt = format.lower()
+        if fmt not in MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="format必须是 'ndjson' 或 'csv'")
+        codes = [code.strip() for code in wind_codes.split(",") if code.strip()] if wind_codes else None
+        fields = parse_fields([fields] if fields else None)
         
+        try:
+            watermark, chunks = await db_executor.run(
+                db_manager.open_changes, since, codes, fields, settings.API_STREAM_CHUNK_SIZE
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        
+        streaming = await stream_rows(db_executor, chunks, fmt, columns=CHANGE_COLUMNS)
+        streaming.headers.update({
+            "X-Change-Watermark": str(watermark),
+            "Cache-Control": "no-store"
+        })
+        return streaming
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/subscribe")
+async def subscribe_updates(
+    wind_codes: Optional[str] = Query(None, description="订阅的指标，多个用逗号分隔"),
+    categories: Optional[str] = Query(None, description="订阅的指标类别，多个用逗号分隔；指标和类别都不指定时订阅全部")
+):
+    """
+    订阅序列更新推送（Server-Sent Events）
+    
+    连接后先收到ready事件（data为当前水位），之后每次有新数据提交，按(指标, 字段)收到update事件：
+    {"seq", "wind_code", "category", "field", "count", "truncated", "dates", "values"}，
+    数据点超过API_PUSH_MAX_POINTS时truncated为true，完整数据用/changes?since=获取。
+    推送队列溢出时收到resync事件，连接随后关闭。
+    """
+    codes = [code.strip() for code in wind_codes.split(",") if code.strip()] if wind_codes else []
+    category_list = [category.strip() for category in categories.split(",") if category.strip()] if categories else []
+    
+    watermark = push_bus.watermark
+    if watermark is None:
+        watermark = await db_executor.run(db_manager.get_change_watermark)
+    subscription = push_bus.subscribe(codes, category_list)
+    return StreamingResponse(
+        event_stream(push_bus, subscription, watermark, settings.API_PUSH_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/update")
 async def trigger_update(
     request: UpdateRequest,
@@ -214,10 +842,10 @@ async def trigger_update(
 ):
     """手动触发数据更新"""
     try:
-        if request.update_type not in ["incremental", "full"]:
+        if request.update_type not in ["incremental", "full", "revision", "retry"]:
             raise HTTPException(
                 status_code=400, 
-                detail="update_type 必须是 'incremental' 或 'full'"
+                detail="update_type 必须是 'incremental'、'full'、'revision' 或 'retry'"
             )
         
         # 在后台执行更新
@@ -240,59 +868,75 @@ async def trigger_update(
 async def get_system_status():
     """获取系统状态"""
     try:
-        # 检查Wind连接
-        wind_connected = data_fetcher.test_connection()
-        
-        # 获取数据库统计
-        indicators = db_manager.get_indicators()
-        
-        # 计算各类别指标数量
-        category_stats = {}
-        for indicator in indicators:
-            category = indicator['category']
-            category_stats[category] = category_stats.get(category, 0) + 1
-        
-        # 检查最近更新时间
-        recent_updates = []
-        with db_manager.db_manager.connect(db_manager.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT wind_code, MAX(update_time) as last_update, status
-                FROM update_logs 
-                GROUP BY wind_code 
-                ORDER BY last_update DESC 
-                LIMIT 10
-            ''')
-            recent_updates = [
-                {
-                    "wind_code": row[0],
-                    "last_update": row[1],
-                    "status": row[2]
-                }
-                for row in cursor.fetchall()
-            ]
+        status = await db_executor.run(status_monitor.collect, SchedulerService.LOCK_NAME)
+        status["db_executor"] = db_executor.get_stats()
+        status["push"] = push_bus.get_stats()
+        status["admission"] = admission.get_stats()
+        return status
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/runs")
+async def get_update_runs(
+    strategy: Optional[str] = Query(None, description="更新策略（方法名），如 incremental_update"),
+    limit: int = Query(20, ge=1, le=500, description="返回记录数")
+):
+    """获取最近的更新运行记录，用于跟踪更新吞吐量的变化"""
+    try:
+        runs = await db_executor.run(db_manager.get_update_runs, strategy=strategy, limit=limit)
+        for run in runs:
+            duration = run['duration_seconds'] or 0
+            run['points_per_second'] = run['points_written'] / duration if duration else None
         return {
-            "timestamp": datetime.now().isoformat(),
-            "wind_connection": {
-                "connected": wind_connected,
-                "status": "正常" if wind_connected else "连接失败"
-            },
-            "database": {
-                "total_indicators": len(indicators),
-                "category_stats": category_stats
-            },
-            "scheduler": {
-                "running": data_updater.is_running,
-                "status": "运行中" if data_updater.is_running else "已停止"
-            },
-            "recent_updates": recent_updates
+            "total": len(runs),
+            "runs": runs
         }
-        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/admin/cache")
+async def get_cache_stats():
+    """响应缓存统计（命中率、条目数、占用字节数）"""
+    return response_cache.get_stats()
+
+
+@app.delete("/admin/cache")
+async def clear_cache():
+    """清空响应缓存"""
+    response_cache.clear()
+    return {"message": "响应缓存已清空"}
+
+
+@app.get("/admin/slow-requests")
+async def get_slow_requests(
+    limit: Optional[int] = Query(None, ge=1, description="最多返回的条数"),
+    include_profile: bool = Query(False, description="是否包含cProfile剖析结果")
+):
+    """最近的慢请求（按时间倒序，含各阶段耗时和查询参数）"""
+    entries = slow_request_log.get_entries(limit)
+    if not include_profile:
+        entries = [dict(entry, profile=None) for entry in entries]
+    return {
+        "threshold_ms": settings.API_SLOW_REQUEST_MS,
+        "total": slow_request_log.total,
+        "requests": entries
+    }
+
+
+@app.delete("/admin/slow-requests")
+async def clear_slow_requests():
+    """清空慢请求日志"""
+    slow_request_log.clear()
+    return {"message": "慢请求日志已清空"}
+
+
 @app.get("/health")
 async def health_check():
     """健康检查"""
@@ -302,12 +946,31 @@ async def health_check():
     }
 
 
-# 用于存储分析会话的临时存储（生产环境中应使用Redis等持久化存储）
-analysis_sessions = {}
+def parse_and_analyze(user_request: str, auto_confirm: bool):
+    """解析分析请求，自动确认时直接执行分析（在db_executor线程中执行）"""
+    with analysis_lock:
+        parsed_request = data_processor.parse_user_request(user_request)
+        results = None
+        if auto_confirm and any(ind["data_available"] for ind in parsed_request["indicators_detail"]):
+            results = data_processor.execute_analysis()
+        return parsed_request, results
+
+
+def run_confirmed_analysis(parsed_request: Dict[str, Any], modified_codes: Optional[List[str]]):
+    """执行用户确认的分析请求（在db_executor线程中执行）"""
+    with analysis_lock:
+        if modified_codes:
+            new_indicators_detail = data_processor._get_indicators_detail(modified_codes)
+            parsed_request["indicators_detail"] = new_indicators_detail
+            parsed_request["identified_codes"] = modified_codes
+        
+        # 设置当前请求为待处理请求
+        data_processor.pending_request = parsed_request
+        return data_processor.execute_analysis()
 
 
 @app.post("/analyze")
-async def analyze_request(request: AnalysisRequest):
+async def analyze_request(request: AnalysisRequest, http_request: Request):
     """
     智能分析请求 - 带确认步骤
     
@@ -317,8 +980,11 @@ async def analyze_request(request: AnalysisRequest):
     3. 如果 auto_confirm=False，返回确认信息等待用户确认
     """
     try:
-        # 步骤1: 解析用户请求
-        parsed_request = data_processor.parse_user_request(request.user_request)
+        # 步骤1: 解析用户请求（自动确认时在同一次加锁中直接执行分析，按大查询准入）
+        async with admitted(http_request, admission.heavy_points if request.auto_confirm else 0):
+            parsed_request, results = await db_executor.run(
+                parse_and_analyze, request.user_request, request.auto_confirm
+            )
         
         if not parsed_request["indicators_detail"]:
             return {
@@ -346,7 +1012,6 @@ async def analyze_request(request: AnalysisRequest):
         
         # 如果设置了自动确认，直接执行分析
         if request.auto_confirm:
-            results = data_processor.execute_analysis()
             return {
                 "status": "completed",
                 "message": "分析完成",
@@ -354,8 +1019,11 @@ async def analyze_request(request: AnalysisRequest):
             }
         
         # 否则，生成会话ID并等待用户确认
-        session_id = f"session_{datetime.now().timestamp()}"
-        analysis_sessions[session_id] = parsed_request
+        # 会话保存在数据库中，确认请求可以由任意worker处理
+        session_id = f"session_{uuid.uuid4().hex}"
+        await db_executor.run(
+            db_manager.save_analysis_session, session_id, parsed_request, settings.ANALYSIS_SESSION_TTL_SECONDS
+        )
         
         return {
             "status": "confirmation_needed",
@@ -375,66 +1043,66 @@ async def analyze_request(request: AnalysisRequest):
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/confirm")
-async def confirm_analysis(request: ConfirmationRequest):
+async def confirm_analysis(request: ConfirmationRequest, http_request: Request):
     """
     确认分析请求
     
     用户确认后执行实际的数据分析
     """
     try:
-        # 检查会话是否存在
-        if request.session_id not in analysis_sessions:
-            raise HTTPException(
-                status_code=404, 
-                detail="分析会话不存在或已过期"
-            )
-        
-        parsed_request = analysis_sessions[request.session_id]
-        
-        if not request.confirmed:
-            # 用户取消分析
-            del analysis_sessions[request.session_id]
+        # 分析读取的数据量在执行前无法预估，确认执行的分析按大查询准入；
+        # 准入在取出会话之前，被拒绝（429）时会话保留，客户端可以稍后重试
+        async with admitted(http_request, admission.heavy_points if request.confirmed else 0):
+            # 取出并删除会话（同一会话只会被确认一次）
+            parsed_request = await db_executor.run(db_manager.pop_analysis_session, request.session_id)
+            if parsed_request is None:
+                raise HTTPException(
+                    status_code=404, 
+                    detail="分析会话不存在或已过期"
+                )
+            
+            if not request.confirmed:
+                # 用户取消分析
+                return {
+                    "status": "cancelled",
+                    "message": "分析已取消"
+                }
+            
+            # 执行分析（用户修改了指标列表时先替换指标）；分析失败时放回会话，用户可以重新确认
+            try:
+                results = await db_executor.run(
+                    run_confirmed_analysis, dict(parsed_request), request.modified_codes
+                )
+            except Exception:
+                await db_executor.run(
+                    db_manager.save_analysis_session, request.session_id, parsed_request,
+                    settings.ANALYSIS_SESSION_TTL_SECONDS
+                )
+                raise
+
             return {
-                "status": "cancelled",
-                "message": "分析已取消"
+                "status": "completed",
+                "message": "分析完成",
+                "results": results
             }
         
-        # 如果用户修改了指标列表
-        if request.modified_codes:
-            new_indicators_detail = data_processor._get_indicators_detail(request.modified_codes)
-            parsed_request["indicators_detail"] = new_indicators_detail
-            parsed_request["identified_codes"] = request.modified_codes
-        
-        # 设置当前请求为待处理请求
-        data_processor.pending_request = parsed_request
-        
-        # 执行分析
-        results = data_processor.execute_analysis()
-        
-        # 清理会话
-        del analysis_sessions[request.session_id]
-        
-        return {
-            "status": "completed",
-            "message": "分析完成",
-            "results": results
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        # 出错时清理会话
-        if request.session_id in analysis_sessions:
-            del analysis_sessions[request.session_id]
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/analyze/sessions")
 async def get_active_sessions():
     """获取活动的分析会话"""
+    analysis_sessions = await db_executor.run(db_manager.list_analysis_sessions)
     return {
         "active_sessions": len(analysis_sessions),
         "sessions": {
@@ -451,10 +1119,9 @@ async def get_active_sessions():
 @app.delete("/analyze/sessions/{session_id}")
 async def cancel_session(session_id: str):
     """取消特定的分析会话"""
-    if session_id not in analysis_sessions:
+    if not await db_executor.run(db_manager.delete_analysis_session, session_id):
         raise HTTPException(status_code=404, detail="会话不存在")
     
-    del analysis_sessions[session_id]
     return {
         "status": "cancelled",
         "message": f"会话 {session_id} 已取消"
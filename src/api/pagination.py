@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Sequence, Tuple
+from fastapi import HTTPException
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """将上一页最后一行的排序键编码为不透明游标（URL安全的base64）"""
+    raw = json.dumps([kind, *values], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, kind: str, size: int) -> Tuple[Any, ...]:
+    """
+    解析游标为排序键元组
+
+    游标类型或长度不匹配（如把指标列表的游标用于时间序列）时返回400。
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="cursor无效")
+
+    if not isinstance(decoded, list) or len(decoded) != size + 1 or decoded[0] != kind:
+        raise HTTPException(status_code=400, detail="cursor无效")
+    return tuple(decoded[1:])
+
+
+def split_page(rows, limit: int, kind: str, last_key: Callable[[Any], Sequence[Any]]):
+    """
+    从多读一行（limit + 1）的结果（列表或DataFrame）中切出当前页
+
+    Args:
+        last_key: 返回当前页最后一行排序键的函数
+
+    Returns:
+        (当前页, 下一页游标)，没有下一页时游标为None
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(kind, last_key(page))
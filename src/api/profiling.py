@@ -0,0 +1,131 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from urllib.parse import parse_qsl
+from src.utils import request_timing
+from src.utils.request_timing import RequestTimings
+
+
+class SlowRequestLog:
+    """最近的慢请求记录（有界队列，只在事件循环中访问）"""
+
+    def __init__(self, max_entries: int = 100):
+        self._entries = deque(maxlen=max(1, max_entries))
+        self.total = 0
+
+    def add(self, entry: Dict[str, Any]):
+        self._entries.append(entry)
+        self.total += 1
+
+    def get_entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按时间倒序返回慢请求"""
+        entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        self._entries.clear()
+
+
+def server_timing_header(timings: RequestTimings, total_seconds: float) -> str:
+    """生成Server-Timing头，例如 db;dur=12.3, transform;dur=1.2, serialize;dur=0.8, total;dur=15.0"""
+    parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.phase_seconds.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.3f}")
+    return ", ".join(parts)
+
+
+def profile_text(profiler: cProfile.Profile, top: int) -> Optional[str]:
+    """按累计耗时排序的前top个函数，请求没有在线程池中执行任何调用时返回None"""
+    stream = io.StringIO()
+    try:
+        stats = pstats.Stats(profiler, stream=stream)
+    except TypeError:
+        # 剖析器从未启用，没有统计数据
+        return None
+    stats.sort_stats("cumulative").print_stats(top)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    请求分阶段计时中间件（ASGI）
+
+    - 每个请求创建RequestTimings，DatabaseManager和序列化函数把耗时累加到db/transform/serialize阶段
+    - 响应头Server-Timing给出开始发送响应前各阶段的耗时（流式响应只包含第一块数据之前的部分）
+    - 总耗时（包括流式响应发送完成）超过slow_threshold_ms的请求记入慢请求日志
+    - 按profile_sample_rate比例对请求做cProfile采样，慢请求的剖析结果附在慢请求日志中
+    """
+
+    def __init__(
+        self,
+        app,
+        slow_log: SlowRequestLog,
+        slow_threshold_ms: float = 1000,
+        profile_sample_rate: float = 0.0,
+        profile_top: int = 30,
+        server_timing: bool = True
+    ):
+        self.app = app
+        self.slow_log = slow_log
+        self.slow_threshold_ms = slow_threshold_ms
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_top = profile_top
+        self.server_timing = server_timing
+        self.logger = logging.getLogger(__name__)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+        timings = RequestTimings(cProfile.Profile() if sampled else None)
+        token = request_timing.begin(timings)
+        started = time.perf_counter()
+        status = {"code": 500, "event_stream": False}
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["event_stream"] = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+                if self.server_timing:
+                    header = server_timing_header(timings, time.perf_counter() - started)
+                    message = dict(message, headers=list(message.get("headers", [])) + [
+                        (b"server-timing", header.encode("latin-1"))
+                    ])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timing.end(token)
+            duration_ms = (time.perf_counter() - started) * 1000
+            # SSE长连接的耗时是订阅时长，不记为慢请求
+            if duration_ms >= self.slow_threshold_ms and not status["event_stream"]:
+                self._record_slow(scope, status["code"], duration_ms, timings)
+
+    def _record_slow(self, scope, status_code: int, duration_ms: float, timings: RequestTimings):
+        phases = request_timing.summary(timings)
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+        self.slow_log.add({
+            "timestamp": datetime.now().isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": query,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "phases_ms": phases,
+            "profile": profile_text(timings.profiler, self.profile_top) if timings.profiler else None
+        })
+        phase_text = ", ".join(f"{name}={ms:.1f}ms" for name, ms in phases.items())
+        self.logger.warning(
+            f"🐢 慢请求 {scope['method']} {scope['path']} 耗时 {duration_ms:.1f}ms（{phase_text}）"
+        )
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator, Tuple
+from src.database.models_v2 import DatabaseManager
+from src.api import serialization
+
+
+class Subscription:
+    """一个SSE客户端的订阅：按wind_code和/或类别过滤，两者都为空时接收全部序列"""
+
+    def __init__(self, wind_codes: Iterable[str], categories: Iterable[str], queue_size: int):
+        self.wind_codes = frozenset(wind_codes)
+        self.categories = frozenset(categories)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if not self.wind_codes and not self.categories:
+            return True
+        return event['wind_code'] in self.wind_codes or event['category'] in self.categories
+
+
+class SeriesEventBus:
+    """
+    进程内的序列更新发布/订阅（只在事件循环中访问，不需要加锁）
+
+    订阅者读取过慢、队列已满时不阻塞发布者：该订阅被标记为溢出并移除，
+    客户端收到resync事件后用/changes?since=补齐数据再重新订阅。
+    """
+
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscriptions = set()
+        # 已发布到的变更序号，由watch_change_feed更新；新订阅者之后收到的通知序号都大于它
+        self.watermark = None
+        self.stats = {'published': 0, 'delivered': 0, 'overflows': 0}
+
+    def subscribe(self, wind_codes: Iterable[str] = (), categories: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(wind_codes, categories, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def publish(self, event: Dict[str, Any]):
+        self.stats['published'] += 1
+        for subscription in list(self._subscriptions):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                self.stats['delivered'] += 1
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.stats['overflows'] += 1
+                self._subscriptions.discard(subscription)
+                # 唤醒等待中的客户端，使其发送resync事件后结束
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, subscribers=len(self._subscriptions), watermark=self.watermark)
+
+
+def collect_events(
+    db_manager: DatabaseManager,
+    since: int,
+    categories: Dict[str, str],
+    max_points: int,
+    chunk_size: int = 5000
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    读取变更序号大于since的数据点，按(指标, 字段, 操作)合并为通知（在db_executor线程中执行）
+    
+    新增或修订的数据点合并为op为'upsert'的通知（dates/values），漂移修复删除的数据点
+    合并为op为'delete'的通知（只有dates）。每条通知最多带max_points个数据点（按变更顺序），超出时truncated为True，
+    客户端可以用/changes?since=获取完整数据。categories为wind_code到类别的映射，
+    出现未知指标（新加入的指标）时重新加载。
+
+    Returns:
+        (水位, 通知列表)
+    """
+    watermark, chunks = db_manager.open_changes(since, chunk_size=chunk_size)
+    events = {}
+    for rows in chunks:
+        for seq, wind_code, field_name, date, value, op in rows:
+            event = events.get((wind_code, field_name, op))
+            if event is None:
+                event = events[(wind_code, field_name, op)] = {
+                    'seq': seq, 'op': op, 'wind_code': wind_code, 'category': None, 'field': field_name,
+                    'count': 0, 'truncated': False, 'dates': []
+                }
+                if op == 'upsert':
+                    event['values'] = []
+            event['seq'] = seq
+            event['count'] += 1
+            if event['count'] > max_points:
+                event['truncated'] = True
+                continue
+            event['dates'].append(date)
+            if op == 'upsert':
+                event['values'].append(value)
+    
+    if any(wind_code not in categories for wind_code, _, _ in events):
+        categories.clear()
+        categories.update(
+            (indicator['wind_code'], indicator['category']) for indicator in db_manager.get_indicators()
+        )
+    for event in events.values():
+        event['category'] = categories.get(event['wind_code'])
+
+    return watermark, sorted(events.values(), key=lambda event: event['seq'])
+
+
+def format_event(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """格式化为一条SSE消息"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {serialization.dumps(data).decode('utf-8')}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(
+    bus: SeriesEventBus, subscription: Subscription, watermark: int, keepalive: float
+) -> AsyncIterator[str]:
+    """
+    SSE响应体：先发送ready事件（当前水位），之后推送匹配的通知（update或delete事件）
+
+    没有通知时每keepalive秒发送注释行，避免代理断开空闲连接。订阅溢出时发送resync事件并结束。
+    """
+    try:
+        yield format_event("ready", {"watermark": watermark}, watermark)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                yield format_event("resync", {"message": "推送队列溢出，请用/changes?since=补齐数据后重新订阅"})
+                break
+            yield format_event("delete" if event['op'] == 'delete' else "update", event, event['seq'])
+    finally:
+        bus.unsubscribe(subscription)
+
+
+async def watch_change_feed(
+    bus: SeriesEventBus, db_executor, db_manager: DatabaseManager, poll_seconds: float, max_points: int
+):
+    """
+    轮询变更序号，将新提交的数据点发布到总线
+
+    写入可能来自独立的调度器进程、其他API worker或更新脚本，变更序号在写事务中分配，
+    读到的序号对应的写入都已提交。没有订阅者时只推进水位，不读取数据点。
+    """
+    logger = logging.getLogger(__name__)
+    categories = {}
+    while True:
+        try:
+            if bus.watermark is None or not bus.subscriber_count:
+                bus.watermark = await db_executor.run(db_manager.get_change_watermark)
+            else:
+                watermark, events = await db_executor.run(
+                    collect_events, db_manager, bus.watermark, categories, max_points
+                )
+                bus.watermark = watermark
+                for event in events:
+                    bus.publish(event)
+        except ValueError:
+            # 数据库被重建或恢复，变更序号回退，从当前水位重新开始
+            logger.warning("⚠️ 变更序号回退，推送水位已重置")
+            bus.watermark = None
+        except Exception as e:
+            logger.warning(f"读取变更失败: {e}")
+        await asyncio.sleep(poll_seconds)
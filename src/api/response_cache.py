@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Iterable, Tuple, Hashable
+
+
+class ResponseCache:
+    """
+    API响应缓存
+
+    缓存渲染好的响应体（bytes），按总字节数上限做LRU淘汰。每个条目带标签
+    （wind_code或指标元数据键），数据写入后按标签失效。只在事件循环中访问，不需要加锁。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (body, media_type, tags)
+        self._tag_keys = {}  # tag -> {key, ...}
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        """返回(body, media_type)，未命中返回None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[0], entry[1]
+
+    def put(self, key: Hashable, body: bytes, media_type: str, tags: Iterable[str]):
+        # 超过上限一半的响应不缓存，避免单个大请求清空缓存
+        if len(body) > self.max_bytes // 2:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        tags = frozenset(tags)
+        self._entries[key] = (body, media_type, tags)
+        self.bytes += len(body)
+        for tag in tags:
+            self._tag_keys.setdefault(tag, set()).add(key)
+        self.stats['stores'] += 1
+
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """使带有任一标签的条目失效，返回失效条目数"""
+        keys = set()
+        for tag in tags:
+            keys |= self._tag_keys.pop(tag, set())
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+        self.stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._tag_keys.clear()
+        self.bytes = 0
+
+    def _remove(self, key: Hashable):
+        body, _, tags = self._entries.pop(key)
+        self.bytes -= len(body)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(
+            self.stats,
+            entries=len(self._entries),
+            bytes=self.bytes,
+            max_bytes=self.max_bytes,
+            hit_rate=round(self.stats['hits'] / lookups, 4) if lookups else None
+        )
@@ -0,0 +1,118 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Tuple, Union
+from src.utils.request_timing import timed
+
+# orjson为可选依赖，未安装时使用标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ORIENTS = ('records', 'columns')
+
+
+def _date_strings(dates: np.ndarray) -> List[str]:
+    """将datetime64数组整体格式化为YYYY-MM-DD字符串（不逐行调用strftime）"""
+    return np.datetime_as_string(dates.astype('datetime64[D]'), unit='D').tolist()
+
+
+def _json_values(values: np.ndarray) -> List[Any]:
+    """转换为Python列表，NaN转为None（JSON null）"""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    result = values.astype(object)
+    result[missing] = None
+    return result.tolist()
+
+
+def _payload(dates: List[str], values: List[Any], orient: str) -> Union[List[Dict[str, Any]], Dict[str, List]]:
+    """
+    - records: [{"date": "YYYY-MM-DD", "value": 1.0}, ...]
+    - columns: {"dates": [...], "values": [...]}
+    """
+    if orient == "columns":
+        return {"dates": dates, "values": values}
+    return [{"date": date, "value": value} for date, value in zip(dates, values)]
+
+
+def empty_payload(orient: str = "records") -> Union[List, Dict[str, List]]:
+    return _payload([], [], orient)
+
+
+@timed('transform')
+def arrays_payload(dates: np.ndarray, values: np.ndarray, orient: str = "records") -> Union[List, Dict[str, List]]:
+    """datetime64日期数组和数值数组转换为JSON结构"""
+    return _payload(_date_strings(dates), _json_values(values), orient)
+
+
+@timed('transform')
+def table_payload(dates: np.ndarray, columns: Dict[str, np.ndarray], orient: str = "records") -> Union[List, Dict]:
+    """
+    多列序列（如OHLC）转换为JSON结构
+
+    - records: [{"date": ..., "open": ..., ...}, ...]
+    - columns: {"dates": [...], "open": [...], ...}
+    """
+    dates = _date_strings(dates)
+    values = {name: _json_values(column) for name, column in columns.items()}
+    if orient == "columns":
+        return dict({"dates": dates}, **values)
+    names = list(values)
+    return [
+        dict(zip(names, row), date=date)
+        for date, row in zip(dates, zip(*(values[name] for name in names)))
+    ]
+
+
+@timed('transform')
+def split_frame(df: pd.DataFrame) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+    """
+    将按wind_code、field_name、date排序的长表按(指标, 字段)切分为(日期字符串数组, 数值数组)
+
+    按序列边界对数组切片，不逐行分组。
+    """
+    codes = df['wind_code'].to_numpy()
+    fields = df['field_name'].to_numpy()
+    dates = df['date'].to_numpy()
+    values = df['value'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    boundaries = np.flatnonzero((codes[1:] != codes[:-1]) | (fields[1:] != fields[:-1])) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(codes)]))
+    return {
+        (codes[start], fields[start]): (dates[start:end], values[start:end])
+        for start, end in zip(starts, ends) if end > start
+    }
+
+
+@timed('transform')
+def frame_payloads(df: pd.DataFrame, orient: str = "records") -> Dict[str, Dict[str, Union[List, Dict[str, List]]]]:
+    """
+    将长表转换为{wind_code: {field_name: JSON结构}}
+
+    日期在数据库中已是YYYY-MM-DD字符串，直接使用。
+    """
+    payloads = {}
+    for (wind_code, field_name), (dates, values) in split_frame(df).items():
+        payloads.setdefault(wind_code, {})[field_name] = _payload(dates.tolist(), _json_values(values), orient)
+    return payloads
+
+
+@timed('serialize')
+def matrix_csv(dates: np.ndarray, names: List[str], matrix: np.ndarray) -> bytes:
+    """日期 × 序列矩阵编码为CSV（表头为date和各列名，缺失为空）"""
+    frame = pd.DataFrame(matrix, index=_date_strings(dates), columns=names)
+    return frame.to_csv(index_label='date', lineterminator='\n').encode('utf-8')
+
+
+@timed('serialize')
+def dumps(payload: Any) -> bytes:
+    """编码为JSON字节串，安装orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
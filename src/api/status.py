@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+from src.database.models_v2 import DatabaseManager
+
+
+class StatusMonitor:
+    """
+    /status的数据来源
+
+    - Wind连接由后台任务每probe_interval秒探测一次（test_connection会发起真实的wsd请求），
+      /status只读取缓存的结果和探测时间
+    - 类别统计按需计算后缓存，指标元数据版本变化时失效
+    """
+
+    def __init__(self, db_manager: DatabaseManager, data_fetcher, probe_interval: float = 60, probe_timeout: float = 30):
+        self.db_manager = db_manager
+        self.data_fetcher = data_fetcher
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.connection = {"connected": None, "status": "未检测", "checked_at": None, "latency_ms": None}
+        self._category_stats: Optional[Dict[str, int]] = None
+        self._category_generation = 0
+        self.logger = logging.getLogger(__name__)
+
+    async def run_prober(self):
+        """后台探测Wind连接；探测超时的线程不会被重复启动"""
+        probe = None
+        while True:
+            if probe is None or probe.done():
+                probe = asyncio.ensure_future(asyncio.to_thread(self.data_fetcher.test_connection))
+            started = time.perf_counter()
+            try:
+                connected = bool(await asyncio.wait_for(asyncio.shield(probe), timeout=self.probe_timeout))
+                status = "正常" if connected else "连接失败"
+            except asyncio.TimeoutError:
+                connected, status = False, "探测超时"
+            except Exception as e:
+                self.logger.warning(f"Wind连接探测失败: {e}")
+                connected, status = False, "连接失败"
+            self.connection = {
+                "connected": connected,
+                "status": status,
+                "checked_at": datetime.now().isoformat(),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            await asyncio.sleep(self.probe_interval)
+
+    def invalidate_categories(self):
+        """指标元数据变化后重新统计类别"""
+        self._category_generation += 1
+        self._category_stats = None
+
+    def get_category_stats(self) -> Dict[str, int]:
+        """类别统计（缓存未命中时在db_executor线程中查询）"""
+        stats = self._category_stats
+        if stats is None:
+            generation = self._category_generation
+            stats = self.db_manager.get_category_counts()
+            # 查询期间元数据又发生变化时不缓存可能过期的结果
+            if generation == self._category_generation:
+                self._category_stats = stats
+        return stats
+
+    def collect(self, scheduler_lock_name: str, recent_limit: int = 10) -> Dict[str, Any]:
+        """汇总系统状态，只有主键和索引读取（在db_executor线程中执行）"""
+        category_stats = self.get_category_stats()
+
+        # 调度器可能运行在其他进程，以调度器锁的心跳判断运行状态
+        scheduler_lock = self.db_manager.get_service_lock(scheduler_lock_name)
+        scheduler_running = bool(scheduler_lock and scheduler_lock["alive"])
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "wind_connection": dict(self.connection),
+            "database": {
+                "total_indicators": sum(category_stats.values()),
+                "category_stats": category_stats
+            },
+            "scheduler": {
+                "running": scheduler_running,
+                "status": "运行中" if scheduler_running else "已停止",
+                "owner": scheduler_lock["owner"] if scheduler_lock else None,
+                "heartbeat_at": datetime.fromtimestamp(scheduler_lock["heartbeat_at"]).isoformat() if scheduler_lock else None
+            },
+            "recent_updates": self.db_manager.get_recent_updates(recent_limit)
+        }
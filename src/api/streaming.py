@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from typing import Iterator, List, Tuple, Optional, AsyncIterator, Sequence
+from fastapi.responses import StreamingResponse
+from src.api.db_executor import DBExecutor
+from src.utils.request_timing import timed, phase
+
+
+# 支持流式输出的格式
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+# 时间序列数据行的列名（对应数据库查询的(wind_code, field_name, date, value)）
+SERIES_COLUMNS = ('wind_code', 'field', 'date', 'value')
+
+# 增量同步数据行的列名（对应(change_seq, wind_code, field_name, date, value, op)）
+CHANGE_COLUMNS = ('seq',) + SERIES_COLUMNS + ('op',)
+
+
+@timed('serialize')
+def format_rows(rows: List[Tuple], fmt: str, columns: Sequence[str] = SERIES_COLUMNS) -> str:
+    """将一块数据行格式化为NDJSON或CSV文本，columns为每行各列的名称"""
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue()
+
+
+def _next_chunk(chunks: Iterator[List[Tuple]], fmt: str, columns: Sequence[str]) -> Optional[str]:
+    """读取并格式化下一块数据，读完返回None（在db_executor线程中执行）"""
+    with phase('db'):
+        rows = next(chunks, None)
+    return None if rows is None else format_rows(rows, fmt, columns)
+
+
+def _close(chunks: Iterator[List[Tuple]]):
+    try:
+        chunks.close()
+    except ValueError:
+        # 客户端断开时生成器可能仍在线程池中执行，结束后由垃圾回收关闭连接
+        pass
+
+
+async def _stream(
+    executor: DBExecutor, chunks: Iterator[List[Tuple]], fmt: str, columns: Sequence[str], first: Optional[str]
+) -> AsyncIterator[str]:
+    try:
+        if fmt == 'csv':
+            yield ','.join(columns) + '\n'
+        if first is not None:
+            yield first
+
+        # 每块单独占用一次线程池名额，客户端读取慢时不会长期占住数据库线程
+        while True:
+            text = await executor.run(_next_chunk, chunks, fmt, columns)
+            if text is None:
+                break
+            yield text
+    finally:
+        _close(chunks)
+
+
+async def stream_rows(
+    executor: DBExecutor,
+    chunks: Iterator[List[Tuple]],
+    fmt: str,
+    require_rows: bool = False,
+    columns: Sequence[str] = SERIES_COLUMNS
+) -> Optional[StreamingResponse]:
+    """
+    以流式响应输出数据库游标读取的数据块
+
+    先读取第一块再开始响应：require_rows为True且没有数据时返回None，由调用方返回404。
+    """
+    first = await executor.run(_next_chunk, chunks, fmt, columns)
+    if first is None and require_rows:
+        _close(chunks)
+        return None
+
+    return StreamingResponse(_stream(executor, chunks, fmt, columns, first), media_type=MEDIA_TYPES[fmt])
@@ -84,10 +84,14 @@ class WindDataFetcher:
         wind_code: str, 
         field: str, 
         start_date: str, 
-        end_date: str
+        end_date: str,
+        options: str = ""
     ) -> Optional[pd.Series]:
         """
         获取单字段WSD数据
+
+        Args:
+            options: WindPy选项，如"Period=M"获取月末采样
         """
         try:
             self.logger.info(f"获取WSD单字段数据: {wind_code}.{field}, {start_date} - {end_date}")
@@ -98,7 +102,7 @@ class WindDataFetcher:
             
             if self.w:
                 # 使用WindPy
-                result = self.w.wsd(wind_code, field, start_date, end_date, "")
+                result = self.w.wsd(wind_code, field, start_date, end_date, options)
                 
                 if result.ErrorCode == 0:
                     data = result.Data
@@ -133,7 +137,8 @@ class WindDataFetcher:
         wind_code: str, 
         fields: List[str], 
         start_date: str, 
-        end_date: str
+        end_date: str,
+        options: str = ""
     ) -> Optional[pd.DataFrame]:
         """
         获取多字段WSD数据
@@ -143,6 +148,7 @@ class WindDataFetcher:
             fields: 字段列表
             start_date: 开始日期
             end_date: 结束日期
+            options: WindPy选项，如"Period=M"获取月末采样
             
         Returns:
             pd.DataFrame: 多字段时间序列数据，列名为字段名
@@ -157,7 +163,7 @@ class WindDataFetcher:
             if self.w:
                 # 使用WindPy批量获取多字段
                 field_str = ",".join(fields)
-                result = self.w.wsd(wind_code, field_str, start_date, end_date, "")
+                result = self.w.wsd(wind_code, field_str, start_date, end_date, options)
                 
                 if result.ErrorCode == 0:
                     data = result.Data
@@ -256,34 +262,41 @@ class WindDataFetcher:
     def fetch_data_by_indicator(
         self, 
         indicator: Dict[str, Any], 
-        start_date: str, 
-        end_date: str
+        start_date: str,
+        end_date: str,
+        fields: Optional[List[str]] = None,
+        options: str = ""
     ) -> Optional[pd.DataFrame]:
         """
         根据指标信息获取数据 - 支持多字段
-        
+
         Args:
             indicator: 指标信息字典，包含wind_code, data_source等
             start_date: 开始日期
             end_date: 结束日期
-            
+            fields: 只获取指定字段（WSD），为空时获取指标的所有字段
+            options: WSD的WindPy选项，如"Period=M"（EDB忽略）
+
         Returns:
             pd.DataFrame: 数据，如果是多字段则列名为字段名，单字段则列名为字段名
         """
         try:
             wind_code = indicator['wind_code']
             data_source = indicator.get('data_source', 'EDB')
-            
+
             if data_source == 'WSD':
-                # 从数据库获取该指标的所有字段
-                from src.database.models_v2 import DatabaseManager
-                db_manager = DatabaseManager()
-                fields = db_manager.get_indicator_fields(wind_code)
+                if fields:
+                    fields = [{'field_name': field_name} for field_name in fields]
+                else:
+                    # 从数据库获取该指标的所有字段
+                    from src.database.models_v2 import DatabaseManager
+                    db_manager = DatabaseManager()
+                    fields = db_manager.get_indicator_fields(wind_code)
                 
                 if len(fields) == 1:
                     # 单字段
                     field_name = fields[0]['field_name']
-                    series = self.fetch_wsd_single_field(wind_code, field_name, start_date, end_date)
+                    series = self.fetch_wsd_single_field(wind_code, field_name, start_date, end_date, options)
                     if series is not None:
                         return pd.DataFrame({field_name: series})
                     return None
@@ -291,7 +304,7 @@ class WindDataFetcher:
                 elif len(fields) > 1:
                     # 多字段
                     field_names = [f['field_name'] for f in fields]
-                    return self.fetch_wsd_multi_fields(wind_code, field_names, start_date, end_date)
+                    return self.fetch_wsd_multi_fields(wind_code, field_names, start_date, end_date, options)
                 
                 else:
                     self.logger.error(f"指标 {wind_code} 没有字段映射")
@@ -1,11 +1,32 @@
 import sqlite3
+import hashlib
+import math
+import json
+import time
 import pandas as pd
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Iterable
 import os
+from src.utils.request_timing import timed
+
+
+# 写入数据点：值没有变化时不更新（不分配新的变更序号，也不计入total_changes）
+UPSERT_POINT_SQL = '''
+    INSERT INTO time_series_data (wind_code, field_name, date, value, change_seq)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (wind_code, field_name, date) DO UPDATE
+    SET value = excluded.value, change_seq = excluded.change_seq
+    WHERE time_series_data.value IS NOT excluded.value
+'''
 
 
 class DatabaseManager:
+    # 写入和租约操作等待其他进程释放写锁的时间（秒）
+    busy_timeout = 30
+
+    # 指标元数据（indicators/indicator_fields）在series_versions中的版本键
+    METADATA_VERSION_KEY = "__indicators__"
+
     def __init__(self, db_path: str = "data/financial_data.db"):
         self.db_path = db_path
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
@@ -52,6 +73,7 @@ class DatabaseManager:
                     date TEXT NOT NULL,
                     value REAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    change_seq INTEGER NOT NULL DEFAULT 0,  -- 最近一次值变化的变更序号
                     FOREIGN KEY (wind_code) REFERENCES indicators (wind_code),
                     UNIQUE(wind_code, field_name, date)
                 )
@@ -63,7 +85,7 @@ class DatabaseManager:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     wind_code TEXT NOT NULL,
                     field_name TEXT,  -- 字段名，为空表示所有字段
-                    update_type TEXT NOT NULL,  -- 'full', 'incremental', 'retry'
+                    update_type TEXT NOT NULL,  -- 'full', 'incremental', 'retry', 'revision', 'deep_check', 'repair'
                     start_date TEXT,
                     end_date TEXT,
                     records_count INTEGER,
@@ -90,12 +112,297 @@ class DatabaseManager:
                 ON indicators (category)
             ''')
             
+            # 指标列表按(category, name)排序和键集分页
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_indicators_category_name 
+                ON indicators (category, name, wind_code)
+            ''')
+            
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_indicator_fields_wind_code 
                 ON indicator_fields (wind_code)
             ''')
             
+            # 5. 序列年度校验和表（用于与Wind比对数据漂移）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS series_checksums (
+                    wind_code TEXT NOT NULL,
+                    field_name TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    value_sum REAL,
+                    value_hash TEXT NOT NULL,  -- 全部(日期, 数值)的哈希
+                    sample_hash TEXT NOT NULL,  -- 月末采样值的哈希
+                    first_date TEXT,
+                    last_date TEXT,
+                    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (wind_code, field_name, year)
+                )
+            ''')
+            
+            # 6. 调度任务状态表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scheduler_jobs (
+                    job_name TEXT PRIMARY KEY,
+                    next_run_time TEXT,
+                    last_start TEXT,
+                    last_end TEXT,
+                    last_status TEXT,  -- 'success', 'failed', 'skipped', 'missed'
+                    last_duration REAL,
+                    schedule_spec TEXT,  -- 计算next_run_time时的调度规则（JSON），规则变化后重新计算
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(scheduler_jobs)")}
+            if 'schedule_spec' not in columns:
+                cursor.execute("ALTER TABLE scheduler_jobs ADD COLUMN schedule_spec TEXT")
+            
+            # 7. 调度任务运行记录表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scheduler_job_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_name TEXT NOT NULL,
+                    scheduled_time TEXT,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    duration_seconds REAL,
+                    status TEXT NOT NULL,  -- 'success', 'failed', 'skipped', 'missed'
+                    error_message TEXT
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scheduler_job_runs_job_name
+                ON scheduler_job_runs (job_name, id)
+            ''')
+            
+            # 8. 指标工作租约表（多个更新进程共享一个数据库时划分工作）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS work_leases (
+                    wind_code TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,  -- 持有者（主机:进程:实例）
+                    run_id TEXT NOT NULL,  -- 同一次多进程更新的所有worker共享
+                    phase TEXT NOT NULL,  -- 更新阶段，如 'incremental', 'revision'
+                    status TEXT NOT NULL,  -- 'leased' or 'done'
+                    expires_at REAL NOT NULL,  -- Unix时间戳
+                    completed_at REAL,  -- 标记为done的Unix时间戳
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(work_leases)")}
+            if 'completed_at' not in columns:
+                cursor.execute("ALTER TABLE work_leases ADD COLUMN completed_at REAL")
+            
+            # 9. 更新运行记录表（每次更新任务一行，多进程更新时每个worker一行）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS update_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    worker_id TEXT,
+                    strategy TEXT NOT NULL,  -- 更新方法名，如 'incremental_update'
+                    status TEXT NOT NULL,  -- 'success', 'partial'（时间预算用完） or 'failed'
+                    started_at TEXT NOT NULL,
+                    ended_at TEXT,
+                    duration_seconds REAL,
+                    indicators INTEGER DEFAULT 0,  -- 领取的指标数
+                    requests INTEGER DEFAULT 0,  -- Wind请求数
+                    success INTEGER DEFAULT 0,  -- 写入成功的字段数（指标 x 字段）
+                    failed INTEGER DEFAULT 0,  -- 获取或写入失败的字段数
+                    points_written INTEGER DEFAULT 0,
+                    transactions INTEGER DEFAULT 0,
+                    planning_seconds REAL DEFAULT 0,
+                    fetch_seconds REAL DEFAULT 0,
+                    decode_seconds REAL DEFAULT 0,
+                    write_seconds REAL DEFAULT 0,
+                    log_seconds REAL DEFAULT 0,
+                    error_message TEXT
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_update_runs_strategy
+                ON update_runs (strategy, id)
+            ''')
+            
+            # 10. 更新运行直方图表（按数据源聚合的请求延迟和返回行数）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS update_run_histograms (
+                    run_row_id INTEGER NOT NULL,  -- update_runs.id
+                    metric TEXT NOT NULL,  -- 'fetch_latency'（秒） or 'rows'
+                    data_source TEXT NOT NULL,
+                    bucket_le REAL,  -- 桶上界，NULL表示+inf
+                    count INTEGER NOT NULL,
+                    total INTEGER NOT NULL,  -- 该数据源的观测总数
+                    sum REAL NOT NULL,  -- 该数据源的观测值总和
+                    FOREIGN KEY (run_row_id) REFERENCES update_runs (id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_update_run_histograms_run
+                ON update_run_histograms (run_row_id)
+            ''')
+            
+            # 11. 重试队列表（失败的(指标, 字段, 日期区间)，按指数退避重试）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS retry_queue (
+                    wind_code TEXT NOT NULL,
+                    field_name TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL,
+                    update_type TEXT NOT NULL,  -- 首次失败时的更新类型
+                    attempts INTEGER NOT NULL DEFAULT 0,  -- 已重试次数
+                    next_eligible_at REAL NOT NULL,  -- Unix时间戳，之前不会被重试
+                    status TEXT NOT NULL,  -- 'pending', 'done' or 'dead'
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (wind_code, field_name, start_date, end_date)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_retry_queue_status_next
+                ON retry_queue (status, next_eligible_at)
+            ''')
+            
+            # 12. 序列访问需求表（API和报告读取次数，用于更新优先级）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS series_access (
+                    wind_code TEXT PRIMARY KEY,
+                    read_count INTEGER NOT NULL DEFAULT 0,  -- 累计读取次数
+                    demand REAL NOT NULL DEFAULT 0,  -- 按半衰期衰减的读取需求分数（截至last_read_at）
+                    last_read_at REAL NOT NULL,  -- Unix时间戳
+                    last_source TEXT  -- 最近一次读取来源，如 'api', 'report'
+                )
+            ''')
+            
+            # 13. 序列版本表（每次写入数据时递增，API据此生成ETag/Last-Modified）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS series_versions (
+                    wind_code TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,  -- 最近一次写入的Unix时间戳
+                    change_seq INTEGER NOT NULL DEFAULT 0  -- 最近一次写入的变更序号，API缓存失效按此轮询
+                )
+            ''')
+            
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(series_versions)")}
+            if 'change_seq' not in columns:
+                cursor.execute("ALTER TABLE series_versions ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_series_versions_change_seq
+                ON series_versions (change_seq)
+            ''')
+            
+            # 14. 变更序号（每个写入事务分配一个，增量同步按序号读取变化的数据点）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_sequence (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    seq INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute("INSERT OR IGNORE INTO change_sequence (id, seq) VALUES (1, 0)")
+            
+            # 旧数据库的time_series_data没有change_seq列，补充该列（已有数据点的序号为0）
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(time_series_data)")}
+            if 'change_seq' not in columns:
+                cursor.execute("ALTER TABLE time_series_data ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_time_series_change_seq
+                ON time_series_data (change_seq)
+            ''')
+            
+            # 15. 服务锁表（保证调度器等服务只有一个实例运行，持有者定期续期）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS service_locks (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,  -- 主机名:进程号
+                    acquired_at REAL NOT NULL,
+                    heartbeat_at REAL NOT NULL,
+                    expires_at REAL NOT NULL  -- 未续期时锁在此时间后失效，可由其他实例接管
+                )
+            ''')
+            
+            # 16. 分析会话表（API多个worker进程共享，过期后失效）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,  -- JSON格式的解析结果
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_analysis_sessions_expires
+                ON analysis_sessions (expires_at)
+            ''')
+            
+            # 17. 指标最近更新状态表（与update_logs在同一事务中维护，/status按更新时间索引读取）
+            status_table_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'indicator_update_status'"
+            ).fetchone()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS indicator_update_status (
+                    wind_code TEXT PRIMARY KEY,
+                    update_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    records_count INTEGER,
+                    update_time TIMESTAMP NOT NULL
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_indicator_update_status_time
+                ON indicator_update_status (update_time)
+            ''')
+            
+            if not status_table_exists:
+                # 新建表时从已有的更新日志回填每个指标最近一次更新
+                cursor.execute('''
+                    INSERT INTO indicator_update_status (wind_code, update_type, status, records_count, update_time)
+                    SELECT wind_code, update_type, status, records_count, MAX(update_time)
+                    FROM update_logs
+                    GROUP BY wind_code
+                ''')
+            
+            # 18. 待刷新的(序列, 年份)校验和（写事务中只登记，提交后由refresh_dirty_checksums重新计算）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS series_checksum_dirty (
+                    wind_code TEXT NOT NULL,
+                    field_name TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    change_seq INTEGER NOT NULL,  -- 最近一次登记时的变更序号，刷新期间再次写入时保留登记
+                    PRIMARY KEY (wind_code, field_name, year)
+                )
+            ''')
+            
+            # 19. 已删除数据点的墓碑（漂移修复删除本地数据点时记录变更序号，增量同步据此下发删除）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS time_series_tombstones (
+                    wind_code TEXT NOT NULL,
+                    field_name TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    change_seq INTEGER NOT NULL,  -- 删除所在写入事务的变更序号
+                    PRIMARY KEY (wind_code, field_name, date)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_time_series_tombstones_change_seq
+                ON time_series_tombstones (change_seq)
+            ''')
+            
             conn.commit()
+        
+        # WAL模式允许多个更新进程和API读者并发访问同一个数据库
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
     
     def load_indicators_from_excel(self, excel_path: str):
         """从Excel文件加载指标到数据库"""
@@ -133,6 +440,7 @@ class DatabaseManager:
                         VALUES (?, ?, ?)
                     ''', (wind_code, 'value', '数值'))
             
+            self._bump_series_versions(conn, [self.METADATA_VERSION_KEY])
             conn.commit()
     
     def _get_field_display_name(self, field_name):
@@ -150,22 +458,48 @@ class DatabaseManager:
         }
         return field_mapping.get(field_name, field_name)
     
-    def get_indicators(self, category: Optional[str] = None) -> List[Dict]:
-        """获取指标列表"""
+    @timed('db')
+    def get_indicators(
+        self,
+        category: Optional[str] = None,
+        after: Optional[Tuple[str, str, str]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        获取指标列表，按(category, name, wind_code)排序
+        
+        Args:
+            after: 键集分页，只返回排在(category, name, wind_code)之后的指标
+            limit: 最多返回的指标数
+        """
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
+            # 范围条件和排序都由(category, name, wind_code)索引满足，不做OFFSET扫描
             if category:
-                cursor.execute(
-                    "SELECT * FROM indicators WHERE category = ? ORDER BY name",
-                    (category,)
-                )
+                query = "SELECT * FROM indicators WHERE category = ?"
+                params = [category]
+                if after:
+                    query += " AND (name, wind_code) > (?, ?)"
+                    params.extend(after[1:])
+                query += " ORDER BY name, wind_code"
             else:
-                cursor.execute("SELECT * FROM indicators ORDER BY category, name")
+                query = "SELECT * FROM indicators"
+                params = []
+                if after:
+                    query += " WHERE (category, name, wind_code) > (?, ?, ?)"
+                    params.extend(after)
+                query += " ORDER BY category, name, wind_code"
+            
+            if limit:
+                query += " LIMIT ?"
+                params.append(limit)
             
+            cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    @timed('db')
     def get_indicator_fields(self, wind_code: str) -> List[Dict]:
         """获取指标的所有字段"""
         with sqlite3.connect(self.db_path) as conn:
@@ -178,14 +512,15 @@ class DatabaseManager:
             return [dict(row) for row in cursor.fetchall()]
     
     def insert_time_series_data(self, wind_code: str, field_name: str, data: pd.DataFrame):
-        """插入单字段时间序列数据"""
+        """插入单字段时间序列数据（值没有变化的数据点不更新）"""
         with sqlite3.connect(self.db_path) as conn:
+            seq = self._next_change_seq(conn)
+            changes = conn.total_changes
             for date_str, value in data.items():
                 if pd.notna(value):
-                    conn.execute('''
-                        INSERT OR REPLACE INTO time_series_data (wind_code, field_name, date, value)
-                        VALUES (?, ?, ?, ?)
-                    ''', (wind_code, field_name, str(date_str)[:10], float(value)))
+                    conn.execute(UPSERT_POINT_SQL, (wind_code, field_name, str(date_str)[:10], float(value), seq))
+            if conn.total_changes > changes:
+                self._bump_series_versions(conn, [wind_code], seq)
             conn.commit()
     
     def insert_multi_field_data(self, wind_code: str, data: pd.DataFrame):
@@ -196,16 +531,18 @@ class DatabaseManager:
             data: 包含多字段的DataFrame，列名为字段名，索引为日期
         """
         with sqlite3.connect(self.db_path) as conn:
+            seq = self._next_change_seq(conn)
+            changes = conn.total_changes
             for date_idx, row in data.iterrows():
                 date_str = str(date_idx)[:10]
                 for field_name, value in row.items():
                     if pd.notna(value):
-                        conn.execute('''
-                            INSERT OR REPLACE INTO time_series_data (wind_code, field_name, date, value)
-                            VALUES (?, ?, ?, ?)
-                        ''', (wind_code, field_name, date_str, float(value)))
+                        conn.execute(UPSERT_POINT_SQL, (wind_code, field_name, date_str, float(value), seq))
+            if conn.total_changes > changes:
+                self._bump_series_versions(conn, [wind_code], seq)
             conn.commit()
     
+    @timed('db')
     def get_time_series_data(
         self, 
         wind_code: str, 
@@ -245,6 +582,146 @@ class DatabaseManager:
                         df = df['value'].to_frame('value')
             
             return df
+
+    @timed('db')
+    def get_category_counts(self) -> Dict[str, int]:
+        """各类别的指标数量（只读取类别索引）"""
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute(
+                "SELECT category, COUNT(*) FROM indicators GROUP BY category ORDER BY category"
+            ).fetchall())
+    
+    @timed('db')
+    def get_recent_updates(self, limit: int = 10) -> List[Dict]:
+        """最近更新的指标（每个指标只返回最近一次更新，按更新时间索引倒序读取）"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute('''
+                SELECT wind_code, update_type, status, records_count, update_time AS last_update
+                FROM indicator_update_status
+                ORDER BY update_time DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()]
+    
+    @timed('db')
+    def get_categories(self) -> List[str]:
+        """获取所有指标类别"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT DISTINCT category FROM indicators ORDER BY category").fetchall()
+            return [row[0] for row in rows]
+
+    def _series_query(
+        self,
+        wind_codes: List[str],
+        fields: Optional[List[str]],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None
+    ):
+        """
+        构造按指标、字段、日期过滤的查询，字段过滤下推到SQL，走(wind_code, field_name, date)索引
+
+        after为(field_name, date)键集分页位置（用于单个指标），limit为最多返回行数
+        """
+        # 排序与该索引一致，固定使用它，避免规划器选择(wind_code, date)索引后再排序
+        select = (
+            "SELECT wind_code, field_name, date, value FROM time_series_data "
+            "INDEXED BY idx_time_series_wind_code_field_date WHERE "
+        )
+
+        def branch(field_condition: str, field_params: List[str], lower_op: str, lower_date: Optional[str]):
+            conditions = [f"wind_code IN ({','.join('?' * len(wind_codes))})"]
+            branch_params = list(wind_codes)
+            if field_condition:
+                conditions.append(field_condition)
+                branch_params.extend(field_params)
+            if lower_date:
+                conditions.append(f"date {lower_op} ?")
+                branch_params.append(lower_date)
+            if end_date:
+                conditions.append("date <= ?")
+                branch_params.append(end_date)
+            return select + " AND ".join(conditions), branch_params
+
+        def in_fields(names: List[str]):
+            return f"field_name IN ({','.join('?' * len(names))})", names
+
+        if after is None:
+            branches = [branch(*(in_fields(fields) if fields else ("", [])), ">=", start_date)]
+        else:
+            # 键集分页拆成两段索引范围：游标所在字段中之后的日期 + 排在其后的字段。
+            # 直接写(field_name, date) > (?, ?)时，SQLite可能以date >= start_date作为
+            # 索引下界，越往后的页扫描越多
+            field_name, date = after
+            branches = []
+            if not fields or field_name in fields:
+                if start_date and start_date > date:
+                    branches.append(branch("field_name = ?", [field_name], ">=", start_date))
+                else:
+                    branches.append(branch("field_name = ?", [field_name], ">", date))
+            if not fields:
+                branches.append(branch("field_name > ?", [field_name], ">=", start_date))
+            elif any(name > field_name for name in fields):
+                branches.append(branch(*in_fields([name for name in fields if name > field_name]), ">=", start_date))
+            if not branches:
+                branches.append(branch(*in_fields([]), ">=", None))
+
+        query = " UNION ALL ".join(branch_query for branch_query, _ in branches)
+        params = [param for _, branch_params in branches for param in branch_params]
+
+        query += " ORDER BY wind_code, field_name, date"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
+
+    @timed('db')
+    def get_time_series_frame(
+        self,
+        wind_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        一次查询读取多个指标的数据，返回长表（wind_code, field_name, date, value），
+        按指标、字段、日期排序；fields为空时返回全部字段，不做透视
+        
+        单个指标分页时传入上一页最后一行的(field_name, date)作为after，每页为一次索引范围查询
+        """
+        query, params = self._series_query(wind_codes, fields, start_date, end_date, after, limit)
+        with sqlite3.connect(self.db_path) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def iter_time_series_rows(
+        self,
+        wind_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        chunk_size: int = 5000,
+        fields: Optional[List[str]] = None
+    ):
+        """
+        按块读取多个指标的时间序列数据（生成器），每块为[(wind_code, field_name, date, value), ...]
+
+        逐个指标按字段、日期顺序从游标读取，内存占用只与chunk_size有关。
+        连接允许跨线程使用，调用方可以在不同的线程池线程中依次推进生成器。
+        """
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            for wind_code in wind_codes:
+                query, params = self._series_query([wind_code], fields, start_date, end_date)
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            conn.close()
     
     def log_update(
         self, 
@@ -258,13 +735,1104 @@ class DatabaseManager:
         error_message: Optional[str] = None
     ):
         """记录更新日志"""
+        with sqlite3.connect(self.db_path) as conn:
+            self._insert_update_logs(conn, wind_code, [{
+                'field_name': field_name, 'update_type': update_type, 'start_date': start_date,
+                'end_date': end_date, 'records_count': records_count, 'status': status,
+                'error_message': error_message
+            }])
+            conn.commit()
+    
+    def write_update_batch(self, entries: List[Dict[str, Any]], retry_delay: float = 300) -> Dict[str, Any]:
+        """在一个事务中写入一批指标的数据和更新日志
+
+        每个指标在独立的SAVEPOINT中写入，单个指标写入失败只回滚该指标自身，
+        并记录一条失败日志，不影响同一批次的其他指标。
+
+        Args:
+            entries: 指标写入列表，每项包含：
+                wind_code: Wind代码
+                field_data: 字段名 -> 以日期为索引的pd.Series
+                logs: 更新日志列表，字段与log_update参数一致
+                retry_fields: 可选，获取失败需要加入重试队列的字段
+                replace_range: 可选，(开始日期, 结束日期)，写入的字段在该区间内以本次数据为准，
+                    删除本次数据中没有的本地数据点（用于漂移修复）
+
+            写入成功的字段会同时完成重试队列中被本次日期范围覆盖的待重试项；
+            获取或写入失败的字段在同一事务中加入重试队列。日期范围和更新类型取第一条日志。
+            retry_delay: 新加入重试队列的区间首次可重试前的等待时间（秒）
+
+        Returns:
+            Dict: {'failed': {wind_code: 错误信息}, 'transactions': 提交事务数,
+                   'log_seconds': 其中写入更新日志的耗时}
+        """
+        failed = {}
+        transactions = 0
+        timings = {'log_seconds': 0.0}
+        retry_at = time.time() + retry_delay
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.busy_timeout)
+        try:
+            try:
+                conn.execute("BEGIN")
+                for entry in entries:
+                    error = self._write_update_entry(conn, entry, timings, retry_at)
+                    if error:
+                        failed[entry['wind_code']] = error
+                conn.execute("COMMIT")
+                transactions += 1
+            except sqlite3.Error:
+                # 整批提交失败（如数据库被锁），退回到逐个指标独立事务
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                failed = {}
+                for entry in entries:
+                    try:
+                        conn.execute("BEGIN")
+                        error = self._write_update_entry(conn, entry, timings, retry_at)
+                        conn.execute("COMMIT")
+                        transactions += 1
+                    except sqlite3.Error as e:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        error = str(e)
+                    if error:
+                        failed[entry['wind_code']] = error
+        finally:
+            conn.close()
+
+        return {'failed': failed, 'transactions': transactions, 'log_seconds': timings['log_seconds']}
+
+    def _write_update_entry(
+        self,
+        conn: sqlite3.Connection,
+        entry: Dict[str, Any],
+        timings: Optional[Dict[str, float]] = None,
+        retry_at: Optional[float] = None
+    ) -> Optional[str]:
+        """在SAVEPOINT中写入单个指标，失败时回滚该指标并返回错误信息"""
+        wind_code = entry['wind_code']
+        # 日期范围和更新类型取第一条日志
+        first_log = (entry.get('logs') or [{}])[0]
+        conn.execute("SAVEPOINT indicator_write")
+        try:
+            changed = False
+            seq = self._next_change_seq(conn) if entry.get('field_data') else None
+            for field_name, series in entry.get('field_data', {}).items():
+                changes = conn.total_changes
+                rows = [
+                    (wind_code, field_name, str(date_idx)[:10], float(value), seq)
+                    for date_idx, value in series.items()
+                    if pd.notna(value)
+                ]
+                years = {int(row[2][:4]) for row in rows}
+                if entry.get('replace_range'):
+                    years |= self._delete_missing_points(
+                        conn, wind_code, field_name, entry['replace_range'], {row[2] for row in rows}, seq
+                    )
+                conn.executemany(UPSERT_POINT_SQL, rows)
+                
+                # 有数据点变化时只登记受影响的年份，校验和在事务提交后重新计算，不占用写锁
+                if conn.total_changes > changes:
+                    changed = True
+                    self._mark_checksums_dirty(conn, wind_code, field_name, years, seq)
+            
+            # 修订刷新重新获取的数据没有变化时不递增版本，API的ETag和缓存保持有效
+            if changed:
+                self._bump_series_versions(conn, [wind_code], seq)
+            self._insert_update_logs(conn, wind_code, entry.get('logs', []), timings)
+
+            if entry.get('field_data'):
+                self._resolve_retries(conn, wind_code, list(entry['field_data']), first_log)
+            if entry.get('retry_fields'):
+                # 部分字段失败时错误信息取第一条失败日志
+                error_log = next(
+                    (log for log in entry.get('logs', []) if log.get('status') == 'failed'), first_log
+                )
+                self._enqueue_retries(
+                    conn, wind_code, entry['retry_fields'], first_log,
+                    error_log.get('error_message'), retry_at
+                )
+            conn.execute("RELEASE SAVEPOINT indicator_write")
+            return None
+
+        except Exception as e:
+            conn.execute("ROLLBACK TO SAVEPOINT indicator_write")
+            conn.execute("RELEASE SAVEPOINT indicator_write")
+
+            # 记录失败日志，取第一条日志的更新范围
+            self._insert_update_logs(conn, wind_code, [{
+                'field_name': None,
+                'update_type': first_log.get('update_type', 'incremental'),
+                'start_date': first_log.get('start_date'),
+                'end_date': first_log.get('end_date'),
+                'records_count': 0,
+                'status': 'failed',
+                'error_message': f"写入失败: {e}"
+            }], timings)
+
+            retry_fields = list(entry.get('field_data', {})) + list(entry.get('retry_fields') or [])
+            if retry_fields:
+                self._enqueue_retries(conn, wind_code, retry_fields, first_log, f"写入失败: {e}", retry_at)
+            return str(e)
+
+    def _delete_missing_points(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        field_name: str,
+        date_range: Tuple[str, str],
+        keep_dates: set,
+        seq: int
+    ) -> set:
+        """
+        删除区间内不在keep_dates中的本地数据点（如Wind已撤销的日期），返回受影响的年份
+        
+        每个删除的数据点以本次写入的变更序号记录墓碑，/changes和推送据此向下游下发删除。
+        """
+        start_date, end_date = date_range
+        stale_dates = [
+            date_str for (date_str,) in conn.execute('''
+                SELECT date FROM time_series_data
+                WHERE wind_code = ? AND field_name = ? AND date >= ? AND date <= ?
+            ''', (wind_code, field_name, start_date, end_date))
+            if date_str not in keep_dates
+        ]
+        conn.executemany(
+            "DELETE FROM time_series_data WHERE wind_code = ? AND field_name = ? AND date = ?",
+            [(wind_code, field_name, date_str) for date_str in stale_dates]
+        )
+        conn.executemany('''
+            INSERT INTO time_series_tombstones (wind_code, field_name, date, change_seq) VALUES (?, ?, ?, ?)
+            ON CONFLICT(wind_code, field_name, date) DO UPDATE SET change_seq = excluded.change_seq
+        ''', [(wind_code, field_name, date_str, seq) for date_str in stale_dates])
+        return {int(date_str[:4]) for date_str in stale_dates}
+    
+    def _insert_update_logs(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        logs: List[Dict[str, Any]],
+        timings: Optional[Dict[str, float]] = None
+    ):
+        """
+        在给定连接上写入更新日志，同时更新指标最近更新状态，
+        传入timings时累计耗时到timings['log_seconds']
+        """
+        if not logs:
+            return
+        started = time.perf_counter()
+        conn.executemany('''
+            INSERT INTO update_logs
+            (wind_code, field_name, update_type, start_date, end_date, records_count, status, error_message)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                wind_code, log.get('field_name'), log['update_type'], log.get('start_date'),
+                log.get('end_date'), log.get('records_count', 0), log['status'], log.get('error_message')
+            )
+            for log in logs
+        ])
+        latest = logs[-1]
+        conn.execute('''
+            INSERT INTO indicator_update_status (wind_code, update_type, status, records_count, update_time)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(wind_code) DO UPDATE SET
+                update_type = excluded.update_type,
+                status = excluded.status,
+                records_count = excluded.records_count,
+                update_time = excluded.update_time
+        ''', (wind_code, latest['update_type'], latest['status'], latest.get('records_count', 0)))
+        if timings is not None:
+            timings['log_seconds'] += time.perf_counter() - started
+
+    def _enqueue_retries(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        fields: List[str],
+        log: Dict[str, Any],
+        error: Optional[str],
+        retry_at: Optional[float] = None
+    ):
+        """将失败的(字段, 日期区间)加入重试队列；已完成或已放弃的同一区间重新开始计数"""
+        if not log.get('start_date') or not log.get('end_date'):
+            return
+        conn.executemany('''
+            INSERT INTO retry_queue
+            (wind_code, field_name, start_date, end_date, update_type, attempts, next_eligible_at, status, last_error)
+            VALUES (?, ?, ?, ?, ?, 0, ?, 'pending', ?)
+            ON CONFLICT(wind_code, field_name, start_date, end_date) DO UPDATE SET
+                attempts = CASE WHEN retry_queue.status = 'pending' THEN retry_queue.attempts ELSE 0 END,
+                next_eligible_at = CASE WHEN retry_queue.status = 'pending'
+                                        THEN retry_queue.next_eligible_at ELSE excluded.next_eligible_at END,
+                status = 'pending',
+                last_error = excluded.last_error,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [
+            (
+                wind_code, field_name, log['start_date'], log['end_date'],
+                log.get('update_type', 'incremental'), retry_at or time.time(), error
+            )
+            for field_name in fields
+        ])
+
+    def _resolve_retries(self, conn: sqlite3.Connection, wind_code: str, fields: List[str], log: Dict[str, Any]):
+        """完成被本次成功写入的日期范围覆盖的待重试项"""
+        if not log.get('start_date') or not log.get('end_date'):
+            return
+        conn.executemany('''
+            UPDATE retry_queue SET status = 'done', updated_at = CURRENT_TIMESTAMP
+            WHERE wind_code = ? AND field_name = ? AND status = 'pending'
+              AND start_date >= ? AND end_date <= ?
+        ''', [(wind_code, field_name, log['start_date'], log['end_date']) for field_name in fields])
+
+    def get_due_retries(self, limit: Optional[int] = None, include_future: bool = False) -> List[Dict]:
+        """获取到期的待重试项
+
+        Args:
+            limit: 最多返回的条数
+            include_future: 为True时忽略退避时间，返回所有pending项
+        """
+        query = "SELECT * FROM retry_queue WHERE status = 'pending'"
+        params = []
+        if not include_future:
+            query += " AND next_eligible_at <= ?"
+            params.append(time.time())
+        query += " ORDER BY next_eligible_at, wind_code, field_name, start_date"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def record_retry_attempts(self, items: List[Dict[str, Any]], backoff_base: float, backoff_max: float):
+        """登记一次重试尝试：尝试次数加1，并按指数退避推迟下一次可重试时间
+
+        在发起请求之前调用；请求成功时写入会将被覆盖的待重试项标记为done，
+        失败或部分字段无数据时保留退避后的时间。
+        """
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            conn.executemany('''
+                UPDATE retry_queue
+                SET attempts = attempts + 1, next_eligible_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE wind_code = ? AND field_name = ? AND start_date = ? AND end_date = ? AND status = 'pending'
+            ''', [
+                (
+                    now + min(backoff_max, backoff_base * 2 ** (item['attempts'] + 1)),
+                    item['wind_code'], item['field_name'], item['start_date'], item['end_date']
+                )
+                for item in items
+            ])
+            conn.commit()
+
+    def give_up_retries(self, items: List[Dict[str, Any]]):
+        """将超过最大重试次数的待重试项标记为dead"""
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            conn.executemany('''
+                UPDATE retry_queue SET status = 'dead', updated_at = CURRENT_TIMESTAMP
+                WHERE wind_code = ? AND field_name = ? AND start_date = ? AND end_date = ? AND status = 'pending'
+            ''', [
+                (item['wind_code'], item['field_name'], item['start_date'], item['end_date'])
+                for item in items
+            ])
+            conn.commit()
+
+    def get_retry_queue_summary(self) -> Dict[str, int]:
+        """按状态统计重试队列，另含当前到期的pending数"""
+        with sqlite3.connect(self.db_path) as conn:
+            summary = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM retry_queue GROUP BY status"
+            ).fetchall())
+            summary['due'] = conn.execute(
+                "SELECT COUNT(*) FROM retry_queue WHERE status = 'pending' AND next_eligible_at <= ?",
+                (time.time(),)
+            ).fetchone()[0]
+            return summary
+
+    @timed('db')
+    def record_series_access(
+        self,
+        wind_codes: List[str],
+        source: str = "api",
+        weight: float = 1.0,
+        half_life_days: float = 14
+    ):
+        """记录序列被读取，需求分数按半衰期衰减后累加weight
+        
+        Args:
+            wind_codes: 被读取的Wind代码
+            source: 读取来源，如 'api', 'report'
+            weight: 本次读取的权重（报告等固定产出可以给更高权重）
+            half_life_days: 需求分数的半衰期（天）
+        """
+        self.record_series_access_counts(dict.fromkeys(wind_codes, 1), source, weight, half_life_days)
+    
+    def record_series_access_counts(
+        self,
+        counts: Dict[str, int],
+        source: str = "api",
+        weight: float = 1.0,
+        half_life_days: float = 14
+    ):
+        """一次写入多个序列的累计读取次数（API在内存中计数后定期合并写入），每次读取计weight"""
+        now = time.time()
+        half_life = half_life_days * 86400
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            # SQLite不一定编译了数学函数，衰减因子用Python函数计算
+            conn.create_function("decay", 1, lambda age: 0.5 ** (age / half_life), deterministic=True)
+            conn.executemany('''
+                INSERT INTO series_access (wind_code, read_count, demand, last_read_at, last_source)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(wind_code) DO UPDATE SET
+                    read_count = series_access.read_count + excluded.read_count,
+                    demand = series_access.demand * decay(excluded.last_read_at - series_access.last_read_at)
+                             + excluded.demand,
+                    last_read_at = excluded.last_read_at,
+                    last_source = excluded.last_source
+            ''', [(wind_code, count, weight * count, now, source) for wind_code, count in counts.items()])
+            conn.commit()
+
+    def get_series_demand(self, half_life_days: float = 14) -> Dict[str, float]:
+        """获取每个序列当前的需求分数（衰减到当前时间）"""
+        now = time.time()
+        half_life = half_life_days * 86400
+        with sqlite3.connect(self.db_path) as conn:
+            return {
+                wind_code: demand * 0.5 ** ((now - last_read_at) / half_life)
+                for wind_code, demand, last_read_at in conn.execute(
+                    "SELECT wind_code, demand, last_read_at FROM series_access"
+                ).fetchall()
+            }
+
+    def _next_change_seq(self, conn: sqlite3.Connection) -> int:
+        """
+        在写入事务中分配下一个变更序号
+        
+        写事务串行执行，序号在持有写锁期间分配，提交顺序与序号顺序一致：
+        读者看到某个序号时，所有更小序号的写入都已提交。
+        """
+        conn.execute("UPDATE change_sequence SET seq = seq + 1 WHERE id = 1")
+        return conn.execute("SELECT seq FROM change_sequence WHERE id = 1").fetchone()[0]
+    
+    def get_change_watermark(self) -> int:
+        """当前变更序号（所有不大于它的写入都已提交）"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("SELECT seq FROM change_sequence WHERE id = 1").fetchone()[0]
+    
+    @timed('db')
+    def open_changes(
+        self,
+        since: Optional[int] = None,
+        wind_codes: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 5000
+    ) -> Tuple[int, Iterator[List[Tuple]]]:
+        """
+        读取变更序号大于since的数据点（增量同步）
+        
+        在同一个读事务中读取当前水位和变化的数据点，返回(水位, 按块读取的生成器)，
+        每块为[(change_seq, wind_code, field_name, date, value, op), ...]，按变更序号排序，
+        同一数据点只返回最新状态：op为'upsert'（新增或修订）或'delete'（已删除，value为None）。
+        since为None时返回全部现存数据点（首次全量同步，不含删除），
+        下一次同步以本次返回的水位作为since。连接允许跨线程使用。
+        
+        Raises:
+            ValueError: since大于当前水位（数据库被重建或恢复，需要全量同步）
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        try:
+            conn.execute("BEGIN")
+            watermark = conn.execute("SELECT seq FROM change_sequence WHERE id = 1").fetchone()[0]
+            if since is not None and since > watermark:
+                raise ValueError(f"since={since} 大于当前水位 {watermark}，请重新全量同步")
+            
+            filters = ""
+            filter_params = []
+            if wind_codes:
+                filters += f" AND wind_code IN ({','.join('?' * len(wind_codes))})"
+                filter_params.extend(wind_codes)
+            if fields:
+                filters += f" AND field_name IN ({','.join('?' * len(fields))})"
+                filter_params.extend(fields)
+            
+            query = (
+                "SELECT change_seq, wind_code, field_name, date, value, 'upsert' AS op FROM time_series_data "
+                "WHERE change_seq > ?" + filters
+            )
+            params = [-1 if since is None else since] + filter_params
+            if since is not None:
+                # 删除后又重新写入的数据点以现存数据为准，不再下发删除
+                query += (
+                    " UNION ALL SELECT t.change_seq, t.wind_code, t.field_name, t.date, NULL, 'delete' "
+                    "FROM time_series_tombstones t WHERE t.change_seq > ?" + filters.replace(" AND ", " AND t.") +
+                    " AND NOT EXISTS (SELECT 1 FROM time_series_data d WHERE d.wind_code = t.wind_code "
+                    "AND d.field_name = t.field_name AND d.date = t.date)"
+                )
+                params += [since] + filter_params
+            cursor = conn.execute(query + " ORDER BY change_seq", params)
+        except Exception:
+            conn.close()
+            raise
+        
+        def chunks():
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                conn.close()
+        
+        return watermark, chunks()
+    
+    def _bump_series_versions(self, conn: sqlite3.Connection, wind_codes: List[str], seq: Optional[int] = None):
+        """在写入数据的同一事务中递增序列版本，并记录写入的变更序号（未传入时分配一个）"""
+        now = time.time()
+        if seq is None:
+            seq = self._next_change_seq(conn)
+        conn.executemany('''
+            INSERT INTO series_versions (wind_code, version, updated_at, change_seq) VALUES (?, 1, ?, ?)
+            ON CONFLICT(wind_code) DO UPDATE SET
+                version = series_versions.version + 1,
+                updated_at = excluded.updated_at,
+                change_seq = excluded.change_seq
+        ''', [(wind_code, now, seq) for wind_code in dict.fromkeys(wind_codes)])
+
+    @timed('db')
+    def get_series_versions(self, wind_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """获取序列版本 {wind_code: {'version', 'updated_at'}}，从未记录过写入的序列不在结果中"""
+        if not wind_codes:
+            return {}
+        placeholders = ','.join('?' * len(wind_codes))
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT wind_code, version, updated_at FROM series_versions WHERE wind_code IN ({placeholders})",
+                list(wind_codes)
+            ).fetchall()
+        return {
+            wind_code: {'version': version, 'updated_at': updated_at}
+            for wind_code, version, updated_at in rows
+        }
+
+    def get_series_versions_since(self, since_seq: int) -> Dict[str, int]:
+        """
+        获取变更序号大于since_seq的写入涉及的序列 {wind_code: change_seq}（用于API缓存失效）
+        
+        按变更序号而不是写入时间比较：序号在写锁内分配，看到某个序号时更小序号的写入都已提交，
+        提交较晚但时间戳较早的事务不会被跳过。
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute(
+                "SELECT wind_code, change_seq FROM series_versions WHERE change_seq > ?",
+                (since_seq,)
+            ).fetchall())
+
+    def get_series_freshness(self, cadence_year: int) -> Dict[str, Dict[str, Any]]:
+        """基于series_checksums获取每个指标的数据新鲜度，不扫描time_series_data
+
+        Args:
+            cadence_year: 用于估计发布频率的完整年份（通常为去年）
+
+        Returns:
+            Dict: {wind_code: {'last_date': 各字段最新日期中最早的一个（有字段无数据时为None）,
+                               'rows_per_year': cadence_year的数据点数}}
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            freshness = {}
+            for wind_code, field_name, last_date in conn.execute('''
+                SELECT f.wind_code, f.field_name, MAX(c.last_date)
+                FROM indicator_fields f
+                LEFT JOIN series_checksums c
+                    ON c.wind_code = f.wind_code AND c.field_name = f.field_name
+                GROUP BY f.wind_code, f.field_name
+            ''').fetchall():
+                info = freshness.setdefault(wind_code, {'last_date': last_date, 'rows_per_year': None})
+                if last_date is None or (info['last_date'] and last_date < info['last_date']):
+                    info['last_date'] = last_date
+
+            for wind_code, rows in conn.execute('''
+                SELECT wind_code, MAX(row_count) FROM series_checksums
+                WHERE year = ? GROUP BY wind_code
+            ''', (cadence_year,)).fetchall():
+                if wind_code in freshness:
+                    freshness[wind_code]['rows_per_year'] = rows
+
+            return freshness
+
+    @staticmethod
+    def compute_year_checksums(
+        series: pd.Series,
+        sample_cutoff: Optional[str] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """按年份计算序列校验和
+
+        本地数据和从Wind获取的数据使用同一算法，结果可以直接比对。
+        月末采样哈希只覆盖截止日期所在月份之前的完整月份，避免未结束月份造成误报。
+
+        Args:
+            series: 以日期为索引的数值序列
+            sample_cutoff: 采样截止日期，默认为当年最后一个数据日期
+
+        Returns:
+            Dict[int, Dict]: 年份 -> {row_count, value_sum, value_hash, sample_hash, first_date, last_date}
+        """
+        series = series.dropna()
+        if series.empty:
+            return {}
+
+        series = pd.Series(
+            series.values.astype(float),
+            index=pd.to_datetime([str(d)[:10] for d in series.index])
+        ).sort_index()
+        series = series[~series.index.duplicated(keep='last')]
+        return DatabaseManager._year_checksums(
+            zip(series.index.strftime('%Y-%m-%d'), series.values.tolist()), sample_cutoff
+        )
+
+    @staticmethod
+    def _year_checksums(
+        points: Iterable[Tuple[str, float]],
+        sample_cutoff: Optional[str] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """按日期升序且不重复的(YYYY-MM-DD, 数值)计算逐年校验和（本地数据直接使用，不构造pandas对象）"""
+        by_year = {}
+        for date_str, value in points:
+            by_year.setdefault(int(date_str[:4]), []).append((date_str, value))
+
+        checksums = {}
+        for year, values in by_year.items():
+            value_hash = hashlib.sha1(
+                ";".join(f"{d}:{v:.10g}" for d, v in values).encode()
+            ).hexdigest()
+
+            # 月末采样值只按月份对齐，不依赖具体日期，便于与Wind的Period=M采样比对
+            month_end = {}
+            for d, v in values:
+                month_end[d[:7]] = v
+            cutoff_month = (sample_cutoff or values[-1][0])[:7]
+            sample_hash = hashlib.sha1(
+                ";".join(f"{m}:{v:.10g}" for m, v in month_end.items() if m < cutoff_month).encode()
+            ).hexdigest()
+
+            checksums[year] = {
+                'row_count': len(values),
+                'value_sum': float(sum(v for _, v in values)),
+                'value_hash': value_hash,
+                'sample_hash': sample_hash,
+                'first_date': values[0][0],
+                'last_date': values[-1][0]
+            }
+        return checksums
+
+    def _load_year_checksums(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        field_name: str,
+        years: Optional[set] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """读取本地数据计算(序列, 年份)校验和，只读"""
+        query = "SELECT date, value FROM time_series_data WHERE wind_code = ? AND field_name = ?"
+        params = [wind_code, field_name]
+        if years:
+            query += " AND date >= ? AND date <= ?"
+            params += [f"{min(years)}-01-01", f"{max(years)}-12-31"]
+        query += " ORDER BY date"
+
+        checksums = self._year_checksums(
+            (str(date_str)[:10], float(value))
+            for date_str, value in conn.execute(query, params)
+            if value is not None
+        )
+        if years:
+            checksums = {year: c for year, c in checksums.items() if year in years}
+        return checksums
+
+    def _store_checksums(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        field_name: str,
+        checksums: Dict[int, Dict[str, Any]],
+        years: Optional[set] = None
+    ):
+        """写入(序列, 年份)校验和，并清理已没有数据的年份（years为空时表示整个序列）"""
+        if years:
+            stale_years = set(years) - set(checksums)
+        else:
+            existing = conn.execute(
+                "SELECT year FROM series_checksums WHERE wind_code = ? AND field_name = ?",
+                (wind_code, field_name)
+            ).fetchall()
+            stale_years = {row[0] for row in existing} - set(checksums)
+        conn.executemany(
+            "DELETE FROM series_checksums WHERE wind_code = ? AND field_name = ? AND year = ?",
+            [(wind_code, field_name, year) for year in stale_years]
+        )
+
+        conn.executemany('''
+            INSERT OR REPLACE INTO series_checksums
+            (wind_code, field_name, year, row_count, value_sum, value_hash, sample_hash,
+             first_date, last_date, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', [
+            (
+                wind_code, field_name, year, c['row_count'], c['value_sum'], c['value_hash'],
+                c['sample_hash'], c['first_date'], c['last_date']
+            )
+            for year, c in checksums.items()
+        ])
+
+    def _refresh_checksums(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        field_name: str,
+        years: Optional[set] = None
+    ):
+        """在给定连接上按本地数据重新计算(序列, 年份)校验和"""
+        checksums = self._load_year_checksums(conn, wind_code, field_name, years)
+        self._store_checksums(conn, wind_code, field_name, checksums, years)
+
+    def _mark_checksums_dirty(
+        self,
+        conn: sqlite3.Connection,
+        wind_code: str,
+        field_name: str,
+        years: set,
+        seq: int
+    ):
+        """在写事务中登记需要重新计算校验和的年份"""
+        conn.executemany('''
+            INSERT INTO series_checksum_dirty (wind_code, field_name, year, change_seq)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(wind_code, field_name, year) DO UPDATE SET change_seq = excluded.change_seq
+        ''', [(wind_code, field_name, year, seq) for year in years])
+
+    def refresh_dirty_checksums(self) -> int:
+        """重新计算写入时登记的(序列, 年份)校验和，返回刷新的序列年份数
+
+        在写事务提交后调用：读取数据和计算哈希不持有写锁，只有写回校验和是一个短事务。
+        计算期间同一序列年份又被写入时登记的变更序号已变化，登记保留到下一次刷新。
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            dirty = conn.execute(
+                "SELECT wind_code, field_name, year, change_seq FROM series_checksum_dirty"
+            ).fetchall()
+            if not dirty:
+                return 0
+
+            years_by_series = {}
+            for wind_code, field_name, year, _ in dirty:
+                years_by_series.setdefault((wind_code, field_name), set()).add(year)
+            checksums = {
+                key: self._load_year_checksums(conn, *key, years)
+                for key, years in years_by_series.items()
+            }
+
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            for (wind_code, field_name), years in years_by_series.items():
+                self._store_checksums(conn, wind_code, field_name, checksums[(wind_code, field_name)], years)
+            conn.executemany('''
+                DELETE FROM series_checksum_dirty
+                WHERE wind_code = ? AND field_name = ? AND year = ? AND change_seq = ?
+            ''', dirty)
+            conn.commit()
+
+        return len(dirty)
+
+    def rebuild_missing_checksums(self) -> int:
+        """为尚无校验和的(指标, 字段)计算校验和，返回处理的序列数
+        
+        旧数据库的一次性迁移，由verify命令执行（会扫描这些序列的全部数据），不在更新任务中调用。
+        """
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            missing = conn.execute('''
+                SELECT f.wind_code, f.field_name FROM indicator_fields f
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM series_checksums c
+                    WHERE c.wind_code = f.wind_code AND c.field_name = f.field_name
+                )
+            ''').fetchall()
+
+            for wind_code, field_name in missing:
+                self._refresh_checksums(conn, wind_code, field_name)
+            conn.commit()
+
+        return len(missing)
+
+    @timed('db')
+    def estimate_points(
+        self,
+        wind_codes: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        unknown_series_points: int = 5000
+    ) -> int:
+        """
+        预估查询扫描的数据点数（只读取series_checksums的逐年行数，不扫描time_series_data）
+        
+        起止日期落在某年中间时，按该年数据日期跨度的比例折算；
+        没有校验和记录的指标（旧数据或未通过更新器写入）按每个unknown_series_points个点估计。
+        """
+        if not wind_codes:
+            return 0
+        query = (
+            "SELECT wind_code, row_count, first_date, last_date FROM series_checksums "
+            f"WHERE wind_code IN ({','.join('?' * len(wind_codes))})"
+        )
+        params = list(wind_codes)
+        if fields:
+            query += f" AND field_name IN ({','.join('?' * len(fields))})"
+            params.extend(fields)
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        start = str(start_date)[:10] if start_date else None
+        end = str(end_date)[:10] if end_date else None
+        known = set()
+        total = 0.0
+        for wind_code, row_count, first_date, last_date in rows:
+            known.add(wind_code)
+            if not first_date or not last_date:
+                total += row_count
+                continue
+            low = max(first_date, start) if start else first_date
+            high = min(last_date, end) if end else last_date
+            if low > high:
+                continue
+            if (low, high) != (first_date, last_date):
+                try:
+                    span = (date.fromisoformat(last_date) - date.fromisoformat(first_date)).days + 1
+                    covered = (date.fromisoformat(high) - date.fromisoformat(low)).days + 1
+                    row_count = row_count * covered / span
+                except ValueError:
+                    pass
+            total += row_count
+        
+        total += unknown_series_points * len(set(wind_codes) - known)
+        return int(math.ceil(total))
+    
+    def get_series_checksums(
+        self,
+        wind_code: Optional[str] = None,
+        years: Optional[List[int]] = None
+    ) -> List[Dict]:
+        """获取序列年度校验和"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            query = "SELECT * FROM series_checksums WHERE 1 = 1"
+            params = []
+
+            if wind_code:
+                query += " AND wind_code = ?"
+                params.append(wind_code)
+
+            if years:
+                query += f" AND year IN ({','.join('?' * len(years))})"
+                params.extend(years)
+
+            query += " ORDER BY wind_code, field_name, year"
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_scheduler_job_states(self) -> Dict[str, Dict]:
+        """获取所有调度任务的持久化状态"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute("SELECT * FROM scheduler_jobs")
+            return {row['job_name']: dict(row) for row in cursor.fetchall()}
+
+    def save_scheduler_job_state(self, job_name: str, **state):
+        """保存调度任务状态（只更新传入的列）"""
+        columns = ['job_name'] + list(state)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in state)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(f'''
+                INSERT INTO scheduler_jobs ({", ".join(columns)}, updated_at)
+                VALUES ({", ".join("?" * len(columns))}, CURRENT_TIMESTAMP)
+                ON CONFLICT(job_name) DO UPDATE SET {updates + ", " if updates else ""}updated_at = CURRENT_TIMESTAMP
+            ''', [job_name] + list(state.values()))
+            conn.commit()
+
+    def record_scheduler_run(
+        self,
+        job_name: str,
+        scheduled_time: Optional[str],
+        started_at: Optional[str],
+        finished_at: Optional[str],
+        duration_seconds: Optional[float],
+        status: str,
+        error_message: Optional[str] = None
+    ):
+        """记录一次调度任务运行"""
         with sqlite3.connect(self.db_path) as conn:
             conn.execute('''
-                INSERT INTO update_logs 
-                (wind_code, field_name, update_type, start_date, end_date, records_count, status, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (wind_code, field_name, update_type, start_date, end_date, records_count, status, error_message))
+                INSERT INTO scheduler_job_runs
+                (job_name, scheduled_time, started_at, finished_at, duration_seconds, status, error_message)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job_name, scheduled_time, started_at, finished_at, duration_seconds, status, error_message))
             conn.commit()
+
+    def get_scheduler_runs(self, job_name: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """获取最近的调度任务运行记录"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            if job_name:
+                cursor = conn.execute(
+                    "SELECT * FROM scheduler_job_runs WHERE job_name = ? ORDER BY id DESC LIMIT ?",
+                    (job_name, limit)
+                )
+            else:
+                cursor = conn.execute(
+                    "SELECT * FROM scheduler_job_runs ORDER BY id DESC LIMIT ?", (limit,)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def record_update_run(self, run: Dict[str, Any], histograms: List[Dict[str, Any]]) -> int:
+        """记录一次更新运行及其直方图
+
+        Args:
+            run: update_runs表的列 -> 值
+            histograms: update_run_histograms表的行（不含run_row_id）
+
+        Returns:
+            int: update_runs中的行ID
+        """
+        columns = list(run)
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            cursor = conn.execute(f'''
+                INSERT INTO update_runs ({", ".join(columns)})
+                VALUES ({", ".join("?" * len(columns))})
+            ''', [run[column] for column in columns])
+            run_row_id = cursor.lastrowid
+
+            conn.executemany('''
+                INSERT INTO update_run_histograms
+                (run_row_id, metric, data_source, bucket_le, count, total, sum)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (run_row_id, h['metric'], h['data_source'], h['bucket_le'], h['count'], h['total'], h['sum'])
+                for h in histograms
+            ])
+            conn.commit()
+            return run_row_id
+
+    @timed('db')
+    def get_update_runs(self, strategy: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """获取最近的更新运行记录，每条记录附带按数据源聚合的直方图
+
+        Returns:
+            List[Dict]: update_runs的行，另含histograms:
+                {metric: {data_source: {'total', 'sum', 'buckets': [{'le', 'count'}, ...]}}}
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            if strategy:
+                cursor = conn.execute(
+                    "SELECT * FROM update_runs WHERE strategy = ? ORDER BY id DESC LIMIT ?",
+                    (strategy, limit)
+                )
+            else:
+                cursor = conn.execute("SELECT * FROM update_runs ORDER BY id DESC LIMIT ?", (limit,))
+            runs = {row['id']: dict(row, histograms={}) for row in cursor.fetchall()}
+
+            if runs:
+                cursor = conn.execute(f'''
+                    SELECT * FROM update_run_histograms
+                    WHERE run_row_id IN ({", ".join("?" * len(runs))})
+                    ORDER BY run_row_id, metric, data_source, bucket_le IS NULL, bucket_le
+                ''', list(runs))
+                for row in cursor.fetchall():
+                    histogram = runs[row['run_row_id']]['histograms'].setdefault(
+                        row['metric'], {}
+                    ).setdefault(row['data_source'], {'total': row['total'], 'sum': row['sum'], 'buckets': []})
+                    histogram['buckets'].append({'le': row['bucket_le'], 'count': row['count']})
+
+            return list(runs.values())
+
+    def acquire_lease(
+        self,
+        wind_code: str,
+        owner: str,
+        run_id: str,
+        phase: str,
+        ttl_seconds: float,
+        done_after: Optional[float] = None
+    ) -> str:
+        """原子地获取指标租约
+        
+        以下情况可以获取：没有租约；租约已过期（持有者崩溃）或属于自己；
+        租约已完成，但不是同一阶段，或既不属于同一run_id、也不是在done_after之后完成的。
+        
+        Args:
+            done_after: Unix时间戳，通常为本次运行的开始时间。其他运行（不同run_id，
+                如调度器和手动触发的更新）在此之后完成的同一阶段视为已完成，不再重复获取
+        
+        Returns:
+            str: 'acquired' 获取成功；'held' 其他进程持有未过期租约；
+                 'done' 同一次运行的其他worker、或本次运行开始后其他运行已完成该阶段
+        """
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            cursor = conn.execute('''
+                INSERT INTO work_leases (wind_code, owner, run_id, phase, status, expires_at)
+                VALUES (?, ?, ?, ?, 'leased', ?)
+                ON CONFLICT(wind_code) DO UPDATE SET
+                    owner = excluded.owner,
+                    run_id = excluded.run_id,
+                    phase = excluded.phase,
+                    status = 'leased',
+                    expires_at = excluded.expires_at,
+                    completed_at = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE (work_leases.status = 'leased'
+                       AND (work_leases.expires_at <= ? OR work_leases.owner = excluded.owner))
+                   OR (work_leases.status = 'done'
+                       AND NOT (work_leases.phase = excluded.phase
+                                AND (work_leases.run_id = excluded.run_id
+                                     OR work_leases.completed_at >= ?)))
+            ''', (wind_code, owner, run_id, phase, now + ttl_seconds, now,
+                  now if done_after is None else done_after))
+
+            if cursor.rowcount == 1:
+                return 'acquired'
+
+            row = conn.execute(
+                "SELECT status FROM work_leases WHERE wind_code = ?", (wind_code,)
+            ).fetchone()
+            return 'done' if row and row[0] == 'done' else 'held'
+
+    def renew_lease(self, wind_code: str, owner: str, ttl_seconds: float) -> bool:
+        """续期自己持有的租约，租约已被其他进程接管时返回False"""
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            cursor = conn.execute('''
+                UPDATE work_leases SET expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE wind_code = ? AND owner = ? AND status = 'leased'
+            ''', (time.time() + ttl_seconds, wind_code, owner))
+            conn.commit()
+            return cursor.rowcount == 1
+    
+    def complete_leases(self, wind_codes: List[str], owner: str) -> List[str]:
+        """将自己持有的租约标记为已完成，返回已被其他进程接管、未能完成的指标"""
+        lost = []
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            for wind_code in wind_codes:
+                cursor = conn.execute('''
+                    UPDATE work_leases SET status = 'done', completed_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE wind_code = ? AND owner = ? AND status = 'leased'
+                ''', (time.time(), wind_code, owner))
+                if cursor.rowcount == 0:
+                    lost.append(wind_code)
+            conn.commit()
+        return lost
+
+    def get_active_leases(self) -> List[Dict]:
+        """获取当前未过期的租约"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                "SELECT * FROM work_leases WHERE status = 'leased' AND expires_at > ? ORDER BY owner",
+                (time.time(),)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def acquire_service_lock(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """原子地获取或续期服务锁
+        
+        没有锁、锁已过期（持有者崩溃或停止续期）或属于自己时获取成功，
+        持有者以同样的调用续期。
+        
+        Returns:
+            bool: 是否持有锁
+        """
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            cursor = conn.execute('''
+                INSERT INTO service_locks (name, owner, acquired_at, heartbeat_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    acquired_at = CASE WHEN service_locks.owner = excluded.owner
+                                       THEN service_locks.acquired_at ELSE excluded.acquired_at END,
+                    owner = excluded.owner,
+                    heartbeat_at = excluded.heartbeat_at,
+                    expires_at = excluded.expires_at
+                WHERE service_locks.owner = excluded.owner OR service_locks.expires_at <= ?
+            ''', (name, owner, now, now, now + ttl_seconds, now))
+            return cursor.rowcount == 1
+    
+    def release_service_lock(self, name: str, owner: str):
+        """释放自己持有的服务锁"""
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            conn.execute("DELETE FROM service_locks WHERE name = ? AND owner = ?", (name, owner))
+    
+    def get_service_lock(self, name: str) -> Optional[Dict]:
+        """获取服务锁状态，alive表示锁未过期（持有者仍在续期）"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM service_locks WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        lock = dict(row)
+        lock['alive'] = lock['expires_at'] > time.time()
+        return lock
+    
+    def save_analysis_session(self, session_id: str, payload: Dict[str, Any], ttl_seconds: float):
+        """保存分析会话，同时清理已过期的会话"""
+        now = time.time()
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            conn.execute("DELETE FROM analysis_sessions WHERE expires_at <= ?", (now,))
+            conn.execute('''
+                INSERT OR REPLACE INTO analysis_sessions (session_id, payload, created_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (session_id, json.dumps(payload, ensure_ascii=False, default=str), now, now + ttl_seconds))
+    
+    def get_analysis_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """获取未过期的分析会话"""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT payload FROM analysis_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def pop_analysis_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """原子地取出并删除分析会话，多个worker同时确认同一会话时只有一个能取到"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.busy_timeout)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT payload FROM analysis_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+            conn.execute("DELETE FROM analysis_sessions WHERE session_id = ?", (session_id,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+    
+    def delete_analysis_session(self, session_id: str) -> bool:
+        """删除分析会话，返回会话是否存在（未过期）"""
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout) as conn:
+            cursor = conn.execute(
+                "DELETE FROM analysis_sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            )
+            return cursor.rowcount == 1
+    
+    def list_analysis_sessions(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有未过期的分析会话"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT session_id, payload FROM analysis_sessions WHERE expires_at > ? ORDER BY created_at",
+                (time.time(),)
+            ).fetchall()
+        return {session_id: json.loads(payload) for session_id, payload in rows}
     
     def get_last_update_date(self, wind_code: str, field_name: Optional[str] = None) -> Optional[str]:
         """获取指标字段的最后更新日期"""
@@ -282,7 +1850,26 @@ class DatabaseManager:
             
             result = cursor.fetchone()
             return result[0] if result[0] else None
-    
+
+    def get_field_last_dates(self, wind_code: str) -> Dict[str, Optional[str]]:
+        """获取指标每个字段各自的最后数据日期
+
+        Returns:
+            Dict[str, Optional[str]]: 字段名 -> 最后日期，没有数据的字段为None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            # 相关子查询逐字段取MAX，可以命中(wind_code, field_name, date)索引
+            cursor.execute('''
+                SELECT f.field_name,
+                       (SELECT MAX(t.date) FROM time_series_data t
+                        WHERE t.wind_code = f.wind_code AND t.field_name = f.field_name)
+                FROM indicator_fields f
+                WHERE f.wind_code = ?
+                ORDER BY f.field_name
+            ''', (wind_code,))
+            return {field_name: last_date for field_name, last_date in cursor.fetchall()}
+
     def get_data_summary(self) -> Dict:
         """获取数据库统计信息"""
         with sqlite3.connect(self.db_path) as conn:
@@ -1,124 +1,474 @@
-import schedule
+import os
 import time
+import uuid
+import socket
 import threading
+import functools
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from config.config import settings
 from src.database.models_v2 import DatabaseManager
 from src.data_fetcher.wind_client_v2 import WindDataFetcher
+from src.scheduler.job_scheduler import JobScheduler
+from src.scheduler.run_telemetry import RunTelemetry
+from src.scheduler.update_priority import UpdatePrioritizer
+
+
+def batched_writes(method):
+    """
+    更新任务装饰器：运行期间按批次缓冲写入，结束时提交剩余批次并汇报事务数，
+    运行记录（分阶段耗时、计数、延迟直方图）写入update_runs
+    
+    同一个DataUpdater上的更新任务串行执行（如API的/update后台任务和内嵌调度器），
+    写缓冲区和运行状态不会被两个线程同时修改。
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self._run_lock.acquire(blocking=False):
+            self.logger.info(f"⏳ 另一个更新任务正在运行，{method.__name__} 等待其完成")
+            self._run_lock.acquire()
+        try:
+            if self._write_depth == 0:
+                self.write_stats = {'transactions': 0, 'write_seconds': 0.0, 'write_failures': 0}
+                self.failed_writes = set()
+                # 多进程更新时所有worker共享run_id，单进程运行每次生成新的run_id
+                self.active_run_id = self.run_id or uuid.uuid4().hex
+                self.run_started_at = time.time()
+                self.telemetry = RunTelemetry(method.__name__, self.active_run_id, self.worker_id)
+                self.deadline = (
+                    time.monotonic() + self.time_budget_seconds if self.time_budget_seconds else None
+                )
+                self.budget_exhausted = False
+            self._write_depth += 1
+            status, error_message = 'success', None
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                status, error_message = 'failed', str(e)
+                raise
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self.flush_pending_writes()
+                    if status == 'success' and self.budget_exhausted:
+                        status = 'partial'
+                    self._record_run(status, error_message)
+        finally:
+            self._run_lock.release()
+    return wrapper
 
 
 class DataUpdater:
-    def __init__(self, db_manager: DatabaseManager, data_fetcher: WindDataFetcher):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        data_fetcher: WindDataFetcher,
+        batch_size: Optional[int] = None,
+        run_id: Optional[str] = None,
+        time_budget_seconds: Optional[int] = None
+    ):
+        """
+        Args:
+            batch_size: 每个写入事务包含的指标数，默认UPDATE_BATCH_SIZE
+            run_id: 多进程更新的共享运行ID，同一run_id的worker通过租约划分指标
+            time_budget_seconds: 单次更新的时间预算，默认UPDATE_TIME_BUDGET_SECONDS，0表示不限
+        """
         self.db_manager = db_manager
         self.data_fetcher = data_fetcher
         self.logger = logging.getLogger(__name__)
         self.is_running = False
         self.scheduler_thread = None
+        self.job_scheduler = None
+        
+        # 批量写入：每batch_size个指标提交一次事务
+        self.batch_size = max(1, batch_size or settings.UPDATE_BATCH_SIZE)
+        self.pending_writes = []
+        self.write_stats = {'transactions': 0, 'write_seconds': 0.0, 'write_failures': 0}
+        self._write_depth = 0
+        # 本次运行中写入失败（已回滚）的指标，成功数在写入提交后按此修正
+        self.failed_writes = set()
+        # 写缓冲区和运行状态的锁（可重入：批量任务内部调用其他批量任务）
+        self._run_lock = threading.RLock()
+        
+        # 指标租约：避免多个更新进程重复处理同一指标
+        self.run_id = run_id
+        self.active_run_id = run_id
+        # 本次运行的开始时间：其他运行在此之后完成的指标不再重复处理
+        self.run_started_at = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.finished_leases = []
+        # 本进程持有、尚未标记完成的租约，写入前续期
+        self.held_leases = set()
+        
+        # 运行遥测：批量更新任务开始时重建，单独调用update_single_indicator时不落库
+        self.telemetry = RunTelemetry("adhoc", run_id, self.worker_id)
+        
+        # 优先级排序和时间预算：预算用完后停止领取新指标，已按优先级先更新最重要的数据
+        self.prioritizer = UpdatePrioritizer(db_manager)
+        self.time_budget_seconds = (
+            settings.UPDATE_TIME_BUDGET_SECONDS if time_budget_seconds is None else time_budget_seconds
+        )
+        self.deadline = None
+        self.budget_exhausted = False
+    
+    def prioritize(self, indicators: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按优先级（发布时间、陈旧程度、读取需求）排序待更新指标"""
+        with self.telemetry.phase('planning'):
+            return self.prioritizer.order(indicators)
+    
+    def _out_of_time(self) -> bool:
+        """时间预算是否已用完"""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.budget_exhausted = True
+        return self.budget_exhausted
+    
+    def _record_run(self, status: str, error_message: Optional[str] = None):
+        """结束当前运行的遥测并写入update_runs"""
+        telemetry = self.telemetry
+        telemetry.finish(status, error_message)
+        
+        try:
+            self.db_manager.record_update_run(telemetry.to_record(), telemetry.histogram_rows())
+        except Exception as e:
+            self.logger.error(f"记录更新运行失败: {e}")
+        
+        phases = "，".join(
+            f"{phase} {seconds:.2f}s" for phase, seconds in telemetry.phase_seconds.items()
+        )
+        self.logger.info(
+            f"💾 写入统计: {self.write_stats['transactions']} 个事务提交（约等于fsync次数），"
+            f"写入 {telemetry.counts['points_written']} 个数据点，总耗时 {telemetry.duration:.2f}s（{phases}）"
+        )
     
     def update_single_indicator(
         self, 
         indicator: Dict[str, Any], 
         start_date: str, 
         end_date: str,
-        update_type: str = "incremental"
+        update_type: str = "incremental",
+        field_names: Optional[List[str]] = None,
+        replace: bool = False
     ) -> bool:
         """
-        更新单个指标的所有字段数据
+        更新单个指标的字段数据
+
+        在批量更新任务中，数据和日志先进入缓冲区，每batch_size个指标提交一次事务；
+        写入阶段的失败会记录到update_logs和write_stats中。获取或写入失败的
+        (字段, 日期区间)会加入重试队列，由drain_retry_queue按指数退避重试。
+
+        Args:
+            field_names: 只更新指定字段，为空时更新指标的所有字段
+            replace: 为True时获取到数据的字段在日期区间内以Wind为准，删除Wind已没有的本地数据点
+        
+        Returns:
+            bool: 获取成功并已放入写缓冲区；批量任务中写入是否成功由count_written在提交后确认
         """
         wind_code = indicator['wind_code']
+        telemetry = self.telemetry
+        requested_fields = list(field_names or [])
         
         try:
             self.logger.info(f"开始更新指标: {wind_code} ({indicator['name']})")
             
             # 获取该指标的所有字段
-            fields = self.db_manager.get_indicator_fields(wind_code)
+            with telemetry.phase('planning'):
+                fields = self.db_manager.get_indicator_fields(wind_code)
+            if field_names:
+                fields = [f for f in fields if f['field_name'] in field_names]
             if not fields:
                 self.logger.warning(f"指标 {wind_code} 没有字段映射，跳过")
                 return False
+            requested_fields = [f['field_name'] for f in fields]
             
             # 获取数据
-            data = self.data_fetcher.fetch_data_by_indicator(indicator, start_date, end_date)
+            started = time.perf_counter()
+            data = self.data_fetcher.fetch_data_by_indicator(
+                indicator, start_date, end_date,
+                fields=requested_fields
+            )
+            elapsed = time.perf_counter() - started
+            telemetry.add_phase_time('fetch', elapsed)
+            telemetry.record_fetch(
+                indicator.get('data_source', 'EDB'), elapsed, 0 if data is None else len(data)
+            )
+            telemetry.count('requests')
             
             if data is not None and not data.empty:
-                # 按字段分别保存到数据库
+                decode_started = time.perf_counter()
+                # 按字段整理待写入数据
                 total_records = 0
+                field_data = {}
+                logs = []
+                # 其他字段有数据、该字段缺失或全为空值：多字段请求部分失败，加入重试队列
+                missing_fields = []
                 
                 for field_info in fields:
                     field_name = field_info['field_name']
                     
                     if field_name in data.columns:
-                        field_data = data[field_name].dropna()
-                        if not field_data.empty:
-                            self.db_manager.insert_time_series_data(wind_code, field_name, field_data)
-                            field_records = len(field_data)
+                        field_series = data[field_name].dropna()
+                        if field_series.empty:
+                            missing_fields.append(field_name)
+                            self.logger.warning(f"字段 {wind_code}.{field_name} 没有有效数据")
+                        else:
+                            field_data[field_name] = field_series
+                            field_records = len(field_series)
                             total_records += field_records
                             
-                            # 记录字段级别的更新日志
-                            self.db_manager.log_update(
-                                wind_code=wind_code,
-                                field_name=field_name,
-                                update_type=update_type,
-                                start_date=start_date,
-                                end_date=end_date,
-                                records_count=field_records,
-                                status="success"
-                            )
+                            # 字段级别的更新日志
+                            logs.append({
+                                'field_name': field_name,
+                                'update_type': update_type,
+                                'start_date': start_date,
+                                'end_date': end_date,
+                                'records_count': field_records,
+                                'status': "success"
+                            })
                             
-                            self.logger.info(f"成功更新字段 {wind_code}.{field_name}，{field_records} 条数据")
+                            self.logger.info(f"获取字段 {wind_code}.{field_name}，{field_records} 条数据")
                     else:
+                        missing_fields.append(field_name)
                         self.logger.warning(f"数据中未找到字段 {field_name} 对于指标 {wind_code}")
                 
+                telemetry.add_phase_time('decode', time.perf_counter() - decode_started)
+                
                 if total_records > 0:
-                    # 记录指标级别的更新日志（汇总）
-                    self.db_manager.log_update(
-                        wind_code=wind_code,
-                        field_name=None,  # 表示所有字段
-                        update_type=update_type,
-                        start_date=start_date,
-                        end_date=end_date,
-                        records_count=total_records,
-                        status="success"
+                    logs.extend({
+                        'field_name': field_name,
+                        'update_type': update_type,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'records_count': 0,
+                        'status': "failed",
+                        'error_message': "Wind未返回该字段的数据"
+                    } for field_name in missing_fields)
+                    # 指标级别的更新日志（汇总）
+                    logs.append({
+                        'field_name': None,  # 表示所有字段
+                        'update_type': update_type,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'records_count': total_records,
+                        'status': "success"
+                    })
+                    self._queue_write(
+                        wind_code, field_data, logs,
+                        retry_fields=missing_fields or None,
+                        replace_range=(start_date, end_date) if replace else None
                     )
                     
+                    # 成功/失败按字段计数，与失败日志和重试队列的粒度一致
+                    telemetry.count('success', len(field_data))
+                    telemetry.count('failed', len(missing_fields))
                     self.logger.info(f"成功更新指标 {wind_code}，共 {total_records} 条数据")
                     return True
                 else:
+                    telemetry.count('failed', len(requested_fields))
                     self.logger.warning(f"指标 {wind_code} 没有有效数据")
                     return False
             else:
+                telemetry.count('failed', len(requested_fields))
                 self.logger.warning(f"指标 {wind_code} 未获取到数据")
                 
-                # 记录失败日志
-                self.db_manager.log_update(
-                    wind_code=wind_code,
-                    field_name=None,
-                    update_type=update_type,
-                    start_date=start_date,
-                    end_date=end_date,
-                    records_count=0,
-                    status="failed",
-                    error_message="未获取到数据"
-                )
+                # 记录失败日志；请求失败（返回None）的区间加入重试队列，区间内确实没有数据时不重试
+                self._queue_write(wind_code, {}, [{
+                    'field_name': None,
+                    'update_type': update_type,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'records_count': 0,
+                    'status': "failed",
+                    'error_message': "未获取到数据"
+                }], retry_fields=requested_fields if data is None else None)
                 return False
                 
         except Exception as e:
+            # 字段列表读取失败时按一个字段计
+            telemetry.count('failed', max(1, len(requested_fields)))
             error_msg = f"更新指标 {wind_code} 失败: {str(e)}"
             self.logger.error(error_msg)
             
             # 记录错误日志
-            self.db_manager.log_update(
-                wind_code=wind_code,
-                field_name=None,
-                update_type=update_type,
-                start_date=start_date,
-                end_date=end_date,
-                records_count=0,
-                status="failed",
-                error_message=str(e)
-            )
+            self._queue_write(wind_code, {}, [{
+                'field_name': None,
+                'update_type': update_type,
+                'start_date': start_date,
+                'end_date': end_date,
+                'records_count': 0,
+                'status': "failed",
+                'error_message': str(e)
+            }], retry_fields=requested_fields)
             return False
     
+    def _queue_write(
+        self,
+        wind_code: str,
+        field_data: Dict[str, Any],
+        logs: List[Dict[str, Any]],
+        retry_fields: Optional[List[str]] = None,
+        replace_range: Optional[Tuple[str, str]] = None
+    ):
+        """将指标的数据和日志放入写缓冲区，满一批或不在批量任务中时立即提交"""
+        with self._run_lock:
+            # 多字段请求可能很慢，写入前续期租约，使其覆盖到写入提交和完成标记
+            if wind_code in self.held_leases and not self.db_manager.renew_lease(
+                wind_code, self.worker_id, settings.WORK_LEASE_TTL_SECONDS
+            ):
+                self.logger.warning(f"⚠️ 指标 {wind_code} 的租约已过期并被其他进程接管，仍写入本次获取的数据")
+            self.pending_writes.append({
+                'wind_code': wind_code,
+                'field_data': field_data,
+                'logs': logs,
+                'retry_fields': retry_fields,
+                'replace_range': replace_range
+            })
+            
+            if self._write_depth == 0 or len(self.pending_writes) >= self.batch_size:
+                self.flush_pending_writes()
+    
+    def flush_pending_writes(self):
+        """提交写缓冲区中的所有指标（单个事务，每个指标独立SAVEPOINT），然后完成对应租约"""
+        with self._run_lock:
+            self._flush_pending_writes()
+    
+    def _flush_pending_writes(self):
+        if self.pending_writes:
+            entries = self.pending_writes
+            self.pending_writes = []
+            
+            started = time.perf_counter()
+            result = self.db_manager.write_update_batch(
+                entries, retry_delay=settings.RETRY_BACKOFF_BASE_SECONDS
+            )
+            elapsed = time.perf_counter() - started
+            self.write_stats['write_seconds'] += elapsed
+            self.write_stats['transactions'] += result['transactions']
+            
+            # 日志与数据在同一事务中写入，分别计入write和log阶段
+            self.telemetry.add_phase_time('write', elapsed - result['log_seconds'])
+            self.telemetry.add_phase_time('log', result['log_seconds'])
+            self.telemetry.count('transactions', result['transactions'])
+            self.telemetry.count('points_written', sum(
+                len(series)
+                for entry in entries if entry['wind_code'] not in result['failed']
+                for series in entry['field_data'].values()
+            ))
+            
+            for wind_code, error in result['failed'].items():
+                self.write_stats['write_failures'] += 1
+                self.failed_writes.add(wind_code)
+                self.logger.error(f"写入指标 {wind_code} 失败，已单独回滚: {error}")
+            
+            # 获取成功的字段在放入缓冲区时已计为success，写入失败（整个指标回滚）时改计为failed
+            for entry in entries:
+                if entry['wind_code'] in result['failed'] and entry['field_data']:
+                    self.telemetry.count('success', -len(entry['field_data']))
+                    self.telemetry.count('failed', len(entry['field_data']))
+            
+            self.logger.info(f"💾 已提交 {len(entries)} 个指标的写入")
+            
+            # 校验和在写事务之外重新计算；失败时登记保留，由下一次写入或verify补算
+            started = time.perf_counter()
+            try:
+                self.db_manager.refresh_dirty_checksums()
+            except Exception as e:
+                self.logger.warning(f"刷新校验和失败，稍后重试: {e}")
+            self.telemetry.add_phase_time('write', time.perf_counter() - started)
+        
+        # 数据落盘后才把租约标记为完成，崩溃时未提交的指标会在租约过期后被接管
+        if self.finished_leases:
+            lost = self.db_manager.complete_leases(self.finished_leases, self.worker_id)
+            if lost:
+                self.logger.warning(
+                    f"⚠️ {len(lost)} 个指标的租约已被其他进程接管，未标记完成: {', '.join(lost[:10])}"
+                )
+            self.held_leases.difference_update(self.finished_leases)
+            self.finished_leases = []
+    
+    def count_written(self, wind_codes: List[str]) -> int:
+        """提交写缓冲区后统计写入成功的项数（写入阶段失败、已回滚的指标不计入）"""
+        self.flush_pending_writes()
+        return sum(1 for wind_code in wind_codes if wind_code not in self.failed_writes)
+    
+    def claim_indicators(self, indicators: List[Dict[str, Any]], phase: str):
+        """
+        按租约逐个领取指标（生成器）
+        
+        - 领取成功的指标交给调用方处理，处理完成并写入后租约标记为done
+        - 其他进程正在处理的指标先推迟，本轮结束后等待其完成或租约过期后接管
+        - 已完成的指标直接跳过：同一run_id的其他worker完成的，以及本次运行开始后
+          其他运行（调度器、CLI update、API /update各自生成run_id）完成同一阶段的。
+          后者覆盖推迟等待的情况：其他运行处理完推迟的指标后不会再获取和写入一次
+        - 时间预算用完后停止领取，剩余指标留待下次更新
+        
+        Args:
+            indicators: 候选指标列表
+            phase: 更新阶段名，同一次运行的不同阶段分别领取
+        """
+        deferred = []
+        
+        for position, indicator in enumerate(indicators):
+            if self._out_of_time():
+                self.logger.warning(
+                    f"⏱️  时间预算已用完，{phase} 阶段剩余 {len(indicators) - position} 个指标留待下次更新"
+                )
+                return
+            with self.telemetry.phase('planning'):
+                status = self.db_manager.acquire_lease(
+                    indicator['wind_code'], self.worker_id, self.active_run_id, phase,
+                    settings.WORK_LEASE_TTL_SECONDS, done_after=self.run_started_at
+                )
+            if status == 'acquired':
+                self.held_leases.add(indicator['wind_code'])
+                self.telemetry.count('indicators')
+                try:
+                    yield indicator
+                finally:
+                    self._finish_lease(indicator['wind_code'])
+            elif status == 'held':
+                deferred.append(indicator)
+        
+        # 等待其他进程持有的指标：完成则跳过，持有者崩溃（租约过期）则接管
+        deadline = time.monotonic() + settings.WORK_LEASE_TTL_SECONDS + settings.WORK_LEASE_POLL_SECONDS
+        if self.deadline is not None:
+            deadline = min(deadline, self.deadline)
+        while deferred and time.monotonic() < deadline:
+            # 等待期间先提交已缓冲的写入，避免自己的租约因等待而过期
+            self.flush_pending_writes()
+            time.sleep(settings.WORK_LEASE_POLL_SECONDS)
+            
+            still_held = []
+            for indicator in deferred:
+                status = self.db_manager.acquire_lease(
+                    indicator['wind_code'], self.worker_id, self.active_run_id, phase,
+                    settings.WORK_LEASE_TTL_SECONDS, done_after=self.run_started_at
+                )
+                if status == 'acquired':
+                    self.logger.info(f"🔁 接管指标 {indicator['wind_code']}")
+                    self.held_leases.add(indicator['wind_code'])
+                    self.telemetry.count('indicators')
+                    try:
+                        yield indicator
+                    finally:
+                        self._finish_lease(indicator['wind_code'])
+                elif status == 'held':
+                    still_held.append(indicator)
+            deferred = still_held
+        
+        if deferred:
+            self.logger.warning(
+                f"⏭️  {len(deferred)} 个指标仍被其他进程持有，本次跳过: "
+                f"{', '.join(i['wind_code'] for i in deferred[:10])}"
+            )
+    
+    def _finish_lease(self, wind_code: str):
+        """登记已处理完成的指标，租约在下一次写入提交后标记为done"""
+        self.finished_leases.append(wind_code)
+        if self._write_depth == 0:
+            self.flush_pending_writes()
+    
+    @batched_writes
     def full_historical_update(self, start_year: int = 2000):
         """
         全量历史数据更新（2000年至今）
@@ -126,89 +476,273 @@ class DataUpdater:
         self.logger.info("开始全量历史数据更新")
         
         # 获取所有指标
-        indicators = self.db_manager.get_indicators()
+        with self.telemetry.phase('planning'):
+            indicators = self.db_manager.get_indicators()
         
         start_date = f"{start_year}-01-01"
         end_date = datetime.now().strftime("%Y-%m-%d")
         
-        success_count = 0
+        succeeded = []
         total_count = len(indicators)
         
-        for i, indicator in enumerate(indicators):
+        for i, indicator in enumerate(self.claim_indicators(self.prioritize(indicators), "full")):
             self.logger.info(f"更新进度: {i+1}/{total_count} - {indicator['name']}")
             
             if self.update_single_indicator(indicator, start_date, end_date, "full"):
-                success_count += 1
+                succeeded.append(indicator['wind_code'])
             
             # 避免请求过于频繁
             time.sleep(1)
         
+        success_count = self.count_written(succeeded)
         self.logger.info(f"全量历史数据更新完成，成功: {success_count}/{total_count}")
     
-    def incremental_update(self):
+    def plan_field_windows(
+        self,
+        indicator: Dict[str, Any],
+        end_date: str,
+        missing_start_date: str
+    ) -> List[Tuple[str, List[str]]]:
         """
-        增量数据更新
+        按(wind_code, field)计算增量起始日期，起始日期相同的字段合并为一次多字段请求
+
+        Args:
+            indicator: 指标信息
+            end_date: 结束日期
+            missing_start_date: 字段没有任何数据时使用的起始日期
+
+        Returns:
+            List[Tuple[str, List[str]]]: [(开始日期, [字段名, ...]), ...]，已是最新的字段不出现
         """
-        self.logger.info("开始增量数据更新")
+        with self.telemetry.phase('planning'):
+            last_dates = self.db_manager.get_field_last_dates(indicator['wind_code'])
+
+        windows = {}
+        for field_name, last_date in last_dates.items():
+            if last_date:
+                # 从该字段最后更新日期的下一天开始
+                start_date = (
+                    datetime.strptime(last_date, "%Y-%m-%d") + timedelta(days=1)
+                ).strftime("%Y-%m-%d")
+            else:
+                start_date = missing_start_date
+
+            if start_date <= end_date:
+                windows.setdefault(start_date, []).append(field_name)
+
+        return sorted(windows.items())
+
+    def update_indicator_fields_incrementally(
+        self,
+        indicator: Dict[str, Any],
+        end_date: str,
+        missing_start_date: str
+    ) -> Optional[bool]:
+        """
+        按字段增量更新单个指标
+
+        Returns:
+            Optional[bool]: 所有请求都成功返回True，任一失败返回False，已是最新返回None
+        """
+        windows = self.plan_field_windows(indicator, end_date, missing_start_date)
+        if not windows:
+            return None
+
+        success = True
+        for i, (start_date, field_names) in enumerate(windows):
+            if i > 0:
+                # 避免请求过于频繁
+                time.sleep(0.5)
+            if not self.update_single_indicator(
+                indicator, start_date, end_date, "incremental", field_names=field_names
+            ):
+                success = False
+        return success
+
+    def deep_check_years(self, today: Optional[date] = None) -> List[int]:
+        """
+        计算本次深度检查的历史年份切片
+
+        历史年份（起始年份至去年）按每周一个切片轮转，每个切片包含
+        DEEP_CHECK_YEARS_PER_RUN 个年份，无需持久化状态即可逐周走完全部历史。
+        """
+        today = today or date.today()
+        years = list(range(settings.HISTORICAL_START_YEAR, today.year))
+        if not years:
+            return []
+        
+        per_run = max(1, settings.DEEP_CHECK_YEARS_PER_RUN)
+        slices = [years[i:i + per_run] for i in range(0, len(years), per_run)]
+        week_number = today.toordinal() // 7
+        # 从最近的年份开始往回走
+        return slices[::-1][week_number % len(slices)]
+    
+    @batched_writes
+    def revision_refresh(self, deep_check: bool = True):
+        """
+        修订刷新：替代每周全量重载
         
-        indicators = self.db_manager.get_indicators()
-        success_count = 0
+        - 按数据源只重新获取尾部窗口（WSD默认30天，EDB默认6个月），覆盖Wind的近期修订
+        - 可选地对一个历史年份切片做深度检查，每周轮转，逐步覆盖全部历史
+        """
+        self.logger.info("🔄 开始修订刷新")
+        
+        with self.telemetry.phase('planning'):
+            indicators = self.db_manager.get_indicators()
+        today = date.today()
+        end_date = today.strftime("%Y-%m-%d")
+        windows = {
+            'WSD': settings.REVISION_WINDOW_WSD_DAYS,
+            'EDB': settings.REVISION_WINDOW_EDB_DAYS
+        }
+        
+        succeeded = []
+        for i, indicator in enumerate(self.claim_indicators(self.prioritize(indicators), "revision")):
+            window_days = windows.get(indicator.get('data_source'), settings.REVISION_WINDOW_EDB_DAYS)
+            start_date = (today - timedelta(days=window_days)).strftime("%Y-%m-%d")
+            
+            self.logger.info(f"修订刷新进度: {i+1}/{len(indicators)} - {indicator['name']} ({start_date} 起)")
+            if self.update_single_indicator(indicator, start_date, end_date, "revision"):
+                succeeded.append(indicator['wind_code'])
+            
+            # 避免请求过于频繁
+            time.sleep(0.5)
         
-        for indicator in indicators:
-            wind_code = indicator['wind_code']
+        success_count = self.count_written(succeeded)
+        self.logger.info(f"尾部窗口刷新完成，成功: {success_count}/{len(indicators)}")
+        
+        if deep_check:
+            years = self.deep_check_years(today)
+            if years:
+                start_date = f"{years[0]}-01-01"
+                end_date = f"{years[-1]}-12-31"
+                self.logger.info(f"🔍 深度检查历史切片: {start_date} - {end_date}")
+                
+                succeeded = []
+                for indicator in self.claim_indicators(indicators, "deep_check"):
+                    if self.update_single_indicator(indicator, start_date, end_date, "deep_check"):
+                        succeeded.append(indicator['wind_code'])
+                    
+                    # 避免请求过于频繁
+                    time.sleep(0.5)
+                
+                success_count = self.count_written(succeeded)
+                self.logger.info(f"深度检查完成，成功: {success_count}/{len(indicators)}")
+    
+    @batched_writes
+    def repair_ranges(self, repair_plan: List[Dict[str, Any]]) -> int:
+        """
+        按漂移检测生成的修复计划重新获取不一致的序列年份
+        
+        获取成功的字段在修复区间内以Wind数据为准：本地多出的数据点（如Wind已撤销的日期）
+        在同一个SAVEPOINT中删除，否则数量不一致会在每次verify中重复出现。
+                
+        Args:
+            repair_plan: DriftVerifier.build_repair_plan的输出
             
-            # 获取最后更新日期（所有字段中的最新日期）
-            last_update_date = self.db_manager.get_last_update_date(wind_code)
+        Returns:
+            int: 成功修复的请求数
+        """
+        with self.telemetry.phase('planning'):
+            indicators = {i['wind_code']: i for i in self.db_manager.get_indicators()}
+        succeeded = []
+        
+        for i, item in enumerate(repair_plan):
+            indicator = indicators.get(item['wind_code'])
+            if not indicator:
+                self.logger.warning(f"修复计划中的指标不存在: {item['wind_code']}")
+                continue
             
-            if last_update_date:
-                # 从最后更新日期的下一天开始
-                start_date = (
-                    datetime.strptime(last_update_date, "%Y-%m-%d") + timedelta(days=1)
-                ).strftime("%Y-%m-%d")
-            else:
-                # 如果没有历史数据，从30天前开始
-                start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+            self.logger.info(
+                f"🔧 修复进度: {i+1}/{len(repair_plan)} - {item['wind_code']} "
+                f"{item['fields']} {item['start_date']} - {item['end_date']}"
+            )
+            if self.update_single_indicator(
+                indicator, item['start_date'], item['end_date'], "repair",
+                field_names=item['fields'], replace=True
+            ):
+                succeeded.append(item['wind_code'])
             
-            end_date = datetime.now().strftime("%Y-%m-%d")
+            # 避免请求过于频繁
+            time.sleep(0.5)
+        
+        success_count = self.count_written(succeeded)
+        self.logger.info(f"修复完成，成功: {success_count}/{len(repair_plan)}")
+        return success_count
+    
+    @batched_writes
+    def incremental_update(self):
+        """
+        增量数据更新
+        """
+        self.logger.info("开始增量数据更新")
+        
+        with self.telemetry.phase('planning'):
+            indicators = self.db_manager.get_indicators()
+        succeeded = []
+        
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        # 如果字段没有历史数据，从30天前开始
+        missing_start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        
+        for indicator in self.claim_indicators(self.prioritize(indicators), "incremental"):
+            # 按字段各自的最后日期更新，落后的字段不会被其他字段掩盖
+            result = self.update_indicator_fields_incrementally(
+                indicator, end_date, missing_start_date
+            )
             
-            # 如果开始日期不晚于结束日期，则进行更新
-            if start_date <= end_date:
-                if self.update_single_indicator(indicator, start_date, end_date, "incremental"):
-                    success_count += 1
+            if result is not None:
+                if result:
+                    succeeded.append(indicator['wind_code'])
                 
                 # 避免请求过于频繁
                 time.sleep(0.5)
         
+        success_count = self.count_written(succeeded)
         self.logger.info(f"增量数据更新完成，成功更新 {success_count} 个指标")
     
-    def setup_schedule(self):
+    def setup_schedule(self) -> JobScheduler:
         """
         设置定时任务
         """
-        # 每日增量更新（工作日18:00）
-        schedule.every().monday.at("18:00").do(self.incremental_update)
-        schedule.every().tuesday.at("18:00").do(self.incremental_update)
-        schedule.every().wednesday.at("18:00").do(self.incremental_update)
-        schedule.every().thursday.at("18:00").do(self.incremental_update)
-        schedule.every().friday.at("18:00").do(self.incremental_update)
-        
-        # 每周日全量更新（周日凌晨2:00）
-        schedule.every().sunday.at("02:00").do(self.full_historical_update)
+        job_scheduler = JobScheduler(self.db_manager)
+        
+        # 每日增量更新（工作日 DAILY_UPDATE_TIME）
+        job_scheduler.add_job(
+            "daily_incremental_update", self.incremental_update,
+            at=settings.DAILY_UPDATE_TIME, weekdays=[0, 1, 2, 3, 4], group="data_update"
+        )
+        
+        # 每周日修订刷新（周日 WEEKLY_UPDATE_TIME）：尾部窗口 + 滚动深度检查，替代全量重载
+        job_scheduler.add_job(
+            "weekly_revision_refresh", self.revision_refresh,
+            at=settings.WEEKLY_UPDATE_TIME, weekdays=[6], group="data_update"
+        )
+        
+        # 定期处理重试队列中到期的项。不放入data_update互斥组：同组任务重叠时会被跳过，
+        # 正在运行的重试会让当天的增量更新被丢弃；同一DataUpdater上的更新任务本身串行执行，
+        # 重试运行期间到期的增量更新会等待其结束后开始
+        job_scheduler.add_job(
+            "retry_queue_drain", self.drain_retry_queue,
+            interval_seconds=settings.RETRY_DRAIN_INTERVAL_SECONDS
+        )
         
         self.logger.info("定时任务设置完成")
+        return job_scheduler
     
     def run_scheduler(self):
         """
-        运行调度器
+        运行调度器（阻塞，直到stop_scheduler被调用）
         """
-        self.setup_schedule()
+        self.job_scheduler = self.setup_schedule()
         self.is_running = True
         
         self.logger.info("数据更新调度器启动")
         
-        while self.is_running:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+        try:
+            self.job_scheduler.run()
+        finally:
+            self.is_running = False
     
     def start_scheduler(self):
         """
@@ -224,81 +758,95 @@ class DataUpdater:
         """
         停止调度器
         """
-        self.is_running = False
+        if self.job_scheduler:
+            self.job_scheduler.stop()
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5)
+        self.is_running = False
         self.logger.info("调度器已停止")
     
-    def retry_failed_indicators(self, start_year: int = 2000):
+    def retry_failed_indicators(self) -> Tuple[int, int]:
         """
-        重试失败和缺失的指标
+        手动重试：立即处理重试队列中所有待重试项（忽略退避时间）
         """
-        self.logger.info("开始重试失败和缺失的指标")
-        
-        # 获取所有指标
-        indicators = self.db_manager.get_indicators()
+        return self.drain_retry_queue(ignore_backoff=True)
+    
+    @batched_writes
+    def drain_retry_queue(self, ignore_backoff: bool = False, limit: Optional[int] = None) -> Tuple[int, int]:
+        """
+        处理重试队列：只重新获取失败的(字段, 日期区间)，而不是从头重载整个指标
         
-        # 查找失败和缺失的指标
-        failed_indicators = []
-        missing_indicators = []
+        - 同一指标日期区间相同的字段合并为一次请求
+        - 请求前登记尝试次数并按指数退避推迟下一次重试，写入成功后对应项标记为done
+        - 超过MAX_RETRY_ATTEMPTS次的项标记为dead，不再重试
         
-        import sqlite3
-        with sqlite3.connect(self.db_manager.db_path) as conn:
-            cursor = conn.cursor()
+        Args:
+            ignore_backoff: 为True时处理所有待重试项，否则只处理到期项
+            limit: 本次最多处理的待重试项数
             
-            for indicator in indicators:
-                wind_code = indicator['wind_code']
+        Returns:
+            tuple: (成功的请求数, 请求总数)
+        """
+        with self.telemetry.phase('planning'):
+            items = self.db_manager.get_due_retries(limit=limit, include_future=ignore_backoff)
+            indicators = {i['wind_code']: i for i in self.db_manager.get_indicators()}
+        
+        exhausted = [item for item in items if item['attempts'] >= settings.MAX_RETRY_ATTEMPTS]
+        if exhausted:
+            self.db_manager.give_up_retries(exhausted)
+            self.logger.warning(f"⛔ {len(exhausted)} 个重试项超过最大重试次数，已放弃")
+        
+        requests = {}
+        for item in items:
+            if item['attempts'] >= settings.MAX_RETRY_ATTEMPTS:
+                continue
+            if item['wind_code'] not in indicators:
+                self.logger.warning(f"重试队列中的指标不存在: {item['wind_code']}")
+                continue
+            key = (item['start_date'], item['end_date'])
+            requests.setdefault(item['wind_code'], {}).setdefault(key, []).append(item)
+        
+        total_count = sum(len(ranges) for ranges in requests.values())
+        self.logger.info(f"🔁 开始处理重试队列: {len(items)} 个到期项，{total_count} 个请求")
+        if not requests:
+            return 0, 0
+        
+        succeeded = []
+        claimed = [indicators[wind_code] for wind_code in requests]
+        for indicator in self.claim_indicators(self.prioritize(claimed), "retry"):
+            for (start_date, end_date), group in sorted(requests[indicator['wind_code']].items()):
+                field_names = sorted(item['field_name'] for item in group)
+                self.db_manager.record_retry_attempts(
+                    group, settings.RETRY_BACKOFF_BASE_SECONDS, settings.RETRY_BACKOFF_MAX_SECONDS
+                )
                 
-                # 检查是否有数据
-                cursor.execute('SELECT COUNT(*) FROM time_series_data WHERE wind_code = ?', (wind_code,))
-                data_count = cursor.fetchone()[0]
+                self.logger.info(
+                    f"重试 {indicator['wind_code']} {field_names} {start_date} - {end_date}"
+                    f"（第 {max(item['attempts'] for item in group) + 1} 次）"
+                )
+                if self.update_single_indicator(
+                    indicator, start_date, end_date, "retry", field_names=field_names
+                ):
+                    succeeded.append(indicator['wind_code'])
                 
-                if data_count == 0:
-                    # 检查是否曾经尝试过更新
-                    cursor.execute('SELECT status FROM update_logs WHERE wind_code = ? ORDER BY update_time DESC LIMIT 1', (wind_code,))
-                    last_update = cursor.fetchone()
-                    
-                    if last_update and last_update[0] == 'failed':
-                        failed_indicators.append(indicator)
-                    else:
-                        missing_indicators.append(indicator)
-        
-        retry_indicators = failed_indicators + missing_indicators
-        self.logger.info(f"找到 {len(failed_indicators)} 个失败指标和 {len(missing_indicators)} 个缺失指标，共 {len(retry_indicators)} 个需要重试")
-        
-        if not retry_indicators:
-            self.logger.info("没有需要重试的指标")
-            return
-        
-        start_date = f"{start_year}-01-01"
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        success_count = 0
-        total_count = len(retry_indicators)
-        
-        for i, indicator in enumerate(retry_indicators):
-            self.logger.info(f"重试进度: {i+1}/{total_count} - {indicator['name']} ({indicator['wind_code']})")
-            
-            if self.update_single_indicator(indicator, start_date, end_date, "retry"):
-                success_count += 1
-                self.logger.info(f"✓ 成功重试指标: {indicator['wind_code']}")
-            else:
-                self.logger.warning(f"✗ 重试失败指标: {indicator['wind_code']}")
-            
-            # 避免请求过于频繁
-            time.sleep(1)
+                # 避免请求过于频繁
+                time.sleep(0.5)
         
-        self.logger.info(f"重试完成，成功: {success_count}/{total_count}")
+        success_count = self.count_written(succeeded)
+        self.logger.info(f"重试队列处理完成，成功: {success_count}/{total_count}")
+        return success_count, total_count
     
     def run_immediate_update(self, update_type: str = "incremental"):
         """
         立即执行更新
         
         Args:
-            update_type: 'incremental', 'full' 或 'retry'
+            update_type: 'incremental', 'full', 'revision' 或 'retry'
         """
         if update_type == "full":
             self.full_historical_update()
+        elif update_type == "revision":
+            self.revision_refresh()
         elif update_type == "retry":
             self.retry_failed_indicators()
         else:
@@ -329,11 +877,13 @@ class DataUpdater:
             
             summary.update({
                 'recent_updates_24h': recent_updates,
-                'failed_indicators': failed_indicators
+                'failed_indicators': failed_indicators,
+                'retry_queue': self.db_manager.get_retry_queue_summary()
             })
         
         return summary
     
+    @batched_writes
     def smart_incremental_update(self) -> tuple:
         """
         智能增量更新：
@@ -345,34 +895,36 @@ class DataUpdater:
         """
         self.logger.info("🚀 开始智能增量更新...")
         
-        indicators = self.db_manager.get_indicators()
+        with self.telemetry.phase('planning'):
+            indicators = self.db_manager.get_indicators()
         self.logger.info(f"📊 总指标数量: {len(indicators)}")
         
         new_indicators = []      # 没有任何数据的指标
         existing_indicators = [] # 已有数据的指标
         
         # 分类指标
-        import sqlite3
-        with sqlite3.connect(self.db_manager.db_path) as conn:
-            cursor = conn.cursor()
-            
-            for indicator in indicators:
-                wind_code = indicator['wind_code']
-                
-                # 检查是否有数据
-                cursor.execute('SELECT COUNT(*) FROM time_series_data WHERE wind_code = ?', (wind_code,))
-                data_count = cursor.fetchone()[0]
+        with self.telemetry.phase('planning'):
+            import sqlite3
+            with sqlite3.connect(self.db_manager.db_path) as conn:
+                cursor = conn.cursor()
                 
-                if data_count == 0:
-                    new_indicators.append(indicator)
-                else:
-                    existing_indicators.append(indicator)
+                for indicator in indicators:
+                    wind_code = indicator['wind_code']
+                    
+                    # 检查是否有数据
+                    cursor.execute('SELECT COUNT(*) FROM time_series_data WHERE wind_code = ?', (wind_code,))
+                    data_count = cursor.fetchone()[0]
+                    
+                    if data_count == 0:
+                        new_indicators.append(indicator)
+                    else:
+                        existing_indicators.append(indicator)
         
         self.logger.info(f"🆕 新增指标: {len(new_indicators)} 个（需要全量更新）")
         self.logger.info(f"📈 存量指标: {len(existing_indicators)} 个（需要增量更新）")
         
-        success_new = 0
-        success_existing = 0
+        succeeded_new = []
+        succeeded_existing = []
         
         # 1. 处理新增指标 - 全量更新（2000年至今）
         if new_indicators:
@@ -380,7 +932,7 @@ class DataUpdater:
             start_date = "2000-01-01"
             end_date = datetime.now().strftime("%Y-%m-%d")
             
-            for i, indicator in enumerate(new_indicators):
+            for i, indicator in enumerate(self.claim_indicators(self.prioritize(new_indicators), "smart_new")):
                 wind_code = indicator['wind_code']
                 name = indicator['name']
                 
@@ -388,7 +940,7 @@ class DataUpdater:
                 
                 try:
                     if self.update_single_indicator(indicator, start_date, end_date, "full"):
-                        success_new += 1
+                        succeeded_new.append(wind_code)
                         self.logger.info(f"✅ 成功: {wind_code}")
                     else:
                         self.logger.warning(f"❌ 失败: {wind_code}")
@@ -409,32 +961,30 @@ class DataUpdater:
             self.logger.info(f"\n🔄 开始更新存量指标（增量更新）...")
             end_date = datetime.now().strftime("%Y-%m-%d")
             
-            for i, indicator in enumerate(existing_indicators):
+            for i, indicator in enumerate(self.claim_indicators(self.prioritize(existing_indicators), "smart_existing")):
                 wind_code = indicator['wind_code']
                 name = indicator['name']
                 
-                # 获取最后更新日期
-                last_update_date = self.db_manager.get_last_update_date(wind_code)
+                # 按字段计算增量窗口，已有数据但完全缺失的字段从2000年开始补齐
+                windows = self.plan_field_windows(indicator, end_date, "2000-01-01")
                 
-                if last_update_date:
-                    # 从最后更新日期的下一天开始
-                    start_date = (
-                        datetime.strptime(last_update_date, "%Y-%m-%d") + timedelta(days=1)
-                    ).strftime("%Y-%m-%d")
-                else:
-                    # 如果没有历史数据，从30天前开始
-                    start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-                
-                # 如果开始日期不晚于结束日期，则进行更新
-                if start_date <= end_date:
+                if windows:
+                    earliest_start = windows[0][0]
                     days_to_update = (datetime.strptime(end_date, "%Y-%m-%d") - 
-                                    datetime.strptime(start_date, "%Y-%m-%d")).days
+                                    datetime.strptime(earliest_start, "%Y-%m-%d")).days
                     
-                    self.logger.info(f"📈 [{i+1:3d}/{len(existing_indicators)}] 存量: {name} ({wind_code}) - 更新{days_to_update}天")
+                    self.logger.info(f"📈 [{i+1:3d}/{len(existing_indicators)}] 存量: {name} ({wind_code}) - 更新{days_to_update}天，{len(windows)}个请求")
                     
                     try:
-                        if self.update_single_indicator(indicator, start_date, end_date, "incremental"):
-                            success_existing += 1
+                        indicator_success = True
+                        for start_date, field_names in windows:
+                            if not self.update_single_indicator(
+                                indicator, start_date, end_date, "incremental", field_names=field_names
+                            ):
+                                indicator_success = False
+                        
+                        if indicator_success:
+                            succeeded_existing.append(wind_code)
                             self.logger.info(f"✅ 成功: {wind_code}")
                         else:
                             self.logger.warning(f"❌ 失败: {wind_code}")
@@ -452,7 +1002,9 @@ class DataUpdater:
                     progress = (i + 1) / len(existing_indicators) * 100
                     self.logger.info(f"📈 存量指标进度: {i+1}/{len(existing_indicators)} ({progress:.1f}%)")
         
-        # 更新摘要
+        # 更新摘要（写入阶段失败的指标不计入成功）
+        success_new = self.count_written(succeeded_new)
+        success_existing = self.count_written(succeeded_existing)
         self.logger.info(f"\n📊 智能增量更新完成:")
         self.logger.info(f"✅ 新增指标成功: {success_new}/{len(new_indicators)}")
         self.logger.info(f"✅ 存量指标成功: {success_existing}/{len(existing_indicators)}")
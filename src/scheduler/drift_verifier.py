@@ -0,0 +1,199 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+import logging
+import time
+import pandas as pd
+from src.database.models_v2 import DatabaseManager
+from src.data_fetcher.wind_client_v2 import WindDataFetcher
+
+
+class DriftVerifier:
+    """
+    本地数据与Wind数据的漂移检测
+
+    基于series_checksums中的(序列, 年份)校验和与Wind比对，只对不一致的
+    序列年份生成修复计划，避免为了确认数据一致而重新获取全部历史。
+
+    检测模式：
+    - sample: WSD使用Period=M只获取月末采样点，与sample_hash比对（EDB数据量小，按full比对）
+    - full: 获取完整年度数据，与row_count/value_hash比对
+    """
+
+    def __init__(self, db_manager: DatabaseManager, data_fetcher: WindDataFetcher):
+        self.db_manager = db_manager
+        self.data_fetcher = data_fetcher
+        self.logger = logging.getLogger(__name__)
+
+    def verify(
+        self,
+        wind_codes: Optional[List[str]] = None,
+        years: Optional[List[int]] = None,
+        mode: str = "sample"
+    ) -> Dict[str, Any]:
+        """
+        检测数据漂移
+
+        Args:
+            wind_codes: 只检查指定指标，为空时检查全部
+            years: 只检查指定年份，为空时检查全部年份
+            mode: 'sample' 或 'full'
+
+        Returns:
+            Dict: 漂移报告，包含mismatches（不一致的序列年份）和repair_plan（修复计划）
+        """
+        if mode not in ("sample", "full"):
+            raise ValueError(f"不支持的检测模式: {mode}")
+
+        # 先补算写入后尚未刷新的校验和，避免把本地刚写入的数据误报为漂移
+        self.db_manager.refresh_dirty_checksums()
+        rebuilt = self.db_manager.rebuild_missing_checksums()
+        if rebuilt:
+            self.logger.info(f"补算 {rebuilt} 个序列的校验和")
+
+        indicators = {
+            indicator['wind_code']: indicator
+            for indicator in self.db_manager.get_indicators()
+            if not wind_codes or indicator['wind_code'] in wind_codes
+        }
+
+        checksums_by_code = {}
+        for checksum in self.db_manager.get_series_checksums(years=years):
+            if checksum['wind_code'] in indicators:
+                checksums_by_code.setdefault(checksum['wind_code'], []).append(checksum)
+
+        self.logger.info(f"🔍 开始漂移检测({mode}): {len(checksums_by_code)} 个指标")
+
+        mismatches = []
+        unverified = []
+        checked = 0
+
+        for i, (wind_code, checksums) in enumerate(checksums_by_code.items()):
+            indicator = indicators[wind_code]
+            sampled = mode == "sample" and indicator.get('data_source') == 'WSD'
+
+            # 每个指标一次请求覆盖所有待检查的字段和年份
+            start_date = f"{min(c['year'] for c in checksums)}-01-01"
+            end_date = max(c['last_date'] for c in checksums)
+            fields = sorted({c['field_name'] for c in checksums})
+
+            self.logger.info(f"[{i+1}/{len(checksums_by_code)}] 检查 {wind_code} {start_date} - {end_date}")
+            remote = self.data_fetcher.fetch_data_by_indicator(
+                indicator, start_date, end_date,
+                fields=fields,
+                options="Period=M" if sampled else ""
+            )
+
+            if remote is None:
+                unverified.extend(
+                    {'wind_code': wind_code, 'field_name': c['field_name'], 'year': c['year']}
+                    for c in checksums
+                )
+                continue
+
+            for checksum in checksums:
+                checked += 1
+                mismatch = self._compare(checksum, remote, sampled)
+                if mismatch:
+                    mismatches.append(mismatch)
+
+            # 避免请求过于频繁
+            time.sleep(0.5)
+
+        report = {
+            'mode': mode,
+            'generated_at': datetime.now().isoformat(),
+            'checked_series_years': checked,
+            'mismatches': mismatches,
+            'unverified': unverified,
+            'repair_plan': self.build_repair_plan(mismatches)
+        }
+
+        self.logger.info(
+            f"漂移检测完成: 检查 {checked} 个序列年份，不一致 {len(mismatches)} 个，"
+            f"未能验证 {len(unverified)} 个，修复请求 {len(report['repair_plan'])} 个"
+        )
+        return report
+
+    def _compare(self, checksum: Dict[str, Any], remote, sampled: bool) -> Optional[Dict[str, Any]]:
+        """比对单个序列年份，不一致时返回差异描述"""
+        field_name = checksum['field_name']
+        year = checksum['year']
+
+        mismatch = {
+            'wind_code': checksum['wind_code'],
+            'field_name': field_name,
+            'year': year,
+            'local': {
+                'row_count': checksum['row_count'],
+                'value_sum': checksum['value_sum']
+            }
+        }
+
+        column = field_name if field_name in remote.columns else (
+            remote.columns[0] if len(remote.columns) == 1 else None
+        )
+        if column is None:
+            mismatch['reason'] = "Wind未返回该字段"
+            return mismatch
+
+        series = remote[column].dropna()
+        dates = pd.to_datetime(series.index).strftime('%Y-%m-%d')
+        series = series[(dates >= f"{year}-01-01") & (dates <= checksum['last_date'])]
+
+        remote_checksum = self.db_manager.compute_year_checksums(
+            series, sample_cutoff=checksum['last_date']
+        ).get(year)
+
+        if remote_checksum is None:
+            mismatch['reason'] = "Wind该年份无数据"
+            return mismatch
+
+        if sampled:
+            if remote_checksum['sample_hash'] == checksum['sample_hash']:
+                return None
+            mismatch['reason'] = "月末采样值不一致"
+        else:
+            if (remote_checksum['row_count'] == checksum['row_count']
+                    and remote_checksum['value_hash'] == checksum['value_hash']):
+                return None
+            mismatch['reason'] = "数据点数量或数值不一致"
+            mismatch['remote'] = {
+                'row_count': remote_checksum['row_count'],
+                'value_sum': remote_checksum['value_sum']
+            }
+
+        return mismatch
+
+    def build_repair_plan(self, mismatches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        生成修复计划：同一字段的连续年份合并为一个区间，区间相同的字段合并为一次多字段请求
+
+        Returns:
+            List[Dict]: [{wind_code, fields, start_date, end_date, years}, ...]
+        """
+        years_by_field = {}
+        for mismatch in mismatches:
+            key = (mismatch['wind_code'], mismatch['field_name'])
+            years_by_field.setdefault(key, set()).add(mismatch['year'])
+
+        ranges = {}
+        for (wind_code, field_name), years in years_by_field.items():
+            run = []
+            for year in sorted(years):
+                if run and year != run[-1] + 1:
+                    ranges.setdefault((wind_code, run[0], run[-1]), []).append(field_name)
+                    run = []
+                run.append(year)
+            ranges.setdefault((wind_code, run[0], run[-1]), []).append(field_name)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        return [
+            {
+                'wind_code': wind_code,
+                'fields': sorted(fields),
+                'start_date': f"{first_year}-01-01",
+                'end_date': min(f"{last_year}-12-31", today),
+                'years': list(range(first_year, last_year + 1))
+            }
+            for (wind_code, first_year, last_year), fields in sorted(ranges.items())
+        ]
@@ -0,0 +1,260 @@
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import logging
+from config.config import settings
+from src.database.models_v2 import DatabaseManager
+
+
+class ScheduledJob:
+    """调度任务定义"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        at: Optional[str] = None,
+        weekdays: Optional[List[int]] = None,
+        interval_seconds: Optional[int] = None,
+        group: Optional[str] = None
+    ):
+        """
+        Args:
+            name: 任务名（持久化状态的主键）
+            func: 任务函数
+            at: 每日运行时间 "HH:MM"
+            weekdays: 运行的星期（0=周一），为空表示每天
+            interval_seconds: 固定间隔运行（与at二选一）
+            group: 互斥组，同组任务不会同时运行
+        """
+        if (at is None) == (interval_seconds is None):
+            raise ValueError(f"任务 {name} 必须且只能指定 at 或 interval_seconds 之一")
+
+        self.name = name
+        self.func = func
+        self.at = at
+        self.weekdays = weekdays
+        self.interval_seconds = interval_seconds
+        self.group = group
+        self.next_run: Optional[datetime] = None
+        self.lock = threading.Lock()
+
+    @property
+    def spec(self) -> str:
+        """调度规则，与next_run_time一起持久化，用于判断配置是否变化"""
+        return json.dumps({
+            'at': self.at, 'weekdays': self.weekdays, 'interval_seconds': self.interval_seconds
+        }, sort_keys=True)
+    
+    def next_run_after(self, moment: datetime) -> datetime:
+        """计算moment之后的下一次运行时间"""
+        if self.interval_seconds:
+            return moment + timedelta(seconds=self.interval_seconds)
+
+        hour, minute = (int(part) for part in self.at.split(":"))
+        candidate = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= moment:
+            candidate += timedelta(days=1)
+        while self.weekdays is not None and candidate.weekday() not in self.weekdays:
+            candidate += timedelta(days=1)
+        return candidate
+
+
+class JobScheduler:
+    """
+    事件驱动的任务调度器
+
+    - 休眠到最近一个任务的到期时间，而不是固定间隔轮询
+    - 同一任务（以及同一互斥组内的任务）不会重叠运行，重叠的触发记为skipped
+    - 启动时根据持久化的next_run_time处理停机期间错过的任务（misfire）；
+      调度规则（at/weekdays/interval_seconds）与持久化时不同时按新规则重新计算
+    - 任务状态和每次运行的耗时写入数据库
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        misfire_policy: Optional[str] = None,
+        misfire_grace_seconds: Optional[int] = None,
+        max_sleep_seconds: Optional[int] = None
+    ):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self.misfire_policy = misfire_policy or settings.SCHEDULER_MISFIRE_POLICY
+        self.misfire_grace = timedelta(
+            seconds=misfire_grace_seconds if misfire_grace_seconds is not None
+            else settings.SCHEDULER_MISFIRE_GRACE_SECONDS
+        )
+        self.max_sleep_seconds = max_sleep_seconds or settings.SCHEDULER_CHECK_INTERVAL
+
+        if self.misfire_policy not in ("run_once", "skip"):
+            raise ValueError(f"不支持的misfire策略: {self.misfire_policy}")
+
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.group_locks: Dict[str, threading.Lock] = {}
+        self.workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()
+
+    def add_job(self, name: str, func: Callable, **kwargs) -> ScheduledJob:
+        """注册任务，参数见ScheduledJob"""
+        job = ScheduledJob(name, func, **kwargs)
+        self.jobs[name] = job
+        if job.group:
+            self.group_locks.setdefault(job.group, threading.Lock())
+        self._wakeup.set()
+        return job
+
+    def _restore_state(self, now: datetime):
+        """根据持久化状态计算每个任务的下一次运行时间，并处理错过的任务"""
+        states = self.db_manager.get_scheduler_job_states()
+
+        for job in self.jobs.values():
+            state = states.get(job.name, {})
+            persisted = state.get('next_run_time')
+            scheduled = datetime.fromisoformat(persisted) if persisted else None
+            
+            if scheduled and scheduled > now and not self._same_schedule(job, state, scheduled):
+                # 运行时间或间隔等配置已修改，按新规则重新计算，旧规则下的时间不再有效
+                self.logger.info(f"任务 {job.name} 的调度规则已变化，重新计算下一次运行时间")
+                job.next_run = job.next_run_after(now)
+            elif scheduled is None or scheduled > now:
+                job.next_run = scheduled or job.next_run_after(now)
+            elif now - scheduled <= self.misfire_grace or self.misfire_policy == "run_once":
+                # 错过的任务只补跑一次，不论错过了多少次
+                self.logger.warning(f"⏰ 任务 {job.name} 错过了 {scheduled.isoformat()} 的运行，立即补跑")
+                job.next_run = now
+            else:
+                self.logger.warning(f"⏰ 任务 {job.name} 错过了 {scheduled.isoformat()} 的运行，按策略跳过")
+                self.db_manager.record_scheduler_run(
+                    job.name, scheduled.isoformat(), None, None, None, "missed",
+                    f"停机期间错过，misfire策略: {self.misfire_policy}"
+                )
+                job.next_run = job.next_run_after(now)
+
+            self.db_manager.save_scheduler_job_state(
+                job.name, next_run_time=job.next_run.isoformat(), schedule_spec=job.spec
+            )
+            self.logger.info(f"任务 {job.name} 下一次运行: {job.next_run.isoformat()}")
+
+    @staticmethod
+    def _same_schedule(job: ScheduledJob, state: Dict, scheduled: datetime) -> bool:
+        """持久化的下一次运行时间是否仍按当前调度规则计算"""
+        if state.get('schedule_spec'):
+            return state['schedule_spec'] == job.spec
+        # 旧版本没有保存规则：定时任务检查该时间是否落在当前规则上，间隔任务无法判断
+        return bool(job.interval_seconds) or job.next_run_after(scheduled - timedelta(seconds=1)) == scheduled
+    
+    def run(self):
+        """阻塞运行调度循环，直到stop()被调用"""
+        self._stop_event.clear()
+        self._restore_state(datetime.now())
+        self.logger.info(f"任务调度器启动，共 {len(self.jobs)} 个任务")
+
+        while not self._stop_event.is_set():
+            now = datetime.now()
+            due_jobs = [job for job in self.jobs.values() if job.next_run and job.next_run <= now]
+
+            for job in due_jobs:
+                self._dispatch(job, now)
+
+            upcoming = [job.next_run for job in self.jobs.values() if job.next_run]
+            if not upcoming:
+                sleep_seconds = self.max_sleep_seconds
+            else:
+                sleep_seconds = (min(upcoming) - datetime.now()).total_seconds()
+            # 休眠到下一个到期时间；上限用于应对系统休眠或时钟跳变，stop()/add_job()会立即唤醒
+            sleep_seconds = max(0.0, min(sleep_seconds, self.max_sleep_seconds))
+
+            self._wakeup.clear()
+            self._wakeup.wait(sleep_seconds)
+
+        for worker in self.workers:
+            worker.join(timeout=5)
+        self.logger.info("任务调度器已停止")
+
+    def stop(self):
+        """停止调度循环（正在运行的任务会继续完成）"""
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def _dispatch(self, job: ScheduledJob, now: datetime):
+        """启动到期任务，并计算其下一次运行时间"""
+        scheduled = job.next_run
+        job.next_run = job.next_run_after(now)
+        self.db_manager.save_scheduler_job_state(
+            job.name, next_run_time=job.next_run.isoformat(), schedule_spec=job.spec
+        )
+
+        group_lock = self.group_locks.get(job.group) if job.group else None
+
+        if not job.lock.acquire(blocking=False):
+            self._record_skip(job, scheduled, "上一次运行尚未结束")
+            return
+        if group_lock and not group_lock.acquire(blocking=False):
+            job.lock.release()
+            self._record_skip(job, scheduled, f"互斥组 {job.group} 中有任务正在运行")
+            return
+
+        worker = threading.Thread(
+            target=self._run_job, args=(job, scheduled, group_lock),
+            name=f"job-{job.name}", daemon=True
+        )
+        self.workers = [w for w in self.workers if w.is_alive()] + [worker]
+        worker.start()
+
+    def _record_skip(self, job: ScheduledJob, scheduled: datetime, reason: str):
+        """记录因重叠而跳过的触发"""
+        self.logger.warning(f"⏭️  跳过任务 {job.name}: {reason}")
+        self.db_manager.record_scheduler_run(
+            job.name, scheduled.isoformat(), None, None, None, "skipped", reason
+        )
+        self.db_manager.save_scheduler_job_state(job.name, last_status="skipped")
+
+    def _run_job(self, job: ScheduledJob, scheduled: datetime, group_lock: Optional[threading.Lock]):
+        """在工作线程中执行任务并记录耗时"""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        status, error_message = "success", None
+
+        self.logger.info(f"▶️  开始运行任务 {job.name}（计划时间 {scheduled.isoformat()}）")
+        self.db_manager.save_scheduler_job_state(job.name, last_start=started_at.isoformat())
+
+        try:
+            job.func()
+        except Exception as e:
+            status, error_message = "failed", str(e)
+            self.logger.error(f"任务 {job.name} 运行失败: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            finished_at = datetime.now().isoformat()
+            try:
+                self.db_manager.record_scheduler_run(
+                    job.name, scheduled.isoformat(), started_at.isoformat(), finished_at,
+                    duration, status, error_message
+                )
+                self.db_manager.save_scheduler_job_state(
+                    job.name, last_end=finished_at, last_status=status, last_duration=duration
+                )
+            finally:
+                if group_lock:
+                    group_lock.release()
+                job.lock.release()
+
+        self.logger.info(f"⏹️  任务 {job.name} 结束: {status}，耗时 {duration:.1f}s")
+
+    def get_jobs_status(self) -> List[Dict]:
+        """获取任务的调度状态"""
+        states = self.db_manager.get_scheduler_job_states()
+        return [
+            {
+                'job_name': job.name,
+                'next_run_time': job.next_run.isoformat() if job.next_run else None,
+                'running': job.lock.locked(),
+                'last_status': states.get(job.name, {}).get('last_status'),
+                'last_duration': states.get(job.name, {}).get('last_duration')
+            }
+            for job in self.jobs.values()
+        ]
@@ -0,0 +1,105 @@
+import time
+import bisect
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+
+class RunTelemetry:
+    """
+    单次更新运行的遥测数据
+
+    - 分阶段计时：planning（计划/查询）、fetch（Wind请求）、decode（整理数据）、write（写入数据）、log（写入日志）
+    - 按数据源聚合每个请求的获取延迟和数据行数直方图
+    """
+
+    PHASES = ('planning', 'fetch', 'decode', 'write', 'log')
+
+    # 直方图桶上界，最后一个桶为+inf
+    LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+    ROW_BUCKETS = [0, 10, 100, 1000, 5000, 10000]
+
+    def __init__(self, strategy: str, run_id: Optional[str] = None, worker_id: Optional[str] = None):
+        self.strategy = strategy
+        self.run_id = run_id
+        self.worker_id = worker_id
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.ended_at = None
+        self.duration = None
+        self.status = 'running'
+        self.error_message = None
+
+        self.phase_seconds = {phase: 0.0 for phase in self.PHASES}
+        self.counts = {
+            'indicators': 0, 'requests': 0, 'success': 0, 'failed': 0,
+            'points_written': 0, 'transactions': 0
+        }
+        self.histograms = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """累计某个阶段的耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - started
+
+    def add_phase_time(self, name: str, seconds: float):
+        self.phase_seconds[name] += seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] += value
+
+    def record_fetch(self, data_source: str, seconds: float, rows: int):
+        """记录一次Wind请求的延迟和返回行数"""
+        self._observe('fetch_latency', data_source, self.LATENCY_BUCKETS, seconds)
+        self._observe('rows', data_source, self.ROW_BUCKETS, rows)
+
+    def _observe(self, metric: str, data_source: str, buckets: List[float], value: float):
+        histogram = self.histograms.setdefault(
+            (metric, data_source),
+            {'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'total': 0}
+        )
+        histogram['counts'][bisect.bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['total'] += 1
+
+    def finish(self, status: str = 'success', error_message: Optional[str] = None):
+        self.ended_at = datetime.now()
+        self.duration = time.perf_counter() - self._started
+        self.status = status
+        self.error_message = error_message
+
+    def to_record(self) -> Dict[str, Any]:
+        """转换为update_runs表记录"""
+        record = {
+            'run_id': self.run_id,
+            'worker_id': self.worker_id,
+            'strategy': self.strategy,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
+            'duration_seconds': self.duration,
+            'error_message': self.error_message
+        }
+        record.update(self.counts)
+        record.update({f"{phase}_seconds": seconds for phase, seconds in self.phase_seconds.items()})
+        return record
+
+    def histogram_rows(self) -> List[Dict[str, Any]]:
+        """转换为update_run_histograms表记录（每个桶一行，bucket_le为空表示+inf）"""
+        rows = []
+        for (metric, data_source), histogram in self.histograms.items():
+            buckets = self.LATENCY_BUCKETS if metric == 'fetch_latency' else self.ROW_BUCKETS
+            for bound, count in zip(buckets + [None], histogram['counts']):
+                rows.append({
+                    'metric': metric,
+                    'data_source': data_source,
+                    'bucket_le': bound,
+                    'count': count,
+                    'total': histogram['total'],
+                    'sum': histogram['sum']
+                })
+        return rows
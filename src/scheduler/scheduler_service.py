@@ -0,0 +1,96 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+from src.database.models_v2 import DatabaseManager
+from src.scheduler.data_updater_v2 import DataUpdater
+
+
+class SchedulerService:
+    """
+    单实例调度器服务
+
+    通过数据库中的服务锁（service_locks）保证同一数据库只有一个调度器实例运行定时任务。
+    持有者每 lock_ttl/3 秒续期；进程崩溃后锁在lock_ttl秒后过期，可由备用实例接管。
+    续期失败超过lock_ttl（锁可能已被接管）时主动停止调度，避免重复执行任务。
+    """
+
+    LOCK_NAME = "scheduler"
+
+    def __init__(self, db_manager: DatabaseManager, data_updater: DataUpdater, lock_ttl: float = 60):
+        self.db_manager = db_manager
+        self.data_updater = data_updater
+        self.lock_ttl = lock_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, standby: bool = False) -> bool:
+        """
+        获取服务锁并运行调度器（阻塞，直到stop被调用或失去锁）
+
+        Args:
+            standby: 锁被其他实例持有时等待接管，否则立即返回
+
+        Returns:
+            bool: 是否获得锁并运行过调度器
+        """
+        while not self.db_manager.acquire_service_lock(self.LOCK_NAME, self.owner, self.lock_ttl):
+            if not standby:
+                holder = self.db_manager.get_service_lock(self.LOCK_NAME) or {}
+                self.logger.warning(f"⚠️ 调度器已在其他实例运行（{holder.get('owner')}），本实例不启动")
+                return False
+            if self._stop.wait(self.lock_ttl / 3):
+                return False
+
+        self.is_leader = True
+        self.logger.info(f"🔒 获得调度器锁（{self.owner}）")
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        try:
+            if not self._stop.is_set():
+                self.data_updater.run_scheduler()
+        finally:
+            self._stop.set()
+            heartbeat.join(timeout=5)
+            self.is_leader = False
+            self.db_manager.release_service_lock(self.LOCK_NAME, self.owner)
+            self.logger.info("🔓 已释放调度器锁")
+        return True
+
+    def _heartbeat(self):
+        """定期续期服务锁，失去锁时停止调度器"""
+        renewed_at = time.time()
+        while not self._stop.wait(self.lock_ttl / 3):
+            try:
+                if self.db_manager.acquire_service_lock(self.LOCK_NAME, self.owner, self.lock_ttl):
+                    renewed_at = time.time()
+                    continue
+                self.logger.error("❌ 调度器锁已被其他实例接管，停止调度")
+            except sqlite3.Error as e:
+                # 数据库暂时不可用时继续尝试，直到锁可能过期
+                self.logger.warning(f"调度器锁续期失败: {e}")
+                if time.time() - renewed_at < self.lock_ttl:
+                    continue
+                self.logger.error("❌ 调度器锁续期持续失败，锁可能已过期，停止调度")
+            self.data_updater.stop_scheduler()
+            return
+
+    def start(self):
+        """在后台线程中运行（备用模式：其他实例持有锁时等待接管）"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, kwargs={'standby': True}, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """停止调度器并释放服务锁"""
+        self._stop.set()
+        if self.is_leader:
+            self.data_updater.stop_scheduler()
+        if self.thread:
+            self.thread.join(timeout=10)
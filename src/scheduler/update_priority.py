@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
+import logging
+from config.config import settings
+from src.database.models_v2 import DatabaseManager
+
+
+class UpdatePrioritizer:
+    """
+    更新优先级模型
+
+    综合三个0~1的分量为每个指标打分，分数高的先更新：
+    - release: 按上一个完整年份的数据点数估计发布间隔，距最新数据的天数达到一个发布间隔时为1（应该有新数据了）
+    - staleness: 距最新数据的天数，STALENESS_HORIZON_DAYS天封顶
+    - demand: API和报告的读取需求（按半衰期衰减），相对于需求最高的序列
+    """
+
+    STALENESS_HORIZON_DAYS = 30
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self.weights = {
+            'release': settings.PRIORITY_WEIGHT_RELEASE,
+            'staleness': settings.PRIORITY_WEIGHT_STALENESS,
+            'demand': settings.PRIORITY_WEIGHT_DEMAND
+        }
+
+    def score(self, indicators: List[Dict[str, Any]], today: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        计算指标的优先级
+
+        Returns:
+            Dict: {wind_code: {'score', 'release', 'staleness', 'demand', 'last_date', 'release_interval_days'}}，
+            last_date为None表示新鲜度未知
+        """
+        today = today or date.today()
+        
+        # 新鲜度只读取校验和表，不在更新任务中补算；旧数据库的校验和由verify命令一次性补齐
+        freshness = self.db_manager.get_series_freshness(today.year - 1)
+        demand = self.db_manager.get_series_demand(settings.PRIORITY_DEMAND_HALF_LIFE_DAYS)
+        max_demand = max(demand.values(), default=0)
+
+        scores = {}
+        for indicator in indicators:
+            wind_code = indicator['wind_code']
+            info = freshness.get(wind_code, {})
+            last_date = info.get('last_date')
+
+            if last_date:
+                age_days = max(0, (today - datetime.strptime(last_date, "%Y-%m-%d").date()).days)
+                staleness = min(1.0, age_days / self.STALENESS_HORIZON_DAYS)
+            else:
+                # 没有校验和的字段新鲜度未知（没有数据，或旧数据库尚未运行verify），按最陈旧处理
+                age_days = None
+                staleness = 1.0
+
+            # 日频约250个点/年 -> 约1.5天；月频12个点/年 -> 约30天；没有完整年份时按日频处理
+            rows_per_year = info.get('rows_per_year')
+            release_interval = 365 / rows_per_year if rows_per_year else 1.0
+            release = 1.0 if age_days is None else min(1.0, age_days / release_interval)
+
+            demand_score = demand.get(wind_code, 0) / max_demand if max_demand else 0.0
+
+            scores[wind_code] = {
+                'score': (
+                    self.weights['release'] * release
+                    + self.weights['staleness'] * staleness
+                    + self.weights['demand'] * demand_score
+                ),
+                'release': release,
+                'staleness': staleness,
+                'demand': demand_score,
+                'last_date': last_date,
+                'release_interval_days': release_interval
+            }
+
+        return scores
+
+    def order(self, indicators: List[Dict[str, Any]], today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """按优先级从高到低排序指标，分数相同时保持原有顺序（类别、名称）"""
+        if not indicators:
+            return indicators
+        scores = self.score(indicators, today)
+        return sorted(indicators, key=lambda indicator: -scores[indicator['wind_code']]['score'])
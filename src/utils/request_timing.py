@@ -0,0 +1,101 @@
+import cProfile
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class RequestTimings:
+    """
+    单个API请求的分阶段计时
+
+    - db：SQL查询（DatabaseManager）
+    - transform：DataFrame/NumPy整理（切分序列、重采样、构建Arrow表）
+    - serialize：编码响应体（JSON、Arrow IPC/Parquet、NDJSON/CSV）
+
+    profiler不为None时，该请求在线程池中的调用在cProfile下执行（采样剖析）。
+    """
+
+    PHASES = ('db', 'transform', 'serialize')
+
+    def __init__(self, profiler: Optional[cProfile.Profile] = None):
+        self.phase_seconds = {phase: 0.0 for phase in self.PHASES}
+        self.counts = {phase: 0 for phase in self.PHASES}
+        self.profiler = profiler
+        # 正在计时的阶段，嵌套调用同一阶段的计时函数时只计外层
+        self._active = set()
+
+    def add(self, name: str, seconds: float):
+        self.phase_seconds[name] += seconds
+        self.counts[name] += 1
+
+
+# 当前请求的计时，由API中间件设置；线程池调用通过复制上下文继承
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar('request_timings', default=None)
+
+
+def begin(timings: RequestTimings) -> contextvars.Token:
+    return _current.set(timings)
+
+
+def end(token: contextvars.Token):
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str):
+    """将代码块耗时累加到当前请求的阶段，不在请求内（如调度器）时不计时"""
+    timings = _current.get()
+    if timings is None or name in timings._active:
+        yield
+        return
+    timings._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """装饰器：将函数耗时累加到当前请求的阶段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profiled_call(func: Callable, *args, **kwargs):
+    """
+    执行函数，当前请求被采样剖析时在其profiler下执行（在线程池线程中调用）
+
+    同一请求的线程池调用是依次await的，同一profiler不会在多个线程中同时启用。
+    """
+    timings = _current.get()
+    if timings is None or timings.profiler is None:
+        return func(*args, **kwargs)
+    try:
+        timings.profiler.enable()
+    except ValueError:
+        # 其他剖析工具已启用（Python 3.12+的sys.monitoring同时只允许一个），跳过本次剖析
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings.profiler.disable()
+
+
+def summary(timings: RequestTimings) -> Dict[str, float]:
+    """各阶段耗时（毫秒）"""
+    return {name: round(seconds * 1000, 3) for name, seconds in timings.phase_seconds.items()}
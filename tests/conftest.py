@@ -0,0 +1,27 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.models_v2 import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    """临时数据库，包含指标A.SH、B.SH（股票）和C.SH（债券），每个指标有close和pe两个字段"""
+    manager = DatabaseManager(str(tmp_path / "data" / "financial_data.db"))
+    with sqlite3.connect(manager.db_path) as conn:
+        for wind_code, category in (("A.SH", "股票"), ("B.SH", "股票"), ("C.SH", "债券")):
+            conn.execute(
+                "INSERT INTO indicators (wind_code, name, category, data_source) VALUES (?, ?, ?, 'WSD')",
+                (wind_code, wind_code, category)
+            )
+            conn.executemany(
+                "INSERT INTO indicator_fields (wind_code, field_name, field_display_name) VALUES (?, ?, ?)",
+                [(wind_code, field, field) for field in ("close", "pe")]
+            )
+    return manager
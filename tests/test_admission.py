@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from starlette.responses import StreamingResponse
+
+from src.api.admission import AdmissionController, AdmissionRejected
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def body():
+    yield b"a"
+    yield b"b"
+
+
+async def never_disconnect():
+    await asyncio.sleep(3600)
+
+
+async def disconnect():
+    return {"type": "http.disconnect"}
+
+
+def test_cheap_queries_are_not_limited():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=1, queue_size=0, per_client=1)
+        tickets = [await controller.admit("client", 10) for _ in range(5)]
+        for ticket in tickets:
+            ticket.release()
+        return controller.get_stats()
+
+    stats = run(scenario())
+    assert (stats['cheap'], stats['heavy'], stats['running'], stats['rejected']) == (5, 0, 0, 0)
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=1, queue_size=0, per_client=5)
+        ticket = await controller.admit("a", 100)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.admit("b", 100)
+        ticket.release()
+        # 名额释放后可以再次准入
+        (await controller.admit("b", 100)).release()
+        return excinfo.value, controller.get_stats()
+
+    rejected, stats = run(scenario())
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert (stats['rejected'], stats['running'], stats['waiting']) == (1, 0, 0)
+
+
+def test_per_client_limit():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=4, queue_size=4, per_client=1)
+        ticket = await controller.admit("a", 100)
+        with pytest.raises(AdmissionRejected):
+            await controller.admit("a", 100)
+        (await controller.admit("b", 100)).release()
+        ticket.release()
+
+    run(scenario())
+
+
+def test_queue_timeout_is_rejected():
+    async def scenario():
+        controller = AdmissionController(
+            heavy_points=100, max_concurrency=1, queue_size=1, queue_timeout=0.05, per_client=5
+        )
+        ticket = await controller.admit("a", 100)
+        with pytest.raises(AdmissionRejected):
+            await controller.admit("b", 100)
+        ticket.release()
+        return controller.get_stats()
+
+    stats = run(scenario())
+    assert (stats['running'], stats['waiting'], stats['rejected']) == (0, 0, 1)
+
+
+def test_streaming_slot_is_held_until_response_finishes():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=1, queue_size=0, per_client=5)
+        ticket = await controller.admit("a", 100)
+        response = ticket.attach(StreamingResponse(body(), media_type="text/csv", headers={"ETag": '"1"'}))
+        # 处理函数返回时的release不释放随响应保持的名额
+        ticket.release()
+        running_before = controller.get_stats()['running']
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, never_disconnect, send)
+        return running_before, controller.get_stats()['running'], messages
+
+    running_before, running_after, messages = run(scenario())
+    assert (running_before, running_after) == (1, 0)
+    headers = dict(messages[0]['headers'])
+    assert headers[b"etag"] == b'"1"'
+    assert headers[b"content-type"].startswith(b"text/csv")
+    assert [message.get('body') for message in messages[1:]] == [b"a", b"b", b""]
+
+
+def test_streaming_slot_is_released_when_client_disconnects_before_body():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=1, queue_size=0, per_client=5)
+        ticket = await controller.admit("a", 100)
+        started = []
+
+        async def tracked_body():
+            started.append(True)
+            yield b"a"
+
+        response = ticket.attach(StreamingResponse(tracked_body()))
+        ticket.release()
+
+        async def slow_send(message):
+            await asyncio.sleep(0.05)
+
+        # ASGI 2.3及以下：Starlette监听断开，断开时取消尚未开始的响应体发送
+        await response({"type": "http", "asgi": {"spec_version": "2.3"}}, disconnect, slow_send)
+        return started, controller.get_stats()['running']
+
+    started, running = run(scenario())
+    assert started == []
+    assert running == 0
+
+
+def test_streaming_slot_is_released_when_response_task_is_cancelled():
+    async def scenario():
+        controller = AdmissionController(heavy_points=100, max_concurrency=1, queue_size=0, per_client=5)
+        ticket = await controller.admit("a", 100)
+        response = ticket.attach(StreamingResponse(body()))
+
+        async def blocked_send(message):
+            await asyncio.sleep(3600)
+
+        task = asyncio.ensure_future(
+            response({"type": "http", "asgi": {"spec_version": "2.4"}}, never_disconnect, blocked_send)
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 名额已释放，新的重查询可以立即准入
+        (await controller.admit("b", 100)).release()
+        return controller.get_stats()['running']
+
+    assert run(scenario()) == 0
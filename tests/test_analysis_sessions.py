@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api.main as api
+
+SESSION = {
+    "original_input": "比较沪深300和中证500",
+    "timestamp": "2025-03-05T10:00:00",
+    "identified_codes": ["A.SH", "B.SH"],
+    "indicators_detail": [{"wind_code": "A.SH"}, {"wind_code": "B.SH"}],
+}
+
+
+class FlakyProcessor:
+    """第一次执行分析失败，之后成功"""
+
+    def __init__(self):
+        self.pending_request = None
+        self.calls = 0
+
+    def _get_indicators_detail(self, codes):
+        return [{"wind_code": code} for code in codes]
+
+    def execute_analysis(self):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("Wind连接中断")
+        return {"codes": self.pending_request["identified_codes"]}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(api, "db_manager", db)
+    monkeypatch.setattr(api, "data_processor", FlakyProcessor())
+    db.save_analysis_session("s1", SESSION, 3600)
+    return TestClient(api.app)
+
+
+def test_failed_analysis_keeps_session_for_retry(db, client):
+    response = client.post("/confirm", json={"session_id": "s1", "confirmed": True, "modified_codes": ["C.SH"]})
+    assert response.status_code == 500
+    # 会话原样放回，用户修改的指标没有写入会话
+    assert db.get_analysis_session("s1") == SESSION
+
+    response = client.post("/confirm", json={"session_id": "s1", "confirmed": True})
+    assert response.status_code == 200
+    assert response.json()["results"] == {"codes": ["A.SH", "B.SH"]}
+
+    # 分析成功后会话被取出，不能再次确认
+    assert db.get_analysis_session("s1") is None
+    assert client.post("/confirm", json={"session_id": "s1", "confirmed": True}).status_code == 404
+
+
+def test_cancel_removes_session(db, client):
+    response = client.post("/confirm", json={"session_id": "s1", "confirmed": False})
+    assert response.json()["status"] == "cancelled"
+    assert db.get_analysis_session("s1") is None
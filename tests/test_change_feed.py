@@ -0,0 +1,152 @@
+import json
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api.main as api
+from src.api.push import collect_events
+
+
+def write(db, wind_code, points, replace_range=None, update_type="incremental"):
+    """写入一个字段的数据点 {date: value}"""
+    dates = sorted(points)
+    result = db.write_update_batch([{
+        'wind_code': wind_code,
+        'field_data': {'close': pd.Series(points)},
+        'logs': [{
+            'field_name': 'close', 'update_type': update_type, 'start_date': dates[0],
+            'end_date': dates[-1], 'records_count': len(points), 'status': 'success'
+        }],
+        'replace_range': replace_range
+    }])
+    assert not result['failed']
+
+
+def read_changes(db, since):
+    watermark, chunks = db.open_changes(since)
+    return watermark, [row for rows in chunks for row in rows]
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    # 不进入TestClient上下文，不启动调度、探测和推送等后台任务
+    monkeypatch.setattr(api, "db_manager", db)
+    return TestClient(api.app)
+
+
+def test_changes_since_returns_only_newer_points(db):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0})
+    since, _ = read_changes(db, None)
+    write(db, "A.SH", {"2024-01-03": 2.5, "2024-01-04": 3.0})
+
+    watermark, rows = read_changes(db, since)
+    assert watermark == since + 1
+    assert [(row[3], row[4], row[5]) for row in rows] == [
+        ("2024-01-03", 2.5, "upsert"), ("2024-01-04", 3.0, "upsert")
+    ]
+
+
+def test_unchanged_values_do_not_advance_points(db):
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    since, _ = read_changes(db, None)
+    write(db, "A.SH", {"2024-01-02": 1.0})
+
+    _, rows = read_changes(db, since)
+    assert rows == []
+
+
+def test_since_beyond_watermark_raises(db):
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    watermark = db.get_change_watermark()
+    with pytest.raises(ValueError):
+        db.open_changes(watermark + 1)
+
+
+def test_repair_delete_is_reported_as_tombstone(db):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0, "2024-01-04": 3.0})
+    since = db.get_change_watermark()
+
+    # 漂移修复：Wind已没有2024-01-03
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-04": 3.0},
+          replace_range=("2024-01-02", "2024-01-04"), update_type="repair")
+
+    watermark, rows = read_changes(db, since)
+    assert rows == [(watermark, "A.SH", "close", "2024-01-03", None, "delete")]
+
+    # 全量同步只返回现存数据点
+    _, rows = read_changes(db, None)
+    assert [row[3] for row in rows] == ["2024-01-02", "2024-01-04"]
+
+
+def test_reinserted_point_is_not_reported_as_deleted(db):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0})
+    since = db.get_change_watermark()
+    write(db, "A.SH", {"2024-01-02": 1.0}, replace_range=("2024-01-02", "2024-01-03"), update_type="repair")
+    write(db, "A.SH", {"2024-01-03": 2.1})
+
+    _, rows = read_changes(db, since)
+    assert [(row[3], row[4], row[5]) for row in rows] == [("2024-01-03", 2.1, "upsert")]
+
+
+def test_changes_endpoint_reports_repair_delete(db, client):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0})
+    write(db, "B.SH", {"2024-01-02": 5.0})
+    since = db.get_change_watermark()
+    write(db, "A.SH", {"2024-01-02": 1.0}, replace_range=("2024-01-02", "2024-01-03"), update_type="repair")
+
+    response = client.get("/changes", params={"since": since})
+    assert response.status_code == 200
+    assert int(response.headers["X-Change-Watermark"]) == since + 1
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"seq": since + 1, "wind_code": "A.SH", "field": "close", "date": "2024-01-03", "value": None, "op": "delete"}
+    ]
+
+    # wind_codes过滤同样作用于删除
+    response = client.get("/changes", params={"since": since, "wind_codes": "B.SH"})
+    assert response.text == ""
+
+    response = client.get("/changes", params={"since": since + 5})
+    assert response.status_code == 409
+
+
+def test_push_events_include_deletes(db):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0})
+    since = db.get_change_watermark()
+    write(db, "A.SH", {"2024-01-02": 1.5}, replace_range=("2024-01-02", "2024-01-03"), update_type="repair")
+
+    watermark, events = collect_events(db, since, {}, max_points=100)
+    assert watermark == since + 1
+    by_op = {event['op']: event for event in events}
+    assert by_op['upsert']['dates'] == ["2024-01-02"] and by_op['upsert']['values'] == [1.5]
+    assert by_op['delete']['dates'] == ["2024-01-03"] and 'values' not in by_op['delete']
+    assert by_op['delete']['category'] == "股票"
+
+
+def test_watermark_is_read_with_the_rows(db):
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    watermark, chunks = db.open_changes(0)
+    # 读事务开始后提交的写入不出现在本次结果中，下一次从返回的水位继续
+    write(db, "B.SH", {"2024-01-02": 2.0})
+    assert [row[1] for rows in chunks for row in rows] == ["A.SH"]
+
+    _, rows = read_changes(db, watermark)
+    assert [row[1] for row in rows] == ["B.SH"]
+    assert db.get_change_watermark() == watermark + 1
+
+
+def test_changes_filtered_by_code_and_field(db):
+    db.write_update_batch([{
+        'wind_code': "A.SH",
+        'field_data': {'close': pd.Series({"2024-01-02": 1.0}), 'pe': pd.Series({"2024-01-02": 10.0})},
+        'logs': [{'field_name': None, 'update_type': 'incremental', 'status': 'success'}]
+    }])
+    write(db, "B.SH", {"2024-01-02": 2.0})
+
+    _, chunks = db.open_changes(0, wind_codes=["A.SH"], fields=["pe"])
+    assert [row[1:5] for rows in chunks for row in rows] == [("A.SH", "pe", "2024-01-02", 10.0)]
+
+
+def test_chunks_split_large_results(db):
+    write(db, "A.SH", {f"2024-01-{day:02d}": float(day) for day in range(1, 11)})
+    _, chunks = db.open_changes(None, chunk_size=4)
+    assert [len(rows) for rows in chunks] == [4, 4, 2]
@@ -0,0 +1,94 @@
+import sqlite3
+
+import pandas as pd
+
+
+def write(db, wind_code, points):
+    db.write_update_batch([{
+        'wind_code': wind_code,
+        'field_data': {'close': pd.Series(points)},
+        'logs': [{'field_name': 'close', 'update_type': 'incremental', 'status': 'success'}]
+    }])
+
+
+def dirty_rows(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute("SELECT wind_code, field_name, year FROM series_checksum_dirty ORDER BY year").fetchall()
+
+
+def stored(db, wind_code="A.SH"):
+    return {
+        c['year']: {key: c[key] for key in ('row_count', 'value_hash', 'last_date')}
+        for c in db.get_series_checksums(wind_code)
+        if c['field_name'] == "close"
+    }
+
+
+def expected(db, wind_code="A.SH"):
+    with sqlite3.connect(db.db_path) as conn:
+        series = pd.Series(dict(conn.execute(
+            "SELECT date, value FROM time_series_data WHERE wind_code = ? AND field_name = 'close'", (wind_code,)
+        ).fetchall()))
+    return {
+        year: {key: c[key] for key in ('row_count', 'value_hash', 'last_date')}
+        for year, c in db.compute_year_checksums(series).items()
+    }
+
+
+def test_write_marks_years_and_refresh_computes_checksums(db):
+    write(db, "A.SH", {"2023-12-29": 1.0, "2024-01-02": 2.0, "2024-01-03": 3.0})
+    assert dirty_rows(db) == [("A.SH", "close", 2023), ("A.SH", "close", 2024)]
+    assert stored(db) == {}
+
+    assert db.refresh_dirty_checksums() == 2
+    assert dirty_rows(db) == []
+    assert stored(db) == expected(db)
+    assert stored(db)[2024]['row_count'] == 2
+
+    # 再次写入相同数值不登记
+    write(db, "A.SH", {"2024-01-02": 2.0})
+    assert dirty_rows(db) == []
+    assert db.refresh_dirty_checksums() == 0
+
+
+def test_write_during_refresh_keeps_its_mark(db, monkeypatch):
+    write(db, "A.SH", {"2024-01-02": 1.0, "2024-01-03": 2.0})
+    load = db._load_year_checksums
+    calls = []
+
+    def load_then_concurrent_write(conn, wind_code, field_name, years=None):
+        checksums = load(conn, wind_code, field_name, years)
+        if not calls:
+            # 刷新读取数据之后、写回之前，另一个写入提交了新数据
+            write(db, "A.SH", {"2024-01-04": 3.0})
+        calls.append(wind_code)
+        return checksums
+
+    monkeypatch.setattr(db, "_load_year_checksums", load_then_concurrent_write)
+    db.refresh_dirty_checksums()
+
+    # 写回的是写入之前的数据，登记保留到下一次刷新
+    assert stored(db)[2024]['row_count'] == 2
+    assert dirty_rows(db) == [("A.SH", "close", 2024)]
+
+    monkeypatch.setattr(db, "_load_year_checksums", load)
+    assert db.refresh_dirty_checksums() == 1
+    assert dirty_rows(db) == []
+    assert stored(db) == expected(db)
+    assert stored(db)[2024]['row_count'] == 3
+
+
+def test_repair_delete_refreshes_emptied_year(db):
+    write(db, "A.SH", {"2023-12-29": 1.0, "2024-01-02": 2.0})
+    db.refresh_dirty_checksums()
+
+    db.write_update_batch([{
+        'wind_code': "A.SH",
+        'field_data': {'close': pd.Series({"2024-01-02": 2.0})},
+        'logs': [{'field_name': 'close', 'update_type': 'repair', 'status': 'success'}],
+        'replace_range': ("2023-12-01", "2024-01-31")
+    }])
+    db.refresh_dirty_checksums()
+
+    assert set(stored(db)) == {2024}
+    assert stored(db) == expected(db)
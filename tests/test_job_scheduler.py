@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.scheduler.job_scheduler import JobScheduler
+
+NOW = datetime(2025, 3, 5, 12, 0)  # 周三
+
+
+def make_scheduler(db, policy, grace=300, **job):
+    scheduler = JobScheduler(db, misfire_policy=policy, misfire_grace_seconds=grace, max_sleep_seconds=60)
+    scheduler.add_job("daily", lambda: None, **(job or {'at': "09:00"}))
+    return scheduler
+
+
+def persist(db, scheduler, next_run, spec=True):
+    state = {'next_run_time': next_run.isoformat()}
+    if spec:
+        state['schedule_spec'] = scheduler.jobs["daily"].spec
+    db.save_scheduler_job_state("daily", **state)
+
+
+def test_first_start_schedules_next_occurrence(db):
+    scheduler = make_scheduler(db, "skip")
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 6, 9, 0)
+    assert db.get_scheduler_job_states()["daily"]['next_run_time'] == "2025-03-06T09:00:00"
+
+
+def test_future_persisted_run_is_kept(db):
+    scheduler = make_scheduler(db, "skip")
+    persist(db, scheduler, datetime(2025, 3, 6, 9, 0))
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 6, 9, 0)
+
+
+@pytest.mark.parametrize("policy", ["skip", "run_once"])
+def test_misfire_within_grace_runs_immediately(db, policy):
+    scheduler = make_scheduler(db, policy)
+    persist(db, scheduler, NOW - timedelta(seconds=120))
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == NOW
+    assert db.get_scheduler_runs("daily") == []
+
+
+def test_misfire_run_once_catches_up_a_single_time(db):
+    scheduler = make_scheduler(db, "run_once")
+    persist(db, scheduler, NOW - timedelta(days=3))
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == NOW
+    assert db.get_scheduler_runs("daily") == []
+
+
+def test_misfire_skip_records_missed_run(db):
+    scheduler = make_scheduler(db, "skip")
+    missed = NOW - timedelta(days=3)
+    persist(db, scheduler, missed)
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 6, 9, 0)
+    runs = db.get_scheduler_runs("daily")
+    assert [(run['scheduled_time'], run['status']) for run in runs] == [(missed.isoformat(), "missed")]
+
+
+def test_changed_schedule_is_recomputed(db):
+    old = make_scheduler(db, "skip", at="09:00")
+    persist(db, old, datetime(2025, 3, 6, 9, 0))
+
+    scheduler = make_scheduler(db, "skip", at="18:00")
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 5, 18, 0)
+    assert db.get_scheduler_job_states()["daily"]['schedule_spec'] == scheduler.jobs["daily"].spec
+
+
+def test_legacy_state_without_spec(db):
+    # 旧版本只保存了next_run_time：落在当前规则上时保留，否则重新计算
+    scheduler = make_scheduler(db, "skip", at="09:00")
+    persist(db, scheduler, datetime(2025, 3, 6, 9, 0), spec=False)
+    scheduler._restore_state(NOW)
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 6, 9, 0)
+
+    scheduler = make_scheduler(db, "skip", at="18:00")
+    persist(db, scheduler, datetime(2025, 3, 6, 9, 0), spec=False)
+    scheduler._restore_state(NOW)
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 5, 18, 0)
+
+
+def test_weekday_schedule_skips_to_allowed_day(db):
+    scheduler = make_scheduler(db, "skip", at="09:00", weekdays=[0])
+    scheduler._restore_state(NOW)
+
+    assert scheduler.jobs["daily"].next_run == datetime(2025, 3, 10, 9, 0)
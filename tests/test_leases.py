@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+
+def expire(db, wind_code):
+    """模拟持有者崩溃：租约立即过期"""
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("UPDATE work_leases SET expires_at = ? WHERE wind_code = ?", (time.time() - 1, wind_code))
+
+
+def test_second_owner_waits_for_unexpired_lease(db):
+    assert db.acquire_lease("A.SH", "w1", "run", "incremental", 60) == 'acquired'
+    assert db.acquire_lease("A.SH", "w2", "run", "incremental", 60) == 'held'
+    # 持有者可以重新获取自己的租约
+    assert db.acquire_lease("A.SH", "w1", "run", "incremental", 60) == 'acquired'
+
+
+def test_expired_lease_is_taken_over(db):
+    db.acquire_lease("A.SH", "w1", "run", "incremental", 60)
+    expire(db, "A.SH")
+
+    assert db.acquire_lease("A.SH", "w2", "run", "incremental", 60) == 'acquired'
+    # 原持有者已失去租约：不能续期，也不能标记完成
+    assert db.renew_lease("A.SH", "w1", 60) is False
+    assert db.complete_leases(["A.SH"], "w1") == ["A.SH"]
+    assert db.complete_leases(["A.SH"], "w2") == []
+
+
+def test_renew_keeps_lease_from_expiring(db):
+    db.acquire_lease("A.SH", "w1", "run", "incremental", 60)
+    expire(db, "A.SH")
+    # 过期但尚未被接管时续期成功，之后其他worker不能接管
+    assert db.renew_lease("A.SH", "w1", 60) is True
+    assert db.acquire_lease("A.SH", "w2", "run", "incremental", 60) == 'held'
+
+
+def test_done_lease_is_skipped_within_the_same_run(db):
+    db.acquire_lease("A.SH", "w1", "run", "incremental", 60)
+    db.complete_leases(["A.SH"], "w1")
+
+    assert db.acquire_lease("A.SH", "w2", "run", "incremental", 60) == 'done'
+    # 同一次运行的其他阶段可以重新获取
+    assert db.acquire_lease("A.SH", "w2", "run", "revision", 60) == 'acquired'
+
+
+def test_done_lease_from_overlapping_run_is_skipped(db):
+    started = time.time()
+    db.acquire_lease("A.SH", "scheduler", "run-1", "incremental", 60)
+    # 另一个运行（不同run_id）在对方持有期间推迟该指标
+    assert db.acquire_lease("A.SH", "api", "run-2", "incremental", 60, done_after=started) == 'held'
+    db.complete_leases(["A.SH"], "scheduler")
+
+    assert db.acquire_lease("A.SH", "api", "run-2", "incremental", 60, done_after=started) == 'done'
+
+
+def test_done_lease_from_earlier_run_is_reacquired(db):
+    db.acquire_lease("A.SH", "w1", "run-1", "incremental", 60)
+    db.complete_leases(["A.SH"], "w1")
+
+    # 在前一次运行完成之后才开始的运行需要重新处理
+    assert db.acquire_lease("A.SH", "w2", "run-2", "incremental", 60, done_after=time.time() + 1) == 'acquired'
+    assert db.acquire_lease("B.SH", "w2", "run-2", "incremental", 60) == 'acquired'
+
+
+def test_claim_skips_indicator_finished_by_overlapping_run(db, monkeypatch):
+    from config.config import settings
+    from src.scheduler.data_updater_v2 import DataUpdater
+
+    monkeypatch.setattr(settings, "WORK_LEASE_POLL_SECONDS", 0)
+    updater = DataUpdater(db, data_fetcher=None, time_budget_seconds=0)
+    updater.active_run_id = "api-run"
+    updater.run_started_at = time.time()
+
+    db.acquire_lease("A.SH", "scheduler", "scheduler-run", "incremental", 60)
+    claimed = []
+    indicators = [{"wind_code": "A.SH"}, {"wind_code": "B.SH"}]
+    for indicator in updater.claim_indicators(indicators, "incremental"):
+        claimed.append(indicator["wind_code"])
+        # 本进程处理B.SH期间，调度器完成了推迟的A.SH
+        db.complete_leases(["A.SH"], "scheduler")
+
+    assert claimed == ["B.SH"]
@@ -0,0 +1,39 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.pagination import decode_cursor, encode_cursor, split_page
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("series", ["000300.SH", "close", "2024-01-02"])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "series", 3) == ("000300.SH", "close", "2024-01-02")
+
+
+def test_cursor_round_trip_non_ascii():
+    cursor = encode_cursor("indicators", ["债券", 42])
+    assert decode_cursor(cursor, "indicators", 2) == ("债券", 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    base64.urlsafe_b64encode(b'{"kind": "series"}').decode(),
+    encode_cursor("indicators", ["A.SH", "close", "2024-01-02"]),  # 类型不匹配
+    encode_cursor("series", ["A.SH", "close"]),  # 长度不匹配
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, "series", 3)
+    assert excinfo.value.status_code == 400
+
+
+def test_split_page():
+    rows = [("A.SH",), ("B.SH",), ("C.SH",)]
+    page, cursor = split_page(rows, 2, "indicators", lambda page: page[-1])
+    assert page == rows[:2]
+    assert decode_cursor(cursor, "indicators", 1) == ("B.SH",)
+
+    assert split_page(rows, 3, "indicators", lambda page: page[-1]) == (rows, None)
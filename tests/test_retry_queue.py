@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+LOG = {'update_type': 'incremental', 'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+
+
+def enqueue(db, fields, error="超时", retry_at=None, log=LOG):
+    with sqlite3.connect(db.db_path) as conn:
+        db._enqueue_retries(conn, "A.SH", fields, log, error, retry_at)
+
+
+def resolve(db, fields, log):
+    with sqlite3.connect(db.db_path) as conn:
+        db._resolve_retries(conn, "A.SH", fields, log)
+
+
+def queue(db):
+    with sqlite3.connect(db.db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        return {
+            row['field_name']: dict(row)
+            for row in conn.execute("SELECT * FROM retry_queue ORDER BY field_name")
+        }
+
+
+def test_enqueued_items_wait_for_retry_delay(db):
+    enqueue(db, ["close", "pe"], retry_at=time.time() + 300)
+
+    assert db.get_due_retries() == []
+    due = db.get_due_retries(include_future=True)
+    assert [(item['field_name'], item['attempts'], item['status']) for item in due] == [
+        ("close", 0, "pending"), ("pe", 0, "pending")
+    ]
+
+
+def test_attempts_back_off_exponentially_up_to_max(db):
+    enqueue(db, ["close"], retry_at=time.time() - 1)
+
+    delays = []
+    for _ in range(5):
+        item = db.get_due_retries(include_future=True)[0]
+        before = time.time()
+        db.record_retry_attempts([item], backoff_base=60, backoff_max=600)
+        delays.append(round(queue(db)["close"]['next_eligible_at'] - before, -1))
+
+    assert delays == [120, 240, 480, 600, 600]
+    assert queue(db)["close"]['attempts'] == 5
+    assert db.get_due_retries() == []
+
+
+def test_re_enqueue_keeps_pending_backoff(db):
+    enqueue(db, ["close"], retry_at=time.time() - 1)
+    item = db.get_due_retries()[0]
+    db.record_retry_attempts([item], backoff_base=60, backoff_max=600)
+    backed_off = queue(db)["close"]
+
+    # 重试再次失败：尝试次数和退避时间保留，错误信息更新
+    enqueue(db, ["close"], error="无数据", retry_at=time.time() - 1)
+    row = queue(db)["close"]
+    assert row['attempts'] == 1
+    assert row['next_eligible_at'] == backed_off['next_eligible_at']
+    assert row['last_error'] == "无数据"
+
+
+def test_resolve_only_covers_items_inside_written_range(db):
+    enqueue(db, ["close", "pe"])
+
+    resolve(db, ["close"], {'start_date': '2024-01-05', 'end_date': '2024-02-10'})
+    assert queue(db)["close"]['status'] == "pending"
+
+    resolve(db, ["close"], {'start_date': '2023-12-01', 'end_date': '2024-02-10'})
+    rows = queue(db)
+    assert rows["close"]['status'] == "done"
+    assert rows["pe"]['status'] == "pending"
+
+
+def test_done_and_dead_items_restart_when_enqueued_again(db):
+    enqueue(db, ["close", "pe"], retry_at=time.time() - 1)
+    items = db.get_due_retries()
+    db.record_retry_attempts(items, backoff_base=60, backoff_max=600)
+    db.give_up_retries([item for item in items if item['field_name'] == "pe"])
+    resolve(db, ["close"], LOG)
+
+    retry_at = time.time() + 30
+    enqueue(db, ["close", "pe"], retry_at=retry_at)
+    rows = queue(db)
+    for field in ("close", "pe"):
+        assert rows[field]['status'] == "pending"
+        assert rows[field]['attempts'] == 0
+        assert rows[field]['next_eligible_at'] == retry_at
+
+
+def test_write_batch_enqueues_failed_fields_and_resolves_written_ones(db):
+    enqueue(db, ["close"])
+    db.write_update_batch([{
+        'wind_code': "A.SH",
+        'field_data': {'close': pd.Series({'2024-01-02': 1.0})},
+        'logs': [
+            dict(LOG, field_name='close', records_count=1, status='success'),
+            dict(LOG, field_name='pe', records_count=0, status='failed', error_message='字段无数据'),
+        ],
+        'retry_fields': ['pe']
+    }], retry_delay=300)
+
+    rows = queue(db)
+    assert rows["close"]['status'] == "done"
+    assert rows["pe"]['status'] == "pending"
+    assert rows["pe"]['last_error'] == "字段无数据"
+    assert db.get_retry_queue_summary()['pending'] == 1
@@ -0,0 +1,53 @@
+import pandas as pd
+
+import src.scheduler.data_updater_v2 as data_updater_v2
+from src.scheduler.data_updater_v2 import DataUpdater
+
+
+class FakeFetcher:
+    """按指标返回固定数据：missing中的字段不返回，none_codes中的指标请求失败"""
+
+    def __init__(self, missing=None, none_codes=()):
+        self.missing = missing or {}
+        self.none_codes = set(none_codes)
+
+    def fetch_data_by_indicator(self, indicator, start_date, end_date, fields=None, options=""):
+        if indicator['wind_code'] in self.none_codes:
+            return None
+        dates = ["2024-01-02", "2024-01-03"]
+        return pd.DataFrame(
+            {field: [1.0, 2.0] for field in fields if field not in self.missing.get(indicator['wind_code'], ())},
+            index=dates
+        )
+
+
+def test_success_and_failed_are_counted_per_field(db, monkeypatch):
+    monkeypatch.setattr(data_updater_v2.time, "sleep", lambda seconds: None)
+    fetcher = FakeFetcher(missing={"B.SH": ["pe"]}, none_codes=["C.SH"])
+    updater = DataUpdater(db, fetcher, time_budget_seconds=0)
+
+    updater.full_historical_update(start_year=2024)
+
+    run = db.get_update_runs("full_historical_update")[0]
+    # A.SH两个字段成功；B.SH close成功、pe缺失；C.SH请求失败，两个字段都失败
+    assert (run['indicators'], run['requests']) == (3, 3)
+    assert (run['success'], run['failed']) == (3, 3)
+    assert db.get_retry_queue_summary()['pending'] == 3
+
+
+def test_rolled_back_write_moves_fields_from_success_to_failed(db, monkeypatch):
+    monkeypatch.setattr(data_updater_v2.time, "sleep", lambda seconds: None)
+    write_update_batch = db.write_update_batch
+
+    def fail_a(entries, **kwargs):
+        result = write_update_batch([entry for entry in entries if entry['wind_code'] != "A.SH"], **kwargs)
+        if any(entry['wind_code'] == "A.SH" for entry in entries):
+            result['failed']["A.SH"] = "database is locked"
+        return result
+
+    monkeypatch.setattr(db, "write_update_batch", fail_a)
+    updater = DataUpdater(db, FakeFetcher(), time_budget_seconds=0)
+    updater.full_historical_update(start_year=2024)
+
+    run = db.get_update_runs("full_historical_update")[0]
+    assert (run['success'], run['failed']) == (4, 2)
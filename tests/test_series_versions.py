@@ -0,0 +1,52 @@
+import sqlite3
+
+import pandas as pd
+
+
+def write(db, wind_code, points):
+    db.write_update_batch([{
+        'wind_code': wind_code,
+        'field_data': {'close': pd.Series(points)},
+        'logs': [{'field_name': 'close', 'update_type': 'incremental', 'status': 'success'}]
+    }])
+
+
+def bump_metadata(db):
+    with sqlite3.connect(db.db_path) as conn:
+        db._bump_series_versions(conn, [db.METADATA_VERSION_KEY])
+        conn.commit()
+
+
+def test_versions_increase_only_when_values_change(db):
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    first = db.get_series_versions(["A.SH", "B.SH"])
+    assert list(first) == ["A.SH"] and first["A.SH"]['version'] == 1
+
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    assert db.get_series_versions(["A.SH"])["A.SH"]['version'] == 1
+
+    write(db, "A.SH", {"2024-01-02": 1.5})
+    assert db.get_series_versions(["A.SH"])["A.SH"]['version'] == 2
+
+
+def test_invalidation_polls_by_change_seq(db):
+    watermark = db.get_change_watermark()
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    bump_metadata(db)
+
+    changed = db.get_series_versions_since(watermark)
+    assert set(changed) == {"A.SH", db.METADATA_VERSION_KEY}
+    assert max(changed.values()) == db.get_change_watermark()
+    assert db.get_series_versions_since(max(changed.values())) == {}
+
+
+def test_write_with_earlier_timestamp_is_not_skipped(db):
+    write(db, "A.SH", {"2024-01-02": 1.0})
+    watermark = db.get_change_watermark()
+
+    # 提交较晚但时间戳较早的写入（如时钟回拨或事务开始后长时间未提交）
+    write(db, "B.SH", {"2024-01-02": 2.0})
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("UPDATE series_versions SET updated_at = 0 WHERE wind_code = 'B.SH'")
+
+    assert set(db.get_series_versions_since(watermark)) == {"B.SH"}